@@ -0,0 +1,25 @@
+# core/__init__.py
+"""
+Núcleo do Ragnarok Tools sem dependência de Streamlit.
+
+Scripts e workers importam daqui; o app usa o adaptador db.database.
+"""
+from .config import get_config, get_section, set_config_provider
+from .connection import execute, get_connection, query_df
+from .events import get_data_version, notify_variation_change, on_variation_change
+from .market import compute_summary, status_from_variation, summarize_last_prices
+
+__all__ = [
+    "get_config",
+    "get_section",
+    "set_config_provider",
+    "execute",
+    "get_connection",
+    "query_df",
+    "get_data_version",
+    "notify_variation_change",
+    "on_variation_change",
+    "compute_summary",
+    "status_from_variation",
+    "summarize_last_prices",
+]
@@ -0,0 +1,88 @@
+# core/aio.py
+"""
+Leituras concorrentes com asyncio (sem Streamlit).
+
+Um event loop dedicado roda numa thread de fundo; código síncrono (páginas
+Streamlit, scripts) entra nele com run() / load_concurrently().
+
+  - load_concurrently({nome: função}): dispara várias leituras síncronas do
+    repository ao mesmo tempo (asyncio.to_thread) e devolve os resultados —
+    a latência vira a da mais lenta, não a soma. As funções continuam
+    passando pelo core.cache e pelo core.connection (réplica, métricas).
+  - gather({nome: awaitable}): o mesmo para coroutines.
+
+O tempo total de cada load_concurrently vai para core.metrics (kind "aio").
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import threading
+import time
+
+from core import metrics
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Event loop do processo (thread daemon criada no primeiro uso)."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=loop.run_forever, name="core-aio-loop", daemon=True
+            )
+            thread.start()
+            _loop = loop
+        return _loop
+
+
+def run(coro, timeout: float | None = None):
+    """Executa a coroutine no loop de fundo e devolve o resultado (bloqueia)."""
+    future = asyncio.run_coroutine_threadsafe(coro, _get_loop())
+    return future.result(timeout)
+
+
+# ======================================================
+#  Várias leituras ao mesmo tempo
+# ======================================================
+async def gather(calls: dict) -> dict:
+    """
+    Aguarda {nome: awaitable} em paralelo. Falhas não derrubam as demais:
+    o valor daquele nome vira a exceção.
+    """
+    results = await asyncio.gather(*calls.values(), return_exceptions=True)
+    return dict(zip(calls, results))
+
+
+def load_concurrently(calls: dict, timeout: float | None = 30) -> dict:
+    """
+    Roda {nome: função_sem_argumentos} em paralelo (threads do loop) e
+    devolve {nome: resultado ou exceção}. Para usar em código síncrono.
+    """
+    start = time.perf_counter()
+    results = run(
+        # Cada leitura roda numa cópia do contexto de quem chamou (coletores
+        # de core.metrics continuam contando)
+        gather(
+            {
+                name: asyncio.to_thread(contextvars.copy_context().run, fn)
+                for name, fn in calls.items()
+            }
+        ),
+        timeout,
+    )
+    failed = [name for name, r in results.items() if isinstance(r, Exception)]
+    for name in failed:
+        print(f"[WARN] Leitura concorrente '{name}' falhou: {results[name]}")
+    metrics.record(
+        "aio",
+        f"load_concurrently({', '.join(sorted(calls))})",
+        time.perf_counter() - start,
+        rows=len(calls) - len(failed),
+        error=results[failed[0]] if failed else None,
+    )
+    return results
@@ -0,0 +1,356 @@
+# core/analytics.py
+"""
+Snapshot colunar para análises pesadas (sem Streamlit).
+
+Exportação (export_prices):
+  prices vai para Parquet particionado por mês do preço,
+
+      <dir>/prices/month=YYYY-MM/data.parquet
+      <dir>/items.parquet
+      <dir>/manifest.json
+
+  de forma incremental: uma consulta agregada por mês (linhas, maior id,
+  última criação/edição) é comparada com o manifest e só os meses que
+  mudaram são regravados (cobre inserts, updates e deletes).
+
+Consultas (query_df e helpers):
+  DuckDB embutido lendo os arquivos Parquet — resumos globais, estatísticas
+  mensais e correlações nunca tocam o banco transacional.
+
+Diretório: [analytics] dir na config (padrão .cache/analytics).
+Dependências: pyarrow (já vem com o Streamlit) e duckdb (opcional,
+só para as consultas).
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+from datetime import date
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from core import metrics
+from core.config import ROOT, get_section
+from core.connection import query_df as oltp_query_df
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_DIR = ROOT / ".cache" / "analytics"
+
+# Colunas exportadas de prices (ordem e tipos fixos em todas as partições)
+_PRICE_COLUMNS = (
+    "id",
+    "item_id",
+    "date",
+    "price_zeny",
+    "refine",
+    "card_ids",
+    "extra_desc",
+    "variation_key",
+    "created_at",
+    "updated_at",
+)
+
+# Mês do preço em SQL portável (Postgres / SQLite): 'YYYY-MM'
+_MONTH_SQL = "SUBSTR(CAST(date AS TEXT), 1, 7)"
+
+
+def analytics_dir() -> Path:
+    path = Path(get_section("analytics").get("dir", DEFAULT_DIR))
+    return path if path.is_absolute() else ROOT / path
+
+
+def _prices_schema():
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("item_id", pa.int32()),
+            ("date", pa.date32()),
+            ("price_zeny", pa.int64()),
+            ("refine", pa.int32()),
+            ("card_ids", pa.string()),
+            ("extra_desc", pa.string()),
+            ("variation_key", pa.string()),
+            ("created_at", pa.timestamp("us")),
+            ("updated_at", pa.timestamp("us")),
+        ]
+    )
+
+
+# ======================================================
+#  Exportação incremental (banco -> Parquet)
+# ======================================================
+def _month_fingerprints() -> dict[str, list]:
+    """{mês: [linhas, maior id, última criação/edição]} direto do banco."""
+    df = oltp_query_df(
+        f"""
+        SELECT
+            {_MONTH_SQL} AS month,
+            COUNT(*) AS n_rows,
+            MAX(id) AS max_id,
+            MAX(COALESCE(updated_at, created_at)) AS last_change
+        FROM prices
+        GROUP BY {_MONTH_SQL};
+        """
+    )
+    return {
+        str(r["month"]): [int(r["n_rows"]), int(r["max_id"]), str(r["last_change"])]
+        for r in df.to_dict(orient="records")
+    }
+
+
+def _month_bounds(month: str) -> tuple[str, str]:
+    year, mon = (int(x) for x in month.split("-"))
+    start = date(year, mon, 1)
+    end = date(year + (mon == 12), mon % 12 + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+
+def _write_parquet(table, path: Path) -> None:
+    import pyarrow.parquet as pq
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+
+
+def _export_month(month: str, out: Path) -> int:
+    import pandas as pd
+    import pyarrow as pa
+
+    start, end = _month_bounds(month)
+    df = oltp_query_df(
+        f"""
+        SELECT {", ".join(_PRICE_COLUMNS)}
+        FROM prices
+        WHERE date >= %s AND date < %s
+        ORDER BY item_id, date, created_at;
+        """,
+        (start, end),
+    )
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+    for col in ("created_at", "updated_at"):
+        df[col] = pd.to_datetime(df[col])
+    table = pa.Table.from_pandas(df, schema=_prices_schema(), preserve_index=False)
+    _write_parquet(table, out / "prices" / f"month={month}" / "data.parquet")
+    return len(df)
+
+
+def _export_items(out: Path) -> int:
+    import pyarrow as pa
+
+    df = oltp_query_df("SELECT id, name FROM items ORDER BY id;")
+    schema = pa.schema([("id", pa.int32()), ("name", pa.string())])
+    _write_parquet(
+        pa.Table.from_pandas(df, schema=schema, preserve_index=False),
+        out / "items.parquet",
+    )
+    return len(df)
+
+
+def export_prices(out_dir: Path | None = None, full: bool = False) -> dict:
+    """
+    Atualiza o snapshot Parquet. Só regrava os meses cuja "impressão digital"
+    mudou desde a última exportação (full=True regrava tudo).
+    Retorna {"months_written", "months_removed", "rows_written", "seconds"}.
+    """
+    start = time.perf_counter()
+    out = Path(out_dir) if out_dir else analytics_dir()
+    manifest_path = out / "manifest.json"
+
+    manifest: dict = {}
+    if manifest_path.exists() and not full:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    old_months = manifest.get("months", {})
+
+    current = _month_fingerprints()
+    changed = sorted(m for m, fp in current.items() if old_months.get(m) != fp)
+    removed = sorted(set(old_months) - set(current))
+
+    rows = 0
+    for month in changed:
+        rows += _export_month(month, out)
+    for month in removed:
+        part = out / "prices" / f"month={month}" / "data.parquet"
+        part.unlink(missing_ok=True)
+        try:
+            part.parent.rmdir()
+        except OSError:
+            pass
+
+    # Catálogo pequeno: regravado sempre que algo mudou (ou se não existe)
+    if changed or removed or not (out / "items.parquet").exists():
+        _export_items(out)
+
+    manifest = {"months": current, "exported_at": time.time()}
+    tmp = manifest_path.with_name("manifest.json.tmp")
+    out.mkdir(parents=True, exist_ok=True)
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, manifest_path)
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"[PERF][analytics] {elapsed:.3f}s  -> export: {len(changed)} mês(es), "
+        f"{rows} linhas, {len(removed)} removido(s)"
+    )
+    return {
+        "months_written": changed,
+        "months_removed": removed,
+        "rows_written": rows,
+        "seconds": elapsed,
+    }
+
+
+# ======================================================
+#  Consultas colunares (DuckDB sobre o Parquet)
+# ======================================================
+def connect(out_dir: Path | None = None):
+    """
+    Conexão DuckDB em memória com as views `prices` e `items` sobre o
+    snapshot. Uma por chamada (conexões DuckDB não são thread-safe).
+    """
+    try:
+        import duckdb
+    except ImportError as e:
+        raise RuntimeError(
+            "Consultas analíticas precisam do duckdb (pip install duckdb)."
+        ) from e
+
+    out = Path(out_dir) if out_dir else analytics_dir()
+    prices_glob = out / "prices" / "*" / "data.parquet"
+    if not (out / "manifest.json").exists():
+        raise RuntimeError(
+            f"Snapshot analítico não encontrado em {out} "
+            "(rode python -m scripts.export_parquet)."
+        )
+
+    con = duckdb.connect()
+    if any(out.glob("prices/*/data.parquet")):
+        con.execute(
+            "CREATE VIEW prices AS SELECT * EXCLUDE (month) FROM "
+            f"read_parquet('{prices_glob.as_posix()}', hive_partitioning = true);"
+        )
+    else:
+        # Banco sem preços: view vazia com o mesmo schema
+        con.execute(
+            "CREATE VIEW prices AS SELECT * FROM "
+            "(SELECT NULL::BIGINT AS id, NULL::INTEGER AS item_id, NULL::DATE AS date, "
+            "NULL::BIGINT AS price_zeny, NULL::INTEGER AS refine, "
+            "NULL::VARCHAR AS card_ids, NULL::VARCHAR AS extra_desc, "
+            "NULL::VARCHAR AS variation_key, NULL::TIMESTAMP AS created_at, "
+            "NULL::TIMESTAMP AS updated_at) WHERE false;"
+        )
+    con.execute(
+        f"CREATE VIEW items AS SELECT * FROM read_parquet('{(out / 'items.parquet').as_posix()}');"
+    )
+    return con
+
+
+def query_df(sql: str, params=None, out_dir: Path | None = None) -> pd.DataFrame:
+    """SELECT no snapshot (placeholders ? do DuckDB) -> DataFrame."""
+    start = time.perf_counter()
+    try:
+        con = connect(out_dir)
+        try:
+            df = con.execute(sql, params or []).df()
+        finally:
+            con.close()
+    except Exception as e:
+        metrics.record("analytics", sql, time.perf_counter() - start, error=e)
+        raise
+    metrics.record(
+        "analytics",
+        sql,
+        time.perf_counter() - start,
+        rows=len(df),
+        nbytes=metrics.dataframe_bytes(df),
+    )
+    return df
+
+
+def global_summary(out_dir: Path | None = None) -> pd.DataFrame:
+    """
+    Resumo de todas as variações (mesmas colunas da tabela de mercado:
+    last_date, last_price, mean_5, var_pct, status...).
+    """
+    # Mesma consulta do banco (SQL portável), agora sobre o Parquet
+    from core.repository import _MARKET_SQL
+
+    return query_df(
+        f"SELECT * FROM ({_MARKET_SQL}) mk ORDER BY item_name, variation_key;",
+        out_dir=out_dir,
+    )
+
+
+def monthly_stats(item_id: int | None = None, out_dir: Path | None = None) -> pd.DataFrame:
+    """Registros, mínimo, máximo, média e mediana de preço por item/mês."""
+    where = "WHERE p.item_id = ?" if item_id is not None else ""
+    return query_df(
+        f"""
+        SELECT
+            p.item_id,
+            i.name AS item_name,
+            strftime(p.date, '%Y-%m') AS month,
+            COUNT(*) AS n_records,
+            MIN(p.price_zeny) AS min_price,
+            MAX(p.price_zeny) AS max_price,
+            AVG(p.price_zeny) AS mean_price,
+            MEDIAN(p.price_zeny) AS median_price
+        FROM prices p
+        JOIN items i ON i.id = p.item_id
+        {where}
+        GROUP BY p.item_id, i.name, month
+        ORDER BY p.item_id, month;
+        """,
+        [item_id] if item_id is not None else None,
+        out_dir=out_dir,
+    )
+
+
+def price_correlations(
+    min_overlap: int = 5,
+    item_ids: list[int] | None = None,
+    out_dir: Path | None = None,
+) -> pd.DataFrame:
+    """
+    Correlação de Pearson entre os preços diários (variação padrão) de cada
+    par de itens, considerando só pares com ao menos min_overlap dias em comum.
+    """
+    item_filter = ""
+    params: list = []
+    if item_ids:
+        item_filter = f"AND p.item_id IN ({', '.join('?' * len(item_ids))})"
+        params.extend(int(i) for i in item_ids)
+    params.append(int(min_overlap))
+
+    return query_df(
+        f"""
+        WITH daily AS (
+            SELECT p.item_id, p.date, arg_max(p.price_zeny, p.created_at) AS price
+            FROM prices p
+            WHERE COALESCE(p.variation_key, '') IN ('', 'base', 'r0')
+              {item_filter}
+            GROUP BY p.item_id, p.date
+        )
+        SELECT
+            a.item_id AS item_a,
+            b.item_id AS item_b,
+            COUNT(*) AS n_days,
+            corr(a.price, b.price) AS correlation
+        FROM daily a
+        JOIN daily b ON a.date = b.date AND a.item_id < b.item_id
+        GROUP BY a.item_id, b.item_id
+        HAVING COUNT(*) >= ?
+        ORDER BY correlation DESC;
+        """,
+        params,
+        out_dir=out_dir,
+    )
+
@@ -0,0 +1,415 @@
+# core/audit.py
+"""
+Gravação da auditoria em segundo plano (sem Streamlit).
+
+log_price_action / log_price_change (core.repository) só enfileiram a
+linha; uma thread junta o que chegou em até [audit] flush_interval
+segundos (padrão 0.5) ou [audit] batch_size linhas (200) e grava tudo em
+lote, numa transação (executemany por tabela). Quem salva um preço não
+espera a auditoria.
+
+  - created_at é fixado na hora do enfileiramento (não na gravação);
+  - fila cheia ([audit] queue_size, 10000): a linha é gravada na hora,
+    na thread de quem chamou (mais lento, nada se perde);
+  - banco fora do ar: o lote vai para um spool local (JSON lines em
+    [audit] spool_path, padrão .cache/audit/spool.jsonl, um por host, com
+    lock de arquivo entre os processos) e é reenviado quando a thread
+    sobe e depois a cada [audit] retry_interval segundos (30). A thread só
+    sobe no primeiro submit() do processo: um processo que não audita nada
+    não esvazia o spool (replay_spool() faz isso sob demanda).
+    [audit] spool = false descarta com [WARN], como antes;
+  - banco no ar mas o INSERT falhou (tabela ausente, dado inválido):
+    o lote é regravado linha a linha e só as inválidas são descartadas,
+    com [WARN] — o spool não guarda lixo para sempre;
+  - ao sair do processo (atexit) a fila é esvaziada: o que não couber em
+    [audit] shutdown_timeout segundos (10) vai para o spool;
+  - uma vez por dia a thread garante as partições mensais dos próximos
+    meses (core.audit_archive, só Postgres).
+
+[audit] mode = "sync" volta à gravação direta (uma conexão por linha).
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+from core import audit_archive, connection, metrics
+from core.config import ROOT, get_section
+from core.locks import HostLock
+
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_FLUSH_INTERVAL = 0.5
+DEFAULT_QUEUE_SIZE = 10_000
+DEFAULT_RETRY_INTERVAL = 30.0
+DEFAULT_SHUTDOWN_TIMEOUT = 10.0
+DEFAULT_SPOOL_PATH = ROOT / ".cache" / "audit" / "spool.jsonl"
+PARTITIONS_INTERVAL = 24 * 3600  # partições dos próximos meses (Postgres)
+
+# Colunas gravadas por tabela (created_at sempre por último)
+COLUMNS = {
+    "price_audit_log": (
+        "item_id", "date", "action_type", "old_price", "new_price",
+        "actor_email", "actor_role", "request_id",
+        "refine", "card_ids", "extra_desc", "variation_key", "created_at",
+    ),
+    "price_change_logs": (
+        "item_id", "date", "old_price_zeny", "new_price_zeny",
+        "changed_by", "source", "refine", "card_ids", "extra_desc",
+        "variation_key", "created_at",
+    ),
+}
+
+_queue: queue.Queue | None = None
+_worker: threading.Thread | None = None
+_lock = threading.Lock()
+_state = {
+    "queued": 0,
+    "written": 0,
+    "batches": 0,
+    "spooled": 0,
+    "replayed": 0,
+    "dropped": 0,
+    "sync_writes": 0,
+    "last_error": None,
+}
+
+
+def settings() -> dict:
+    cfg = get_section("audit")
+    spool_path = Path(cfg.get("spool_path", DEFAULT_SPOOL_PATH))
+    return {
+        "mode": str(cfg.get("mode", "async")).lower(),
+        "batch_size": int(cfg.get("batch_size", DEFAULT_BATCH_SIZE)),
+        "flush_interval": float(cfg.get("flush_interval", DEFAULT_FLUSH_INTERVAL)),
+        "queue_size": int(cfg.get("queue_size", DEFAULT_QUEUE_SIZE)),
+        "retry_interval": float(cfg.get("retry_interval", DEFAULT_RETRY_INTERVAL)),
+        "shutdown_timeout": float(
+            cfg.get("shutdown_timeout", DEFAULT_SHUTDOWN_TIMEOUT)
+        ),
+        "spool": str(cfg.get("spool", True)).lower() not in ("false", "0", "no"),
+        "spool_path": spool_path if spool_path.is_absolute() else ROOT / spool_path,
+    }
+
+
+def _count(key: str, n: int = 1) -> None:
+    with _lock:
+        _state[key] += n
+
+
+def _now() -> datetime:
+    # Postgres: instante com fuso (convertido pelo servidor, como NOW());
+    # SQLite: hora local sem fuso, igual ao DEFAULT das tabelas
+    if connection.get_backend() == "sqlite":
+        return datetime.now().replace(microsecond=0)
+    return datetime.now(timezone.utc)
+
+
+# ======================================================
+#  Entrada (chamada pelo repository)
+# ======================================================
+def normalize_row(table: str, row: dict) -> dict:
+    """Completa a linha com as colunas da tabela (variation_key, created_at)."""
+    if table not in COLUMNS:
+        raise ValueError(f"tabela de auditoria desconhecida: {table}")
+    row = {col: row.get(col) for col in COLUMNS[table]}
+    row["variation_key"] = row["variation_key"] or ""
+    if row["created_at"] is None:
+        row["created_at"] = _now()
+    return row
+
+
+def insert_rows(cur, table: str, rows: list[dict]) -> None:
+    """
+    Grava linhas de auditoria no cursor de quem chamou, dentro da transação
+    dele (sem fila): usado quando a auditoria tem que ser atômica com a escrita.
+    """
+    if not rows:
+        return
+    columns = COLUMNS[table]
+    values = [tuple(r[c] for c in columns) for r in (normalize_row(table, r) for r in rows)]
+    cur.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))});",
+        values,
+    )
+
+
+def submit(table: str, row: dict) -> None:
+    """Enfileira uma linha de auditoria (ou grava na hora, em modo sync)."""
+    item = (table, normalize_row(table, row))
+
+    cfg = settings()
+    if cfg["mode"] == "sync":
+        _write_or_spool([item], cfg)
+        return
+
+    q = _ensure_worker(cfg)
+    try:
+        q.put_nowait(item)
+        _count("queued")
+    except queue.Full:
+        # Sem perder nada: quem chamou paga a gravação desta linha
+        _count("sync_writes")
+        _write_or_spool([item], cfg)
+
+
+def flush(timeout: float = 5.0) -> bool:
+    """Espera a fila atual ser gravada (True se deu tempo)."""
+    with _lock:
+        alive = _worker is not None and _worker.is_alive()
+    if _queue is None or not alive:
+        return True
+    done = threading.Event()
+    try:
+        _queue.put(done, timeout=timeout)
+    except queue.Full:
+        return False
+    return done.wait(timeout)
+
+
+def writer_status() -> dict:
+    """Contadores da fila (página de Performance)."""
+    with _lock:
+        status = {
+            "running": _worker is not None and _worker.is_alive(),
+            "pending": _queue.qsize() if _queue is not None else 0,
+            **_state,
+        }
+    spool = settings()["spool_path"]
+    status["spool_bytes"] = spool.stat().st_size if spool.exists() else 0
+    return status
+
+
+# ======================================================
+#  Thread de gravação
+# ======================================================
+def _ensure_worker(cfg: dict) -> queue.Queue:
+    global _queue, _worker
+    with _lock:
+        if _queue is None:
+            _queue = queue.Queue(maxsize=cfg["queue_size"])
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=_worker_loop, name="core-audit", daemon=True
+            )
+            _worker.start()
+        return _queue
+
+
+def _worker_loop() -> None:
+    # Reenvia o spool de execuções anteriores logo na subida
+    last_retry = float("-inf")
+    last_partitions = float("-inf")
+    while True:
+        cfg = settings()
+        if time.monotonic() - last_partitions >= PARTITIONS_INTERVAL:
+            last_partitions = time.monotonic()
+            try:
+                audit_archive.ensure_partitions()
+            except Exception as e:
+                print(f"[WARN] Falha ao criar partições da auditoria: {e}")
+        if time.monotonic() - last_retry >= cfg["retry_interval"]:
+            last_retry = time.monotonic()
+            try:
+                replay_spool()
+            except Exception as e:
+                print(f"[WARN] Falha ao reenviar spool da auditoria: {e}")
+
+        try:
+            first = _queue.get(timeout=cfg["retry_interval"])
+        except queue.Empty:
+            continue
+
+        batch = [first]
+        deadline = time.monotonic() + cfg["flush_interval"]
+        while len(batch) < cfg["batch_size"] and not isinstance(
+            batch[-1], threading.Event
+        ):
+            try:
+                batch.append(_queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+
+        rows = [b for b in batch if not isinstance(b, threading.Event)]
+        try:
+            if rows:
+                _write_or_spool(rows, cfg)
+        except Exception as e:
+            print(f"[WARN] Falha na gravação da auditoria: {e}")
+        finally:
+            for b in batch:
+                if isinstance(b, threading.Event):
+                    b.set()
+                _queue.task_done()
+
+
+def _write(rows: list[tuple[str, dict]]) -> None:
+    """Grava as linhas numa transação (executemany por tabela)."""
+    by_table: dict[str, list[dict]] = {}
+    for table, row in rows:
+        by_table.setdefault(table, []).append(row)
+
+    start = time.perf_counter()
+    conn = connection.get_connection()
+    try:
+        cur = conn.cursor()
+        for table, table_rows in by_table.items():
+            insert_rows(cur, table, table_rows)
+        conn.commit()
+        cur.close()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    metrics.record(
+        "audit", f"INSERT auditoria ({', '.join(by_table)})",
+        time.perf_counter() - start, rows=len(rows),
+    )
+
+
+def _db_reachable() -> bool:
+    try:
+        conn = connection.get_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1;")
+            cur.close()
+        finally:
+            conn.close()
+        return True
+    except Exception:
+        return False
+
+
+def _write_or_spool(rows: list[tuple[str, dict]], cfg: dict) -> None:
+    try:
+        _write(rows)
+    except Exception as e:
+        with _lock:
+            _state["last_error"] = f"{type(e).__name__}: {e}"[:300]
+        if not _db_reachable():
+            if cfg["spool"]:
+                _spool(rows, cfg["spool_path"])
+                print(f"[WARN] Banco indisponível: {len(rows)} linha(s) de auditoria no spool")
+            else:
+                _count("dropped", len(rows))
+                print(f"[WARN] Banco indisponível: {len(rows)} linha(s) de auditoria perdidas")
+        elif len(rows) > 1:
+            # Banco no ar: uma linha inválida não derruba o lote inteiro
+            for row in rows:
+                _write_or_spool([row], cfg)
+        else:
+            _count("dropped")
+            print(f"[WARN] Falha ao gravar linha de auditoria ({rows[0][0]}): {e}")
+        return
+    _count("written", len(rows))
+    _count("batches")
+
+
+# ======================================================
+#  Spool local (banco fora do ar)
+# ======================================================
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, "item"):  # inteiros/floats do numpy
+        return value.item()
+    raise TypeError(f"{type(value).__name__} não serializável")
+
+
+def _spool(rows: list[tuple[str, dict]], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _spool_lock(path), open(path, "a", encoding="utf-8") as f:
+        for table, row in rows:
+            f.write(json.dumps({"table": table, "row": row}, default=_json_default) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    _count("spooled", len(rows))
+
+
+def _spool_lock(path: Path) -> HostLock:
+    # O spool é de todos os processos do host (e threads deste): quem
+    # anexa e quem reenvia se excluem por um lock de arquivo
+    return HostLock(path.with_name(path.name + ".lock"))
+
+
+def _load_spooled(line: str) -> tuple[str, dict]:
+    data = json.loads(line)
+    row = data["row"]
+    # created_at volta como datetime (com fuso, se tinha); date fica texto
+    if row.get("created_at"):
+        row["created_at"] = datetime.fromisoformat(row["created_at"])
+    return data["table"], row
+
+
+def replay_spool() -> int:
+    """Reenvia o spool ao banco; devolve quantas linhas foram gravadas."""
+    cfg = settings()
+    path = cfg["spool_path"]
+    # Renomeia antes de ler (um .replay que sobrou de uma tentativa falha
+    # vem antes). O lock vale da leitura até apagar o .replay: outro
+    # processo (ou thread) não reenvia as mesmas linhas em paralelo, e
+    # quem cair no spool enquanto isso espera.
+    replaying = path.with_name(path.name + ".replay")
+    with _spool_lock(path):
+        if not replaying.exists():
+            if not path.exists():
+                return 0
+            os.replace(path, replaying)
+        with open(replaying, encoding="utf-8") as f:
+            rows = [_load_spooled(line) for line in f if line.strip()]
+
+        if not rows:
+            replaying.unlink(missing_ok=True)
+            return 0
+
+        try:
+            _write(rows)
+        except Exception:
+            if not _db_reachable():
+                return 0
+            # Banco no ar e mesmo assim falhou: linha a linha, inválidas
+            # saem (fora do lock: o que falhar de novo volta ao spool)
+            replaying.unlink(missing_ok=True)
+            retry = True
+        else:
+            replaying.unlink(missing_ok=True)
+            retry = False
+
+    if retry:
+        _write_or_spool(rows, cfg)
+        return 0
+    _count("replayed", len(rows))
+    print(f"[INFO] Spool da auditoria reenviado: {len(rows)} linha(s)")
+    return len(rows)
+
+
+# ======================================================
+#  Saída do processo
+# ======================================================
+@atexit.register
+def _flush_at_exit() -> None:
+    if _queue is None:
+        return
+    cfg = settings()
+    if flush(cfg["shutdown_timeout"]):
+        return
+    # Thread travada (banco lento): o resto da fila vai para o spool
+    leftovers = []
+    while True:
+        try:
+            item = _queue.get_nowait()
+        except queue.Empty:
+            break
+        if not isinstance(item, threading.Event):
+            leftovers.append(item)
+    if leftovers and cfg["spool"]:
+        _spool(leftovers, cfg["spool_path"])
+        print(f"[WARN] {len(leftovers)} linha(s) de auditoria no spool ao sair")
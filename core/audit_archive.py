@@ -0,0 +1,604 @@
+# core/audit_archive.py
+"""
+Partições mensais e arquivamento das tabelas de auditoria (sem Streamlit).
+
+price_audit_log e price_change_logs recebem uma ou duas linhas por escrita
+e nunca encolhem. No Postgres as duas viram tabelas particionadas por mês
+de created_at (PARTITION BY RANGE):
+
+    price_audit_log
+      ├─ price_audit_log_y2026m09   [2026-09-01, 2026-10-01)
+      ├─ price_audit_log_y2026m10   [2026-10-01, 2026-11-01)
+      ├─ ...                        (mês atual + [audit] months_ahead)
+      └─ price_audit_log_default    (qualquer data fora das partições)
+
+Inserts caem só na partição do mês; consultas por período leem só as
+partições do intervalo. ensure_partitions() cria as dos próximos meses
+(chamado pelo init_db, pela thread do core.audit uma vez por dia e pelo
+job de arquivamento).
+
+archive() exporta cada mês mais antigo que [audit] archive_after_months
+(padrão 6) para <[audit] archive_dir>/<tabela>/month=YYYY-MM.parquet
+(zstd) ou .csv.gz, confere a contagem de linhas e então:
+  - Postgres: DETACH PARTITION + DROP da partição (instantâneo);
+  - SQLite (sem partições declarativas): DELETE das linhas do mês.
+Um manifest.json por tabela lista os meses arquivados.
+
+history() é a leitura única: consulta o banco e, com
+include_archived=True, junta os meses arquivados do intervalo pedido.
+
+Tabelas já existentes (não particionadas) são convertidas por
+migrate_to_partitions() — python -m scripts.archive_audit --migrate.
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from core import connection
+from core.config import ROOT, get_section
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+TABLES = ("price_audit_log", "price_change_logs")
+FORMATS = ("parquet", "csv.gz")
+
+DEFAULT_ARCHIVE_DIR = ROOT / ".cache" / "audit" / "archive"
+DEFAULT_ARCHIVE_AFTER_MONTHS = 6
+DEFAULT_MONTHS_AHEAD = 2
+
+# Colunas de texto (no CSV, vazias não podem virar float)
+_TEXT_COLUMNS = {
+    "action_type", "actor_email", "actor_role", "card_ids", "extra_desc",
+    "variation_key", "changed_by", "source",
+}
+
+# Schema particionado (ambientes novos no Postgres)
+_PG_DDL = {
+    "price_audit_log": """
+        CREATE TABLE IF NOT EXISTS price_audit_log (
+            id            BIGSERIAL,
+            item_id       INTEGER NOT NULL,
+            date          DATE NOT NULL,
+            action_type   TEXT NOT NULL,
+            old_price     INTEGER,
+            new_price     INTEGER,
+            actor_email   TEXT,
+            actor_role    TEXT,
+            request_id    INTEGER,
+            refine        INTEGER,
+            card_ids      TEXT,
+            extra_desc    TEXT,
+            variation_key TEXT NOT NULL DEFAULT '',
+            created_at    TIMESTAMP NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """,
+    "price_change_logs": """
+        CREATE TABLE IF NOT EXISTS price_change_logs (
+            id             BIGSERIAL,
+            item_id        INTEGER NOT NULL,
+            date           DATE NOT NULL,
+            old_price_zeny INTEGER,
+            new_price_zeny INTEGER NOT NULL,
+            changed_by     TEXT,
+            source         TEXT,
+            refine         INTEGER,
+            card_ids       TEXT,
+            extra_desc     TEXT,
+            variation_key  TEXT NOT NULL DEFAULT '',
+            created_at     TIMESTAMP NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """,
+}
+
+
+def settings() -> dict:
+    cfg = get_section("audit")
+    archive_dir = Path(cfg.get("archive_dir", DEFAULT_ARCHIVE_DIR))
+    return {
+        "archive_dir": archive_dir if archive_dir.is_absolute() else ROOT / archive_dir,
+        "archive_after_months": int(
+            cfg.get("archive_after_months", DEFAULT_ARCHIVE_AFTER_MONTHS)
+        ),
+        "archive_format": str(cfg.get("archive_format", "parquet")),
+        "months_ahead": int(cfg.get("months_ahead", DEFAULT_MONTHS_AHEAD)),
+    }
+
+
+def _check_table(table: str) -> None:
+    if table not in TABLES:
+        raise ValueError(f"tabela de auditoria desconhecida: {table}")
+
+
+# ======================================================
+#  Meses
+# ======================================================
+def _month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def _add_months(d: date, n: int) -> date:
+    index = d.year * 12 + d.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _month_key(d: date) -> str:
+    return f"{d.year:04d}-{d.month:02d}"
+
+
+def _parse_month(month: str) -> date:
+    year, mon = (int(x) for x in month.split("-"))
+    return date(year, mon, 1)
+
+
+def _partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+
+# ======================================================
+#  Partições (Postgres)
+# ======================================================
+def is_partitioned(table: str) -> bool:
+    _check_table(table)
+    if connection.get_backend() != "postgres":
+        return False
+    df = connection.query_df(
+        "SELECT relkind FROM pg_class WHERE relname = %s AND relkind IN ('r', 'p');",
+        (table,),
+        primary=True,
+    )
+    return not df.empty and df.iloc[0]["relkind"] == "p"
+
+
+def partitions(table: str) -> list[str]:
+    """Meses ('YYYY-MM') com partição anexada, em ordem."""
+    _check_table(table)
+    df = connection.query_df(
+        """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = %s;
+        """,
+        (table,),
+        primary=True,
+    )
+    months = []
+    prefix = f"{table}_y"
+    for name in df["relname"]:
+        if name.startswith(prefix):
+            suffix = name[len(prefix):]  # YYYYmMM
+            months.append(f"{suffix[:4]}-{suffix[5:7]}")
+    return sorted(months)
+
+
+def _create_partition_sql(table: str, month: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {_partition_name(table, month)} "
+        f"PARTITION OF {table} FOR VALUES FROM ('{month.isoformat()}') "
+        f"TO ('{_add_months(month, 1).isoformat()}');"
+    )
+
+
+def _index_columns(table: str) -> dict[str, str]:
+    # Keyset do explorador: (created_at, id), sozinho ou depois do filtro.
+    prefixes = {"created": "", "item_created": "item_id, "}
+    if table == "price_audit_log":
+        prefixes.update({"actor_created": "actor_email, ", "action_created": "action_type, "})
+    return {
+        f"idx_{table}_{name}": f"{cols}created_at DESC, id DESC"
+        for name, cols in prefixes.items()
+    }
+
+
+def _index_sql(table: str) -> list[str]:
+    # Num pai particionado cada índice vira um índice por partição.
+    return [
+        f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({cols});"
+        for name, cols in _index_columns(table).items()
+    ]
+
+
+def _indexes(cur, table: str) -> list[str]:
+    cur.execute(
+        "SELECT indexname FROM pg_indexes "
+        "WHERE schemaname = current_schema() AND tablename = %s;",
+        (table,),
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def _rename_indexes(cur, table: str, suffix: str) -> None:
+    # Nomes de índice (inclusive o da PK) são únicos no schema: sem renomear
+    # os da tabela antiga, o ADD PRIMARY KEY do pai novo falha e os
+    # CREATE INDEX IF NOT EXISTS pulam em silêncio, deixando as partições
+    # sem os índices do explorador.
+    for name in _indexes(cur, table):
+        if not name.endswith(suffix):
+            cur.execute(f'ALTER INDEX "{name}" RENAME TO "{name[:63 - len(suffix)]}{suffix}";')
+
+
+def init_tables() -> None:
+    """
+    Cria as tabelas particionadas (Postgres, ambientes novos) e os índices
+    do explorador, também em tabelas antigas (idempotente).
+    """
+    if connection.get_backend() != "postgres":
+        return
+    for table in TABLES:
+        connection.execute(_PG_DDL[table])
+        # Tabela antiga, não particionada: partições só via migrate_to_partitions()
+        if is_partitioned(table):
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT;"
+            )
+        for stmt in _index_sql(table):
+            connection.execute(stmt)
+    ensure_partitions()
+
+
+def ensure_partitions(months_ahead: int | None = None) -> list[str]:
+    """Cria as partições do mês atual e dos próximos meses; devolve as criadas."""
+    if connection.get_backend() != "postgres":
+        return []
+    if months_ahead is None:
+        months_ahead = settings()["months_ahead"]
+    created = []
+    this_month = _month_start(date.today())
+    for table in TABLES:
+        if not is_partitioned(table):
+            continue
+        existing = set(partitions(table))
+        for n in range(months_ahead + 1):
+            month = _add_months(this_month, n)
+            if _month_key(month) in existing:
+                continue
+            try:
+                connection.execute(_create_partition_sql(table, month))
+                created.append(_partition_name(table, month))
+            except Exception as e:
+                # Ex.: a partição DEFAULT já tem linhas desse mês
+                print(f"[WARN] Falha ao criar partição {_partition_name(table, month)}: {e}")
+    if created:
+        print(f"[INFO] Partições de auditoria criadas: {', '.join(created)}")
+    return created
+
+
+def migrate_to_partitions(table: str, drop_legacy: bool = False) -> dict:
+    """
+    Converte uma tabela existente em particionada, numa transação:
+    renomeia para <tabela>_legacy (e os índices para <índice>_legacy), cria
+    o pai particionado com as mesmas colunas (a sequence do id passa para o
+    pai), cria uma partição por mês presente nos dados + DEFAULT, confere os
+    índices do explorador e copia as linhas. A _legacy só é apagada com
+    drop_legacy=True.
+    """
+    _check_table(table)
+    if connection.get_backend() != "postgres":
+        raise RuntimeError("Particionamento declarativo só existe no Postgres.")
+    if is_partitioned(table):
+        return {"table": table, "migrated": False, "rows": 0, "partitions": 0}
+
+    legacy = f"{table}_legacy"
+    start = time.perf_counter()
+    conn = connection.get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(f"ALTER TABLE {table} RENAME TO {legacy};")
+        _rename_indexes(cur, legacy, "_legacy")
+        cur.execute("SELECT pg_get_serial_sequence(%s, 'id');", (legacy,))
+        sequence = cur.fetchone()[0]
+        # Linhas antigas sem created_at não teriam partição nem PK
+        cur.execute(f"UPDATE {legacy} SET created_at = NOW() WHERE created_at IS NULL;")
+        cur.execute(
+            f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) "
+            f"PARTITION BY RANGE (created_at);"
+        )
+        cur.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id, created_at);")
+        if sequence:
+            cur.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id;")
+
+        cur.execute(
+            f"SELECT DISTINCT date_trunc('month', created_at)::date FROM {legacy};"
+        )
+        months = {row[0] for row in cur.fetchall()}
+        this_month = _month_start(date.today())
+        months |= {_add_months(this_month, n) for n in range(settings()["months_ahead"] + 1)}
+        for month in sorted(months):
+            cur.execute(_create_partition_sql(table, month))
+        cur.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT;")
+        for stmt in _index_sql(table):
+            cur.execute(stmt)
+        missing = set(_index_columns(table)) - set(_indexes(cur, table))
+        if missing:
+            raise RuntimeError(f"{table} particionada sem os índices: {', '.join(sorted(missing))}")
+
+        cur.execute(f"INSERT INTO {table} SELECT * FROM {legacy};")
+        rows = cur.rowcount
+        if drop_legacy:
+            cur.execute(f"DROP TABLE {legacy};")
+        conn.commit()
+        cur.close()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"[PERF][audit] {elapsed:.3f}s  -> {table} particionada: "
+        f"{len(months)} mês(es), {rows} linhas"
+    )
+    return {"table": table, "migrated": True, "rows": rows, "partitions": len(months)}
+
+
+# ======================================================
+#  Arquivamento
+# ======================================================
+def table_dir(table: str) -> Path:
+    return settings()["archive_dir"] / table
+
+
+def _manifest_path(table: str) -> Path:
+    return table_dir(table) / "manifest.json"
+
+
+def archived_months(table: str) -> dict[str, dict]:
+    """{mês: {"file", "format", "rows", "archived_at"}} do manifest."""
+    _check_table(table)
+    path = _manifest_path(table)
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("months", {})
+
+
+def _save_manifest(table: str, months: dict) -> None:
+    path = _manifest_path(table)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"months": dict(sorted(months.items()))}, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _hot_months(table: str) -> list[str]:
+    """Meses com linhas no banco."""
+    if is_partitioned(table):
+        months = partitions(table)
+        # Linhas perdidas na DEFAULT também contam
+        df = connection.query_df(
+            f"""
+            SELECT DISTINCT SUBSTR(CAST(created_at AS TEXT), 1, 7) AS month
+            FROM {table}_default;
+            """,
+            primary=True,
+        )
+        return sorted(set(months) | set(df["month"].dropna()))
+    df = connection.query_df(
+        f"SELECT DISTINCT SUBSTR(CAST(created_at AS TEXT), 1, 7) AS month FROM {table};",
+        primary=True,
+    )
+    return sorted(m for m in df["month"].dropna())
+
+
+def _read_month(table: str, month: date) -> pd.DataFrame:
+    return connection.query_df(
+        f"""
+        SELECT * FROM {table}
+        WHERE created_at >= %s AND created_at < %s
+        ORDER BY created_at, id;
+        """,
+        (month, _add_months(month, 1)),
+        primary=True,
+    )
+
+
+def _write_file(df: pd.DataFrame, path: Path, fmt: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    if fmt == "parquet":
+        df.to_parquet(tmp, index=False, compression="zstd")
+    else:
+        df.to_csv(tmp, index=False, compression="gzip")
+    os.replace(tmp, path)
+
+
+def _drop_month(table: str, month: date, expected_rows: int) -> None:
+    """Tira o mês do banco (depois de exportado), conferindo a contagem."""
+    has_partition = is_partitioned(table) and _month_key(month) in partitions(table)
+    conn = connection.get_connection()
+    try:
+        cur = conn.cursor()
+        removed = 0
+        if has_partition:
+            partition = _partition_name(table, month)
+            cur.execute(f"SELECT COUNT(*) FROM {partition};")
+            removed = cur.fetchone()[0]
+            cur.execute(f"ALTER TABLE {table} DETACH PARTITION {partition};")
+            cur.execute(f"DROP TABLE {partition};")
+        # SQLite: o mês inteiro; Postgres: sobras do mês na partição DEFAULT
+        cur.execute(
+            f"DELETE FROM {table} WHERE created_at >= %s AND created_at < %s;",
+            (month, _add_months(month, 1)),
+        )
+        removed += max(cur.rowcount, 0)
+        if removed != expected_rows:
+            raise RuntimeError(
+                f"{table} {_month_key(month)}: {removed} linhas removidas, "
+                f"{expected_rows} exportadas (o mês mudou durante o arquivamento)"
+            )
+        conn.commit()
+        cur.close()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def archive(
+    older_than_months: int | None = None,
+    fmt: str | None = None,
+    tables: tuple[str, ...] = TABLES,
+    dry_run: bool = False,
+) -> list[dict]:
+    """
+    Exporta e remove do banco os meses anteriores a (mês atual -
+    older_than_months). Devolve uma linha por mês arquivado.
+    """
+    cfg = settings()
+    older_than_months = (
+        cfg["archive_after_months"] if older_than_months is None else older_than_months
+    )
+    fmt = fmt or cfg["archive_format"]
+    if fmt not in FORMATS:
+        raise ValueError(f"formato inválido: {fmt} (use {' ou '.join(FORMATS)})")
+    cutoff = _add_months(_month_start(date.today()), -older_than_months)
+
+    ensure_partitions()
+    done = []
+    for table in tables:
+        _check_table(table)
+        manifest = archived_months(table)
+        for key in _hot_months(table):
+            month = _parse_month(key)
+            if month >= cutoff:
+                continue
+            start = time.perf_counter()
+            df = _read_month(table, month)
+            entry = {"table": table, "month": key, "rows": len(df), "format": fmt}
+            if dry_run:
+                done.append(entry)
+                continue
+
+            if key in manifest:
+                # Mês já arquivado recebeu linhas atrasadas: arquivo separado
+                name = f"month={key}.{int(time.time())}.{fmt}"
+            else:
+                name = f"month={key}.{fmt}"
+            path = table_dir(table) / name
+            _write_file(df, path, fmt)
+            _drop_month(table, month, len(df))
+
+            previous = manifest.get(key)
+            files = (previous or {}).get("files", []) + [name]
+            manifest[key] = {
+                "files": files,
+                "format": fmt,
+                "rows": (previous or {}).get("rows", 0) + len(df),
+                "archived_at": datetime.now().isoformat(timespec="seconds"),
+            }
+            _save_manifest(table, manifest)
+            entry["seconds"] = time.perf_counter() - start
+            done.append(entry)
+            print(
+                f"[INFO] {table} {key}: {len(df)} linhas arquivadas em {path.name} "
+                f"({entry['seconds']:.2f}s)"
+            )
+    return done
+
+
+# ======================================================
+#  Leitura (banco + arquivo sob demanda)
+# ======================================================
+def _read_archive_file(path: Path, fmt: str) -> pd.DataFrame:
+    import pandas as pd
+
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+    columns = pd.read_csv(path, compression="gzip", nrows=0).columns
+    df = pd.read_csv(
+        path,
+        compression="gzip",
+        parse_dates=["created_at"],
+        dtype={c: object for c in columns if c in _TEXT_COLUMNS},
+    )
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+    df["variation_key"] = df["variation_key"].fillna("")
+    return df
+
+
+def _archived_df(table: str, start: date | None, end: date | None) -> pd.DataFrame:
+    import pandas as pd
+
+    frames = []
+    for key, meta in archived_months(table).items():
+        month = _parse_month(key)
+        if end is not None and month >= end:
+            continue
+        if start is not None and _add_months(month, 1) <= start:
+            continue
+        for name in meta["files"]:
+            frames.append(_read_archive_file(table_dir(table) / name, meta["format"]))
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def history(
+    table: str,
+    start: date | datetime | None = None,
+    end: date | datetime | None = None,
+    item_id: int | None = None,
+    include_archived: bool = False,
+    limit: int | None = None,
+) -> pd.DataFrame:
+    """
+    Linhas de auditoria com created_at em [start, end), mais recentes
+    primeiro. include_archived=True também lê os meses já arquivados.
+    """
+    import pandas as pd
+
+    _check_table(table)
+    where, params = [], []
+    if start is not None:
+        where.append("created_at >= %s")
+        params.append(start)
+    if end is not None:
+        where.append("created_at < %s")
+        params.append(end)
+    if item_id is not None:
+        where.append("item_id = %s")
+        params.append(int(item_id))
+    sql_where = f"WHERE {' AND '.join(where)}" if where else ""
+    sql_limit = f"LIMIT {int(limit)}" if limit else ""
+    df = connection.query_df(
+        f"SELECT * FROM {table} {sql_where} ORDER BY created_at DESC, id DESC {sql_limit};",
+        tuple(params) or None,
+    )
+    if not include_archived:
+        return df
+
+    archived = _archived_df(
+        table,
+        start.date() if isinstance(start, datetime) else start,
+        end.date() if isinstance(end, datetime) else end,
+    )
+    if archived.empty:
+        return df
+
+    archived["created_at"] = pd.to_datetime(archived["created_at"])
+    mask = pd.Series(True, index=archived.index)
+    if start is not None:
+        mask &= archived["created_at"] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= archived["created_at"] < pd.Timestamp(end)
+    if item_id is not None:
+        mask &= archived["item_id"] == int(item_id)
+    frames = [f for f in (df, archived.loc[mask]) if not f.empty]
+    if not frames:
+        return df
+    out = pd.concat(frames, ignore_index=True)
+    out["created_at"] = pd.to_datetime(out["created_at"])
+    out = out.sort_values(["created_at", "id"], ascending=False, ignore_index=True)
+    return out.head(limit) if limit else out
@@ -0,0 +1,267 @@
+# core/cache.py
+"""
+Cache em memória do core (substitui st.cache_data fora do Streamlit).
+
+Uma só abstração para todas as leituras cacheadas do processo:
+  - Cache: chaves explícitas, TTL, limite de entradas e de bytes,
+    despejo LRU e contadores (hits, misses, evictions, expirations, bytes);
+  - ttl_cache: decorator sobre Cache (chave = argumentos da chamada, ou
+    key=função).
+
+Os valores são compartilhados por todas as threads/sessões do processo e
+devolvidos SEM cópia: quem precisa alterar um DataFrame cacheado deve
+copiá-lo antes (os wrappers públicos do repository já fazem isso — uma
+cópia por chamada, nunca um segundo cache).
+
+Todo Cache criado fica registrado: clear_all() limpa tudo (exceto os com
+global_clear=False) e cache_stats() alimenta a página de Performance.
+"""
+from __future__ import annotations
+
+import functools
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from core.metrics import current_collector
+
+DEFAULT_MAXSIZE = 256
+
+_MISSING = object()
+
+_registry: list = []
+_registry_lock = threading.Lock()
+
+
+def estimate_bytes(value, _depth: int = 0) -> int:
+    """Tamanho aproximado em memória (DataFrame: memory_usage profundo)."""
+    memory_usage = getattr(value, "memory_usage", None)
+    if memory_usage is not None and hasattr(value, "columns"):
+        try:
+            return int(memory_usage(index=True, deep=True).sum())
+        except Exception:
+            pass
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    size = sys.getsizeof(value)
+    if _depth >= 4:
+        return size
+    if isinstance(value, dict):
+        size += sum(
+            estimate_bytes(k, _depth + 1) + estimate_bytes(v, _depth + 1)
+            for k, v in value.items()
+        )
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_bytes(v, _depth + 1) for v in value)
+    return size
+
+
+class Cache:
+    """
+    LRU com expiração. ttl: segundos, função sem argumentos que devolve os
+    segundos (lida a cada gravação — permite TTL vindo da config) ou None
+    (sem expiração). maxsize / max_bytes: limites (max_bytes também aceita
+    função, lida a cada gravação); o menos usado sai primeiro.
+    global_clear=False deixa o cache fora de clear_all() (quem tem chaves
+    versionadas e invalidação própria, ex.: specs de gráfico).
+
+    Corrida leitura x escrita: clear()/evict() incrementam a geração do
+    cache. Quem lê do banco anota a geração antes (generation) e grava com
+    set(..., generation=g): se houve invalidação no meio, o valor (talvez
+    anterior à escrita) é descartado em vez de ficar servido até o TTL.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl=None,
+        maxsize: int | None = DEFAULT_MAXSIZE,
+        max_bytes=None,
+        global_clear: bool = True,
+    ):
+        self.name = name
+        self.global_clear = global_clear
+        self._get_ttl = ttl if callable(ttl) else (lambda: ttl)
+        self._get_max_bytes = max_bytes if callable(max_bytes) else (lambda: max_bytes)
+        self.maxsize = maxsize
+        # chave -> (expira_em, valor, bytes)
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "stale_discards": 0,
+        }
+        with _registry_lock:
+            _registry.append(self)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def generation(self) -> int:
+        """Muda a cada clear()/evict(): anote antes de ler da fonte."""
+        return self._generation
+
+    def _drop(self, key) -> None:
+        _, _, nbytes = self._entries.pop(key)
+        self._bytes -= nbytes
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        collector = current_collector()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                self._drop(key)
+                self._counters["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._counters["misses"] += 1
+            else:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+        if collector is not None:
+            collector.add_cache(entry is not None)
+        return default if entry is None else entry[1]
+
+    def set(self, key, value, generation: int | None = None) -> None:
+        """Grava; com generation, só se não houve invalidação desde então."""
+        ttl = self._get_ttl()
+        expires_at = float("inf") if ttl is None else time.monotonic() + float(ttl)
+        nbytes = estimate_bytes(value)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                self._counters["stale_discards"] += 1
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (expires_at, value, nbytes)
+            self._bytes += nbytes
+            self._shrink()
+
+    def _shrink(self) -> None:
+        max_bytes = self._get_max_bytes()
+        # Mantém a entrada recém-gravada mesmo que sozinha passe de max_bytes
+        while len(self._entries) > 1 and (
+            (self.maxsize is not None and len(self._entries) > self.maxsize)
+            or (max_bytes is not None and self._bytes > max_bytes)
+        ):
+            self._drop(next(iter(self._entries)))
+            self._counters["evictions"] += 1
+
+    def get_or_set(self, key, build):
+        """Valor da chave; na falta, build() é chamado e o resultado guardado."""
+        generation = self._generation
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = build()
+            self.set(key, value, generation=generation)
+        return value
+
+    def evict(self, predicate) -> int:
+        """Remove as entradas cujas chaves satisfazem predicate(chave)."""
+        with self._lock:
+            # Leituras em andamento não sabem a chave que vão gravar: descarta todas
+            self._generation += 1
+            stale = [k for k in self._entries if predicate(k)]
+            for k in stale:
+                self._drop(k)
+            self._counters["invalidations"] += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._counters["invalidations"] += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = self._counters["hits"] + self._counters["misses"]
+            return {
+                "cache": self.name,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxsize": self.maxsize,
+                "max_bytes": self._get_max_bytes(),
+                **self._counters,
+                "hit_rate": self._counters["hits"] / calls if calls else 0.0,
+            }
+
+
+def _call_key(*args, **kwargs):
+    return (args, tuple(sorted(kwargs.items())))
+
+
+def ttl_cache(
+    ttl,
+    *,
+    maxsize: int | None = DEFAULT_MAXSIZE,
+    max_bytes=None,
+    key=None,
+    name: str | None = None,
+):
+    """
+    Decorator de cache (Cache) com expiração, chave = argumentos da chamada
+    (ou key(*args, **kwargs)). A função decorada ganha .cache, .clear(),
+    .evict(pred) e .stats(); sem key=, pred recebe só os argumentos
+    posicionais.
+    """
+
+    def decorator(func):
+        cache = Cache(
+            name or f"{func.__module__}.{func.__qualname__}",
+            ttl=ttl,
+            maxsize=maxsize,
+            max_bytes=max_bytes,
+        )
+        make_key = key or _call_key
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            k = make_key(*args, **kwargs)
+            # Geração anotada ANTES da leitura: uma escrita que invalide o
+            # cache durante func() impede gravar o resultado antigo
+            generation = cache.generation
+            value = cache.get(k, _MISSING)
+            if value is _MISSING:
+                value = func(*args, **kwargs)
+                cache.set(k, value, generation=generation)
+            return value
+
+        def evict(predicate) -> int:
+            if key is None:
+                return cache.evict(lambda k: predicate(k[0]))
+            return cache.evict(predicate)
+
+        wrapper.cache = cache
+        wrapper.clear = cache.clear
+        wrapper.evict = evict
+        wrapper.stats = cache.stats
+        return wrapper
+
+    return decorator
+
+
+def clear_all() -> None:
+    """Limpa todos os caches registrados, menos os criados com global_clear=False."""
+    with _registry_lock:
+        caches = [c for c in _registry if c.global_clear]
+    for cache in caches:
+        cache.clear()
+
+
+def cache_stats() -> list[dict]:
+    """Entradas, bytes, acertos, faltas e despejos de cada cache (diagnóstico)."""
+    with _registry_lock:
+        caches = list(_registry)
+    return [cache.stats() for cache in caches]
@@ -0,0 +1,330 @@
+# core/catalog.py
+"""
+Catálogo de itens compartilhado pelo processo (sem Streamlit).
+
+Os ~10 mil itens são carregados UMA vez por processo e ficam num objeto
+imutável lido por todas as sessões/páginas:
+  - ids: array int32 ordenado (busca de nome por id via searchsorted);
+  - names: nomes internados (sys.intern) na mesma ordem;
+  - norms: nomes normalizados (sem acento, minúsculos) para a busca;
+  - is_card: flag de carta ("carta" no nome).
+
+Fonte (seção [catalog] da config, chave source):
+  - "db"   (padrão): tabela items; se o banco falhar, cai para o arquivo;
+  - "file": snapshot binário de items.json (.cache/items_catalog.npz),
+            regenerado quando items.json muda.
+
+A versão da fonte é conferida no máximo a cada check_interval segundos
+(padrão 30); o catálogo só é reconstruído quando ela muda.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+
+from core.config import ROOT, get_section
+
+ITEMS_JSON_PATH = ROOT / "items.json"
+SNAPSHOT_PATH = ROOT / ".cache" / "items_catalog.npz"
+DEFAULT_CHECK_INTERVAL = 30.0
+
+_catalog: Catalog | None = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def normalize_text(txt: str) -> str:
+    """Remove acentos e deixa minúsculo (mesma regra da busca do Monitor)."""
+    if not isinstance(txt, str):
+        return ""
+    return (
+        unicodedata.normalize("NFKD", txt)
+        .encode("ASCII", "ignore")
+        .decode("utf-8")
+        .lower()
+    )
+
+
+class Catalog:
+    """
+    Catálogo imutável. Compartilhado entre sessões: não altere os
+    dicionários de item_list / cards_list.
+    """
+
+    __slots__ = (
+        "ids",
+        "names",
+        "norms",
+        "is_card",
+        "version",
+        "source",
+        "item_list",
+        "cards_list",
+        "card_id_to_name",
+    )
+
+    def __init__(self, ids, names, version: str, source: str):
+        order = np.argsort(np.asarray(ids, dtype=np.int64), kind="stable")
+        ids = np.asarray(ids, dtype=np.int32)[order]
+        names = tuple(sys.intern(str(names[i])) for i in order)
+        norms = tuple(sys.intern(normalize_text(n)) for n in names)
+        is_card = np.fromiter(
+            ("carta" in n.lower() for n in names), dtype=bool, count=len(names)
+        )
+        ids.setflags(write=False)
+        is_card.setflags(write=False)
+
+        # Item "canônico" por nome = menor id; lista ordenada por nome
+        first_by_name: dict[str, int] = {}
+        for i, name in enumerate(names):
+            first_by_name.setdefault(name, i)
+        item_list = tuple(
+            {"id": int(ids[i]), "name": names[i], "norm": norms[i]}
+            for _, i in sorted(first_by_name.items())
+        )
+
+        # Cartas: todas (não só as canônicas), em ordem de id
+        cards_list = tuple(
+            {"id": int(ids[i]), "name": names[i], "norm": norms[i]}
+            for i in np.flatnonzero(is_card)
+        )
+
+        for slot, value in (
+            ("ids", ids),
+            ("names", names),
+            ("norms", norms),
+            ("is_card", is_card),
+            ("version", version),
+            ("source", source),
+            ("item_list", item_list),
+            ("cards_list", cards_list),
+            ("card_id_to_name", {c["id"]: c["name"] for c in cards_list}),
+        ):
+            object.__setattr__(self, slot, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Catalog é imutável")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _index(self, item_id: int) -> int | None:
+        i = int(np.searchsorted(self.ids, item_id))
+        if i < len(self.ids) and self.ids[i] == item_id:
+            return i
+        return None
+
+    def __contains__(self, item_id) -> bool:
+        return self._index(int(item_id)) is not None
+
+    def name_of(self, item_id: int, default: str | None = None) -> str | None:
+        i = self._index(int(item_id))
+        return self.names[i] if i is not None else default
+
+    def to_df(self):
+        """DataFrame (id, name) — cópia nova, para telas que ainda usam pandas."""
+        import pandas as pd
+
+        return pd.DataFrame({"id": self.ids.astype("int64"), "name": self.names})
+
+
+# ======================================================
+#  Fonte: banco (tabela items)
+# ======================================================
+def _rows_version(rows) -> str:
+    """Hash md5 de "id:nome" por linha, em ordem de id (mesma conta do Postgres)."""
+    digest = hashlib.md5(
+        "\n".join(f"{i}:{n}" for i, n in sorted(rows)).encode("utf-8")
+    )
+    return f"db:{digest.hexdigest()}"
+
+
+def _db_version() -> str:
+    """
+    Versão = hash de (id, name): muda com qualquer inclusão ou renomeação,
+    inclusive as de mesmo tamanho (ex.: correção de acento). No Postgres o
+    hash sai do próprio banco; no SQLite (arquivo local) é feito aqui.
+    """
+    from core.connection import get_backend, get_connection
+
+    conn = get_connection(read_only=True)
+    try:
+        cur = conn.cursor()
+        if get_backend() == "sqlite":
+            cur.execute("SELECT id, name FROM items;")
+            version = _rows_version(cur.fetchall())
+        else:
+            cur.execute(
+                "SELECT md5(COALESCE(string_agg(id::text || ':' || name, "
+                "E'\\n' ORDER BY id), '')) FROM items;"
+            )
+            version = f"db:{cur.fetchone()[0]}"
+        cur.close()
+    finally:
+        conn.close()
+    return version
+
+
+def _load_from_db() -> Catalog:
+    from core.connection import get_connection
+
+    start = time.perf_counter()
+    conn = get_connection(read_only=True)
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT id, name FROM items;")
+        rows = cur.fetchall()
+        cur.close()
+    finally:
+        conn.close()
+
+    ids = [r[0] for r in rows]
+    names = [r[1] or "" for r in rows]
+    # Versão calculada dos próprios dados (mesma fórmula de _db_version)
+    version = _rows_version(zip(ids, names))
+    catalog = Catalog(ids, names, version=version, source="db")
+    elapsed = time.perf_counter() - start
+    print(f"[PERF][catalog] {elapsed:.3f}s  -> {len(catalog)} itens do banco")
+    return catalog
+
+
+# ======================================================
+#  Fonte: items.json + snapshot binário
+# ======================================================
+def _file_version(path: Path = ITEMS_JSON_PATH) -> str:
+    stat = os.stat(path)
+    return f"file:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def write_snapshot(
+    path: Path = ITEMS_JSON_PATH, snapshot: Path = SNAPSHOT_PATH
+) -> Path:
+    """
+    Converte items.json em snapshot compacto: ids int32 + nomes num único
+    blob UTF-8 com offsets. Escrita atômica (arquivo temporário + replace).
+    """
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+
+    ids = np.fromiter((int(k) for k in raw), dtype=np.int32, count=len(raw))
+    encoded = [str(v).encode("utf-8") for v in raw.values()]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    snapshot.parent.mkdir(parents=True, exist_ok=True)
+    tmp = snapshot.with_name(snapshot.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez(
+            f,
+            ids=ids,
+            offsets=offsets,
+            blob=blob,
+            version=np.array(_file_version(path)),
+        )
+    os.replace(tmp, snapshot)
+    return snapshot
+
+
+def _load_from_file(
+    path: Path = ITEMS_JSON_PATH, snapshot: Path = SNAPSHOT_PATH
+) -> Catalog:
+    start = time.perf_counter()
+    version = _file_version(path)
+
+    data = None
+    if snapshot.exists():
+        with np.load(snapshot) as npz:
+            if str(npz["version"]) == version:
+                data = {k: npz[k] for k in ("ids", "offsets", "blob")}
+    if data is None:
+        try:
+            write_snapshot(path, snapshot)
+        except OSError as e:
+            # Sem permissão de escrita: lê o JSON direto
+            print(f"[WARN] Não foi possível gravar o snapshot do catálogo: {e}")
+            with open(path, encoding="utf-8") as f:
+                raw = json.load(f)
+            return Catalog(
+                [int(k) for k in raw], list(raw.values()), version, "file"
+            )
+        with np.load(snapshot) as npz:
+            data = {k: npz[k] for k in ("ids", "offsets", "blob")}
+
+    blob = data["blob"].tobytes()
+    offsets = data["offsets"]
+    names = [
+        blob[offsets[i]:offsets[i + 1]].decode("utf-8")
+        for i in range(len(data["ids"]))
+    ]
+    catalog = Catalog(data["ids"], names, version=version, source="file")
+    elapsed = time.perf_counter() - start
+    print(f"[PERF][catalog] {elapsed:.3f}s  -> {len(catalog)} itens do snapshot")
+    return catalog
+
+
+# ======================================================
+#  Acesso compartilhado
+# ======================================================
+def _source() -> str:
+    return str(get_section("catalog").get("source", "db")).lower()
+
+
+def _current_version(source: str) -> str:
+    return _db_version() if source == "db" else _file_version()
+
+
+def _load(source: str) -> Catalog:
+    if source == "db":
+        try:
+            return _load_from_db()
+        except Exception as e:
+            print(f"[WARN] Catálogo do banco indisponível, usando items.json: {e}")
+    return _load_from_file()
+
+
+def get_catalog() -> Catalog:
+    """
+    Catálogo do processo. Reconstrói só quando a versão da fonte muda
+    (conferida no máximo a cada check_interval segundos).
+    """
+    global _catalog, _checked_at
+
+    interval = float(
+        get_section("catalog").get("check_interval", DEFAULT_CHECK_INTERVAL)
+    )
+    with _lock:
+        now = time.monotonic()
+        if _catalog is not None and now - _checked_at < interval:
+            return _catalog
+
+        source = _source()
+        if _catalog is not None and _catalog.source == source:
+            try:
+                if _current_version(source) == _catalog.version:
+                    _checked_at = now
+                    return _catalog
+            except Exception as e:
+                # Fonte fora do ar: segue com o catálogo atual
+                print(f"[WARN] Falha ao conferir versão do catálogo: {e}")
+                _checked_at = now
+                return _catalog
+
+        _catalog = _load(source)
+        _checked_at = now
+        return _catalog
+
+
+def invalidate_catalog() -> None:
+    """Força reconferir a versão na próxima chamada (ex.: após sync de itens)."""
+    global _checked_at
+    with _lock:
+        _checked_at = 0.0
@@ -0,0 +1,90 @@
+# core/config.py
+"""
+Configuração do core (sem Streamlit).
+
+Ordem de precedência, da mais fraca para a mais forte:
+  1. arquivo TOML — RAGNAROK_CONFIG ou, por padrão, .streamlit/secrets.toml
+     (mesmo formato do st.secrets: seções [postgres], [roles], ...)
+  2. provider registrado via set_config_provider (ex.: adaptador Streamlit)
+  3. variáveis de ambiente RAGNAROK_<SECAO>__<CHAVE>
+     (ex.: RAGNAROK_POSTGRES__HOST=db.local)
+
+Nada é lido no import: a config é montada no primeiro get_config().
+"""
+from __future__ import annotations
+
+import os
+import threading
+import tomllib
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_CONFIG_PATH = ROOT / ".streamlit" / "secrets.toml"
+ENV_PREFIX = "RAGNAROK_"
+
+_config: dict | None = None
+_provider = None
+_lock = threading.Lock()
+
+
+def set_config_provider(provider) -> None:
+    """
+    Registra uma função sem argumentos que devolve um dict de seções
+    (sobrepõe o arquivo). Usado pelo adaptador Streamlit com st.secrets.
+    """
+    global _provider, _config
+    with _lock:
+        _provider = provider
+        _config = None
+
+
+def reset_config() -> None:
+    """Descarta a config carregada (próximo get_config() relê tudo)."""
+    global _config
+    with _lock:
+        _config = None
+
+
+def _merge(base: dict, override: dict) -> dict:
+    out = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(out.get(key), dict):
+            out[key] = _merge(out[key], value)
+        else:
+            out[key] = value
+    return out
+
+
+def _load_file() -> dict:
+    path = Path(os.environ.get("RAGNAROK_CONFIG", DEFAULT_CONFIG_PATH))
+    if not path.exists():
+        return {}
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
+def _load_env() -> dict:
+    cfg: dict = {}
+    for name, value in os.environ.items():
+        if not name.startswith(ENV_PREFIX) or "__" not in name:
+            continue
+        section, key = name[len(ENV_PREFIX):].lower().split("__", 1)
+        cfg.setdefault(section, {})[key] = value
+    return cfg
+
+
+def get_config() -> dict:
+    """Config completa (dict de seções), montada uma vez por processo."""
+    global _config
+    with _lock:
+        if _config is None:
+            cfg = _load_file()
+            if _provider is not None:
+                cfg = _merge(cfg, dict(_provider()))
+            _config = _merge(cfg, _load_env())
+        return _config
+
+
+def get_section(name: str) -> dict:
+    """Uma seção da config ({} se não existir)."""
+    return dict(get_config().get(name, {}))
@@ -0,0 +1,392 @@
+# core/connection.py
+"""
+Conexões com o banco (sem Streamlit).
+
+Backend escolhido por [database] backend na config:
+  - "postgres" (padrão): psycopg2 / SQLAlchemy, credenciais em [postgres];
+  - "sqlite": arquivo local em modo WAL (core.sqlite_backend).
+
+Réplica de leitura (opcional, só Postgres): seção [postgres_replica] com as
+mesmas chaves de [postgres]. query_df lê da réplica; escritas, get_connection()
+e leituras com primary=True vão para o primário. A réplica é evitada quando:
+  - o atraso medido passa de [database] replica_max_lag segundos (padrão 5),
+    conferido no máximo a cada replica_check_interval segundos (padrão 10);
+  - houve escrita de dados neste processo (mark_write) há menos de
+    read_your_writes segundos (padrão 5) — quem acabou de salvar enxerga o
+    próprio dado; gravações de infraestrutura (auditoria, diagnóstico) não
+    contam;
+  - uma chave (ex.: os preços de um item) foi alterada por outro processo
+    há menos de read_your_writes segundos (mark_remote_write, via
+    core.notify): só quem lê essa chave com primary=read_primary(chave)
+    vai ao primário, o resto segue na réplica;
+  - a réplica falhou (fica de fora até a próxima conferência).
+
+Tempos, linhas, bytes, espera por conexão e erros de cada consulta vão
+para core.metrics; consultas lentas têm o plano capturado por
+core.diagnostics.
+
+Engine e drivers são criados/importados só no primeiro uso, então importar
+este módulo é barato (scripts e workers sobem em milissegundos).
+"""
+from __future__ import annotations
+
+import re
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from core import diagnostics, metrics
+from core.config import get_section
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+_engines: dict = {}
+_engine_lock = threading.Lock()
+_engine_listeners: list = []
+
+BACKENDS = ("postgres", "sqlite")
+PRIMARY = "postgres"
+REPLICA = "postgres_replica"
+
+_DATA_WRITE_RE = re.compile(r"\s*(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+
+_replica_state = {"checked_at": float("-inf"), "healthy": False, "lag": None}
+_last_write_at = float("-inf")
+_remote_writes: dict = {}  # chave -> instante da escrita notificada
+_replica_lock = threading.Lock()
+
+
+def get_backend() -> str:
+    """Backend configurado ("postgres" ou "sqlite")."""
+    backend = str(get_section("database").get("backend", "postgres")).lower()
+    if backend not in BACKENDS:
+        raise RuntimeError(f"Backend de banco desconhecido: {backend!r}")
+    return backend
+
+
+def get_db_config(role: str = PRIMARY) -> dict:
+    """Credenciais do Postgres (seção [postgres], ou [postgres_replica])."""
+    cfg = get_section(role)
+    if not cfg:
+        raise RuntimeError(
+            f"Config [{role}] não encontrada "
+            f"(secrets.toml, RAGNAROK_CONFIG ou RAGNAROK_{role.upper()}__*)."
+        )
+    return cfg
+
+
+def on_engine_created(callback) -> None:
+    """
+    Registra callback() chamado quando o primeiro engine do processo é
+    criado (ex.: subir o listener de NOTIFY só quando o banco for usado).
+    """
+    with _engine_lock:
+        if callback not in _engine_listeners:
+            _engine_listeners.append(callback)
+
+
+def get_engine(role: str = PRIMARY):
+    """
+    Cria o engine SQLAlchemy (primário ou réplica) no primeiro uso
+    apenas uma vez por processo (evita recriar a cada rerun).
+    """
+    with _engine_lock:
+        engine = _engines.get(role)
+        if engine is not None:
+            return engine
+        first = not _engines
+        from sqlalchemy import create_engine
+        from sqlalchemy.engine import URL
+
+        cfg = get_db_config(role)
+        db_url = URL.create(
+            drivername="postgresql+psycopg2",
+            username=cfg["user"],
+            password=cfg["password"],
+            host=cfg["host"],
+            port=cfg["port"],
+            database=cfg["database"],
+        )
+        engine = create_engine(db_url, pool_pre_ping=True)
+        _engines[role] = engine
+        listeners = list(_engine_listeners) if first else []
+
+    for callback in listeners:
+        try:
+            callback()
+        except Exception as e:
+            print(f"[WARN] Falha no listener de criação do engine: {e}")
+    return engine
+
+
+def _connect_postgres(role: str):
+    import psycopg2
+
+    cfg = get_db_config(role)
+    return psycopg2.connect(
+        user=cfg["user"],
+        password=cfg["password"],
+        host=cfg["host"],
+        port=cfg["port"],
+        dbname=cfg["database"],
+    )
+
+
+def get_connection(read_only: bool = False):
+    """
+    Abre uma conexão nova (o chamador fecha): psycopg2, ou o adaptador
+    do SQLite com a mesma interface (cursor/commit/rollback/close).
+
+    Sem read_only, a conexão é do primário; com read_only=True pode ser
+    da réplica, se ela estiver disponível. Abrir conexão NÃO conta como
+    escrita: quem grava dados do usuário chama mark_write() depois do
+    commit (execute / execute_many já fazem isso). Conexões de
+    infraestrutura (auditoria, diagnóstico, health checks) não chamam,
+    então não desviam as leituras da réplica.
+    """
+    if get_backend() == "sqlite":
+        from core import sqlite_backend
+
+        return sqlite_backend.connect()
+
+    if read_only and _use_replica():
+        try:
+            return _connect_postgres(REPLICA)
+        except Exception as e:
+            _replica_failed(e)
+    return _connect_postgres(PRIMARY)
+
+
+# ======================================================
+#  Roteamento leitura -> réplica
+# ======================================================
+def _replica_settings() -> tuple[float, float, float]:
+    cfg = get_section("database")
+    return (
+        float(cfg.get("replica_max_lag", 5)),
+        float(cfg.get("replica_check_interval", 10)),
+        float(cfg.get("read_your_writes", 5)),
+    )
+
+
+def mark_write() -> None:
+    """Registra uma escrita: leituras vão ao primário pela janela configurada."""
+    global _last_write_at
+    with _replica_lock:
+        _last_write_at = time.monotonic()
+
+
+def mark_remote_write(*keys) -> None:
+    """
+    Escrita de outro processo (NOTIFY) nestas chaves: só as leituras delas
+    vão ao primário pela janela read_your_writes (ver read_primary).
+    """
+    now = time.monotonic()
+    ryw_window = _replica_settings()[2]
+    with _replica_lock:
+        for key, at in list(_remote_writes.items()):
+            if now - at >= ryw_window:
+                del _remote_writes[key]
+        for key in keys:
+            _remote_writes[key] = now
+
+
+def read_primary(key) -> bool:
+    """True se outro processo alterou key há menos de read_your_writes segundos."""
+    with _replica_lock:
+        at = _remote_writes.get(key)
+    if at is None:
+        return False
+    return time.monotonic() - at < _replica_settings()[2]
+
+
+def _measure_replica_lag() -> float | None:
+    """Atraso de replay da réplica em segundos (0 se já aplicou tudo)."""
+    conn = _connect_postgres(REPLICA)
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT CASE
+                WHEN NOT pg_is_in_recovery() THEN 0
+                WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE EXTRACT(EPOCH FROM NOW() - pg_last_xact_replay_timestamp())
+            END;
+            """
+        )
+        row = cur.fetchone()
+        cur.close()
+    finally:
+        conn.close()
+    return float(row[0]) if row and row[0] is not None else None
+
+
+def _replica_failed(error: Exception) -> None:
+    print(f"[WARN] Réplica indisponível, usando o primário: {error}")
+    with _replica_lock:
+        _replica_state.update(healthy=False, checked_at=time.monotonic())
+
+
+def _use_replica() -> bool:
+    """True se a leitura pode ir para a réplica agora."""
+    if not get_section(REPLICA):
+        return False
+
+    max_lag, check_interval, ryw_window = _replica_settings()
+    now = time.monotonic()
+    with _replica_lock:
+        if now - _last_write_at < ryw_window:
+            return False
+        if now - _replica_state["checked_at"] < check_interval:
+            return _replica_state["healthy"]
+        # Marca antes de medir: outras threads seguem com o estado atual
+        _replica_state["checked_at"] = now
+
+    try:
+        lag = _measure_replica_lag()
+    except Exception as e:
+        _replica_failed(e)
+        return False
+
+    healthy = lag is not None and lag <= max_lag
+    if not healthy:
+        print(f"[WARN] Réplica atrasada ({lag}s > {max_lag}s), lendo do primário.")
+    with _replica_lock:
+        _replica_state.update(healthy=healthy, lag=lag)
+    return healthy
+
+
+def replica_status() -> dict:
+    """Estado do roteamento (para diagnóstico)."""
+    with _replica_lock:
+        return {
+            "configured": bool(get_section(REPLICA)),
+            "healthy": _replica_state["healthy"],
+            "lag_seconds": _replica_state["lag"],
+            "seconds_since_write": time.monotonic() - _last_write_at,
+        }
+
+
+# ======================================================
+#  Execução (tempos vão para core.metrics)
+# ======================================================
+def _is_data_write(sql: str) -> bool:
+    """INSERT/UPDATE/DELETE (DDL de init_db e triggers não contam como escrita)."""
+    return _DATA_WRITE_RE.match(sql) is not None
+
+
+def execute(query, params=None):
+    """Executa INSERT/UPDATE/DELETE (uma transação por chamada, no primário)."""
+    start = time.perf_counter()
+    rows = 0
+    wait = 0.0
+    try:
+        conn = get_connection()
+        wait = time.perf_counter() - start
+        try:
+            cur = conn.cursor()
+            cur.execute(query, params or ())
+            rows = max(cur.rowcount or 0, 0)
+            conn.commit()
+            cur.close()
+        finally:
+            conn.close()
+    except Exception as e:
+        metrics.record("execute", query, time.perf_counter() - start, wait=wait, error=e)
+        raise
+    if _is_data_write(query):
+        mark_write()
+    elapsed = time.perf_counter() - start
+    metrics.record("execute", query, elapsed, rows=rows, wait=wait)
+    diagnostics.maybe_capture("execute", query, params, elapsed, PRIMARY)
+
+
+def execute_many(query, rows) -> int:
+    """
+    Escrita em lote: executemany numa única transação (um commit/fsync
+    para o lote inteiro). Retorna a quantidade de linhas enviadas.
+    """
+    rows = list(rows)
+    start = time.perf_counter()
+    wait = 0.0
+    try:
+        conn = get_connection()
+        wait = time.perf_counter() - start
+        try:
+            cur = conn.cursor()
+            cur.executemany(query, rows)
+            conn.commit()
+            cur.close()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    except Exception as e:
+        metrics.record("execute_many", query, time.perf_counter() - start, wait=wait, error=e)
+        raise
+    mark_write()
+    metrics.record(
+        "execute_many", query, time.perf_counter() - start, rows=len(rows), wait=wait
+    )
+    return len(rows)
+
+
+def _read_sql(engine, sql, params) -> tuple[pd.DataFrame, float]:
+    """read_sql com o checkout do pool medido à parte: (df, espera)."""
+    import pandas as pd
+
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        wait = time.perf_counter() - start
+        return pd.read_sql(sql, conn, params=params), wait
+
+
+def query_df(sql, params=None, primary: bool = False) -> pd.DataFrame:
+    """
+    Executa SELECT e retorna DataFrame (SQLAlchemy no Postgres).
+    Vai para a réplica quando possível; primary=True força o primário
+    (leituras que precisam enxergar uma escrita recente).
+    """
+    import pandas as pd
+
+    start = time.perf_counter()
+    replica = False
+    wait = 0.0
+    try:
+        if get_backend() == "sqlite":
+            from core import sqlite_backend
+
+            raw = sqlite_backend.connect_raw()
+            wait = time.perf_counter() - start
+            try:
+                df = pd.read_sql(sqlite_backend.translate(sql), raw, params=params)
+            finally:
+                raw.close()
+        elif not primary and _use_replica():
+            try:
+                df, wait = _read_sql(get_engine(REPLICA), sql, params)
+                replica = True
+            except Exception as e:
+                _replica_failed(e)
+                df, wait = _read_sql(get_engine(PRIMARY), sql, params)
+        else:
+            df, wait = _read_sql(get_engine(PRIMARY), sql, params)
+    except Exception as e:
+        metrics.record("query_df", sql, time.perf_counter() - start, wait=wait, error=e)
+        raise
+    elapsed = time.perf_counter() - start
+    metrics.record(
+        "query_df",
+        sql,
+        elapsed,
+        rows=len(df),
+        nbytes=metrics.dataframe_bytes(df),
+        wait=wait,
+        replica=replica,
+    )
+    diagnostics.maybe_capture(
+        "query_df", sql, params, elapsed, REPLICA if replica else PRIMARY
+    )
+    return df
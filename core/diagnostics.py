@@ -0,0 +1,372 @@
+# core/diagnostics.py
+"""
+Captura automática do plano de consultas lentas (sem Streamlit).
+
+Quando query_df / execute passam de [diagnostics] slow_query_ms (padrão
+1000), a consulta entra numa fila e uma thread de fundo roda:
+  - Postgres: EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) numa transação que
+    sempre termina em ROLLBACK (UPDATE/DELETE não alteram nada), com
+    statement_timeout de [diagnostics] explain_timeout_ms (padrão 15000),
+    no mesmo servidor (primário/réplica) em que a consulta rodou;
+  - SQLite: EXPLAIN QUERY PLAN (o SQLite não tem ANALYZE por consulta).
+
+O resultado vai para a tabela query_plans: SQL, impressão digital
+(core.metrics), formato dos parâmetros (tipos/tamanhos, nunca os valores),
+duração original, plano e as tabelas lidas por scan sequencial.
+
+Para não virar carga extra:
+  - amostragem: [diagnostics] sample_rate (padrão 1.0 = toda lenta);
+  - no máximo um plano por consulta a cada min_interval segundos (900);
+  - no máximo max_per_hour planos por processo (padrão 20);
+  - fila pequena: se a thread estiver ocupada, a captura é descartada;
+  - só SELECT / WITH / UPDATE / DELETE (INSERT ... VALUES e DDL não têm
+    plano interessante).
+
+[diagnostics] enabled = false desliga.
+"""
+from __future__ import annotations
+
+import json
+import queue
+import random
+import threading
+import time
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING
+
+from core import connection, metrics
+from core.config import get_section
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_SLOW_QUERY_MS = 1000.0
+DEFAULT_SAMPLE_RATE = 1.0
+DEFAULT_MIN_INTERVAL = 900.0
+DEFAULT_MAX_PER_HOUR = 20
+DEFAULT_EXPLAIN_TIMEOUT_MS = 15000
+
+_EXPLAINABLE = ("select", "with", "update", "delete")
+_MAX_SQL_CHARS = 20000
+
+_queue: queue.Queue = queue.Queue(maxsize=8)
+_worker: threading.Thread | None = None
+_lock = threading.Lock()
+_last_capture: dict[str, float] = {}
+_recent: deque = deque()
+_table_ready: set[str] = set()
+
+_DDL = {
+    "postgres": """
+    CREATE TABLE IF NOT EXISTS query_plans (
+        id            SERIAL PRIMARY KEY,
+        fingerprint   TEXT NOT NULL,
+        kind          TEXT NOT NULL,
+        query_text    TEXT NOT NULL,
+        params_shape  TEXT,
+        duration_ms   DOUBLE PRECISION NOT NULL,
+        explain_ms    DOUBLE PRECISION,
+        backend       TEXT NOT NULL,
+        role          TEXT,
+        plan          TEXT NOT NULL,
+        seq_scans     TEXT,
+        created_at    TIMESTAMP NOT NULL DEFAULT NOW()
+    );
+    CREATE INDEX IF NOT EXISTS idx_query_plans_created
+        ON query_plans (created_at DESC);
+    """,
+    "sqlite": """
+    CREATE TABLE IF NOT EXISTS query_plans (
+        id            INTEGER PRIMARY KEY AUTOINCREMENT,
+        fingerprint   TEXT NOT NULL,
+        kind          TEXT NOT NULL,
+        query_text    TEXT NOT NULL,
+        params_shape  TEXT,
+        duration_ms   REAL NOT NULL,
+        explain_ms    REAL,
+        backend       TEXT NOT NULL,
+        role          TEXT,
+        plan          TEXT NOT NULL,
+        seq_scans     TEXT,
+        created_at    TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime'))
+    );
+    CREATE INDEX IF NOT EXISTS idx_query_plans_created
+        ON query_plans (created_at DESC);
+    """,
+}
+
+
+def settings() -> dict:
+    cfg = get_section("diagnostics")
+    return {
+        "enabled": str(cfg.get("enabled", True)).lower() not in ("false", "0", "no"),
+        "slow_query_ms": float(cfg.get("slow_query_ms", DEFAULT_SLOW_QUERY_MS)),
+        "sample_rate": float(cfg.get("sample_rate", DEFAULT_SAMPLE_RATE)),
+        "min_interval": float(cfg.get("min_interval", DEFAULT_MIN_INTERVAL)),
+        "max_per_hour": int(cfg.get("max_per_hour", DEFAULT_MAX_PER_HOUR)),
+        "explain_timeout_ms": int(
+            cfg.get("explain_timeout_ms", DEFAULT_EXPLAIN_TIMEOUT_MS)
+        ),
+    }
+
+
+def _create_table(cur, backend: str) -> None:
+    # Um statement por vez (o sqlite3 não aceita vários num execute)
+    for stmt in _DDL[backend].split(";"):
+        if stmt.strip():
+            cur.execute(stmt)
+    _table_ready.add(backend)
+
+
+def init_table() -> None:
+    """Cria query_plans no backend atual (idempotente)."""
+    backend = connection.get_backend()
+    conn = connection.get_connection()
+    try:
+        cur = conn.cursor()
+        _create_table(cur, backend)
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+
+
+def _ensure_table() -> None:
+    if connection.get_backend() not in _table_ready:
+        init_table()
+
+
+def params_shape(params) -> list | dict | None:
+    """Tipos (e tamanhos) dos parâmetros, sem os valores."""
+
+    def shape(value):
+        if value is None:
+            return "null"
+        if isinstance(value, bool):
+            return "bool"
+        if isinstance(value, str):
+            return f"str({len(value)})"
+        if isinstance(value, (list, tuple, set)):
+            return f"{type(value).__name__}[{len(value)}]"
+        if isinstance(value, datetime):
+            return "timestamp"
+        if isinstance(value, date):
+            return "date"
+        return type(value).__name__
+
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {k: shape(v) for k, v in params.items()}
+    return [shape(v) for v in params]
+
+
+# ======================================================
+#  Gatilho (chamado por core.connection após cada consulta)
+# ======================================================
+def maybe_capture(kind: str, sql: str, params, seconds: float, role: str) -> bool:
+    """
+    Enfileira a captura do plano se a consulta foi lenta e os limites
+    permitem. Barato no caminho comum (uma comparação).
+    """
+    cfg = settings()
+    if not cfg["enabled"] or seconds * 1000 < cfg["slow_query_ms"]:
+        return False
+    if sql.lstrip().split(None, 1)[0].lower() not in _EXPLAINABLE:
+        return False
+    if random.random() >= cfg["sample_rate"]:
+        return False
+
+    fp, _ = metrics.fingerprint(sql)
+    now = time.monotonic()
+    with _lock:
+        if now - _last_capture.get(fp, float("-inf")) < cfg["min_interval"]:
+            return False
+        while _recent and now - _recent[0] > 3600:
+            _recent.popleft()
+        if len(_recent) >= cfg["max_per_hour"]:
+            return False
+        try:
+            _queue.put_nowait((fp, kind, sql, params, seconds, role))
+        except queue.Full:
+            return False
+        _last_capture[fp] = now
+        _recent.append(now)
+    _ensure_worker()
+    return True
+
+
+def _ensure_worker() -> None:
+    global _worker
+    with _lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        _worker = threading.Thread(
+            target=_worker_loop, name="core-diagnostics", daemon=True
+        )
+        _worker.start()
+
+
+def _worker_loop() -> None:
+    while True:
+        job = _queue.get()
+        try:
+            _capture(*job)
+        except Exception as e:
+            print(f"[WARN] Falha ao capturar plano da consulta lenta: {e}")
+        finally:
+            _queue.task_done()
+
+
+# ======================================================
+#  EXPLAIN
+# ======================================================
+def _seq_scans_postgres(plan: dict) -> list[str]:
+    found = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if node.get("Node Type") == "Seq Scan":
+            found.append(node.get("Relation Name", "?"))
+        stack.extend(node.get("Plans", []))
+    return sorted(set(found))
+
+
+def _explain_postgres(sql: str, params, role: str, timeout_ms: int) -> tuple[str, list, float | None]:
+    conn = connection._connect_postgres(role)
+    try:
+        cur = conn.cursor()
+        # psycopg2 já abre a transação; o ROLLBACK desfaz qualquer escrita
+        cur.execute(f"SET LOCAL statement_timeout = {int(timeout_ms)};")
+        cur.execute(
+            "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql.strip().rstrip(";"),
+            params or None,
+        )
+        raw = cur.fetchone()[0]
+        cur.close()
+    finally:
+        conn.rollback()
+        conn.close()
+
+    doc = raw if isinstance(raw, list) else json.loads(raw)
+    top = doc[0]
+    return (
+        json.dumps(doc, indent=2),
+        _seq_scans_postgres(top["Plan"]),
+        top.get("Execution Time"),
+    )
+
+
+def _explain_sqlite(sql: str, params) -> tuple[str, list, float | None]:
+    from core import sqlite_backend
+
+    raw = sqlite_backend.connect_raw()
+    try:
+        rows = raw.execute(
+            "EXPLAIN QUERY PLAN " + sqlite_backend.translate(sql.strip().rstrip(";")),
+            params or (),
+        ).fetchall()
+    finally:
+        raw.close()
+
+    # (id, parent, notused, detail) -> árvore indentada
+    depth = {0: -1}
+    lines = []
+    seq = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+        parts = detail.split()
+        if parts[:1] == ["SCAN"] and "USING" not in parts and len(parts) > 1:
+            seq.append(parts[1])
+    return "\n".join(lines), sorted(set(seq)), None
+
+
+def _capture(fp: str, kind: str, sql: str, params, seconds: float, role: str) -> None:
+    backend = connection.get_backend()
+    if backend == "sqlite":
+        plan, seq_scans, explain_ms = _explain_sqlite(sql, params)
+    else:
+        timeout_ms = settings()["explain_timeout_ms"]
+        plan, seq_scans, explain_ms = _explain_postgres(sql, params, role, timeout_ms)
+
+    _save(
+        {
+            "fingerprint": fp,
+            "kind": kind,
+            "query_text": sql.strip()[:_MAX_SQL_CHARS],
+            "params_shape": json.dumps(params_shape(params)),
+            "duration_ms": seconds * 1000,
+            "explain_ms": explain_ms,
+            "backend": backend,
+            "role": role if backend == "postgres" else None,
+            "plan": plan,
+            "seq_scans": ",".join(seq_scans) or None,
+        }
+    )
+    tables = f" (seq scan: {', '.join(seq_scans)})" if seq_scans else ""
+    print(f"[INFO] Plano capturado para consulta lenta {fp}{tables}")
+
+
+def _save(row: dict) -> None:
+    # Conexão direta (sem execute): a gravação do diagnóstico não entra
+    # nas métricas nem dispara outra captura
+    backend = connection.get_backend()
+    conn = connection.get_connection()
+    try:
+        cur = conn.cursor()
+        if backend not in _table_ready:
+            _create_table(cur, backend)
+        columns = ", ".join(row)
+        placeholders = ", ".join(["%s"] * len(row))
+        cur.execute(
+            f"INSERT INTO query_plans ({columns}) VALUES ({placeholders});",
+            tuple(row.values()),
+        )
+        conn.commit()
+        cur.close()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+# ======================================================
+#  Leitura (página de diagnóstico)
+# ======================================================
+def recent_plans(limit: int = 200, only_seq_scans: bool = False) -> pd.DataFrame:
+    """Últimos planos capturados (sem o texto do plano)."""
+    _ensure_table()
+    where = "WHERE seq_scans IS NOT NULL" if only_seq_scans else ""
+    return connection.query_df(
+        f"""
+        SELECT id, created_at, fingerprint, kind, duration_ms, explain_ms,
+               backend, role, seq_scans, params_shape, query_text
+        FROM query_plans
+        {where}
+        ORDER BY created_at DESC, id DESC
+        LIMIT %s;
+        """,
+        (int(limit),),
+    )
+
+
+def get_plan(plan_id: int) -> dict | None:
+    _ensure_table()
+    df = connection.query_df(
+        "SELECT * FROM query_plans WHERE id = %s;", (int(plan_id),)
+    )
+    if df.empty:
+        return None
+    return df.iloc[0].to_dict()
+
+
+def delete_plans_before(days: int) -> None:
+    """Apaga planos com mais de `days` dias."""
+    _ensure_table()
+    connection.execute(
+        "DELETE FROM query_plans WHERE created_at < %s;",
+        (datetime.now() - timedelta(days=days),),
+    )
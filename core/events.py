@@ -0,0 +1,61 @@
+# core/events.py
+"""
+Eventos de escrita por variação (sem Streamlit).
+
+Cada escrita em prices incrementa a versão de (item_id, variation_key)
+e avisa quem se inscreveu (ex.: cache de gráficos), para evitar
+derivados antigos sem depender só de TTL.
+"""
+from __future__ import annotations
+
+import threading
+
+_data_versions: dict[tuple[int, str], int] = {}
+_variation_listeners: list = []
+_versions_lock = threading.Lock()
+
+
+def _canonical_variation_keys(variation_key: str | None) -> set[str]:
+    """
+    Chaves normalizadas (como o Monitor enxerga) afetadas por uma escrita.
+    '' vira 'base'; 'r0' antigo pode ser 'base' ou uma variação própria.
+    """
+    vk = variation_key or ""
+    if vk in ("", "base"):
+        return {"base"}
+    if vk == "r0":
+        return {"r0", "base"}
+    return {vk}
+
+
+def get_data_version(item_id: int, variation_key: str) -> int:
+    """Versão atual dos preços de (item_id, variation_key normalizada) neste processo."""
+    with _versions_lock:
+        return _data_versions.get((int(item_id), variation_key or "base"), 0)
+
+
+def on_variation_change(callback) -> None:
+    """
+    Registra callback(item_id, variation_key) chamado após cada escrita
+    de preço daquela variação (variation_key já normalizada).
+    """
+    with _versions_lock:
+        if callback not in _variation_listeners:
+            _variation_listeners.append(callback)
+
+
+def notify_variation_change(item_id: int, variation_key: str | None) -> None:
+    """Incrementa a versão da variação e dispara os callbacks inscritos."""
+    keys = _canonical_variation_keys(variation_key)
+    with _versions_lock:
+        for vk in keys:
+            k = (int(item_id), vk)
+            _data_versions[k] = _data_versions.get(k, 0) + 1
+        listeners = list(_variation_listeners)
+
+    for vk in keys:
+        for callback in listeners:
+            try:
+                callback(int(item_id), vk)
+            except Exception as e:
+                print(f"[WARN] Falha no listener de variação: {e}")
@@ -0,0 +1,50 @@
+# core/locks.py
+"""
+Lock exclusivo entre processos do mesmo host (sem Streamlit).
+
+Usado onde vários servidores Streamlit na mesma máquina dividem arquivos:
+a publicação do snapshot (core.snapshot) e o spool da auditoria
+(core.audit). flock no arquivo de lock; onde não há fcntl, criação
+exclusiva do arquivo (O_EXCL), com limpeza de lock abandonado.
+"""
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+
+
+class HostLock:
+    """Lock exclusivo entre processos (flock; O_EXCL onde não há fcntl)."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            import fcntl
+        except ImportError:
+            while True:
+                try:
+                    self._fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_RDWR)
+                    return self
+                except FileExistsError:
+                    # Lock abandonado (processo morreu no meio)
+                    if time.time() - self.path.stat().st_mtime > 300:
+                        self.path.unlink(missing_ok=True)
+                    time.sleep(0.05)
+        self._fd = os.open(self.path, os.O_CREAT | os.O_RDWR)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            import fcntl
+
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+        except ImportError:
+            os.close(self._fd)
+            self.path.unlink(missing_ok=True)
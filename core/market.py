@@ -0,0 +1,92 @@
+# core/market.py
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+# pandas só é importado quando um cálculo roda (import leve para quem só
+# precisa das regras / limiares)
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Limiares da regra de decisão (também usados no SQL da tabela de mercado)
+BUY_THRESHOLD = -0.05
+SELL_THRESHOLD = 0.10
+
+
+def status_from_variation(variacao: float) -> str:
+    """
+    Regra de decisão baseada na variação %:
+    - <= -5%  → Comprar
+    - >= +10% → Vender
+    - Caso contrário → Neutro
+    """
+    if variacao <= BUY_THRESHOLD:
+        return "Comprar"
+    elif variacao >= SELL_THRESHOLD:
+        return "Vender"
+    else:
+        return "Neutro"
+
+
+def summarize_last_prices(last_prices) -> dict:
+    """
+    Calcula média, variação % e status a partir dos últimos preços
+    (em ordem cronológica, o último elemento é o preço atual).
+
+    Usada por compute_summary e pelo resumo de UMA variação
+    (core.repository.get_summary_row), sem precisar carregar o mercado todo.
+    """
+    import pandas as pd
+
+    last_prices = pd.Series(last_prices, dtype="float64").tail(5)
+    media5 = last_prices.mean()
+    last_price = last_prices.iloc[-1]
+
+    if media5 > 0:
+        variacao = last_price / media5 - 1
+    else:
+        variacao = 0.0
+
+    return {
+        "Último preço (zeny)": last_price,
+        "Média últimos 5": media5,
+        "Variação % vs média 5": variacao,
+        "Status": status_from_variation(variacao),
+    }
+
+
+def compute_summary(df_prices: pd.DataFrame) -> pd.DataFrame:
+    """
+    Gera um resumo do mercado a partir de um DataFrame de preços.
+
+    df_prices deve ter colunas:
+      - item_id
+      - item
+      - date
+      - price_zeny
+    """
+    import pandas as pd
+
+    if df_prices.empty:
+        return pd.DataFrame()
+
+    df = df_prices.copy()
+    df["date"] = pd.to_datetime(df["date"])
+    df = df.sort_values(["item_id", "date"])
+
+    summaries = []
+
+    for item_id, group in df.groupby("item_id"):
+        group = group.sort_values("date")
+        last_row = group.iloc[-1]
+
+        summaries.append(
+            {
+                "Item": last_row["item"],
+                "Última data": last_row["date"].date(),
+                **summarize_last_prices(group["price_zeny"]),
+            }
+        )
+
+    df_sum = pd.DataFrame(summaries).sort_values("Item")
+    return df_sum
@@ -0,0 +1,354 @@
+# core/metrics.py
+"""
+Métricas de consultas em memória (por processo, sem Streamlit).
+
+Cada execute / execute_many / query_df registra, agrupado pela "impressão
+digital" do SQL (literais trocados por ?, espaços normalizados):
+  - histograma de latência (buckets log-espaçados, ~12% de erro relativo
+    no p50/p95/p99, memória fixa por consulta);
+  - linhas devolvidas/afetadas e bytes do resultado (memória do DataFrame);
+  - espera para obter conexão (checkout do pool SQLAlchemy, ou o connect
+    do psycopg2/SQLite);
+  - erros, e quantas leituras foram para a réplica.
+
+Leitura: snapshot() (dict pronto para JSON) e summary_df() (página admin
+"Performance"). Exportação: export_json() grava
+<[metrics] dir>/metrics-<pid>.json; com [metrics] export_interval > 0
+(padrão 30s) isso acontece sozinho durante o uso e na saída do processo.
+
+collect() abre um coletor no contexto atual (thread / contextvars): as
+consultas e os acessos a cache feitos dentro dele são somados ali — é o que
+o cronômetro de seções das páginas (ui.profiling) usa para "DB calls e
+cache hits deste rerun".
+
+Consultas mais lentas que [metrics] log_slow_ms (padrão 500) ainda vão
+para o stdout como [PERF], para quem acompanha o log.
+"""
+from __future__ import annotations
+
+import atexit
+import bisect
+import contextvars
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from core.config import ROOT, get_section
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_DIR = ROOT / ".cache" / "metrics"
+DEFAULT_EXPORT_INTERVAL = 30.0
+DEFAULT_LOG_SLOW_MS = 500.0
+
+# Limites superiores dos buckets (segundos): 100µs .. ~120s, fator 1.25
+_BUCKETS = tuple(0.0001 * 1.25**i for i in range(64))
+
+_MAX_FINGERPRINTS = 500
+
+_stats: dict = {}
+_lock = threading.Lock()
+_started_at = time.time()
+_exported_at = time.monotonic()
+
+
+# ======================================================
+#  Impressão digital do SQL
+# ======================================================
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_PARAM_RE = re.compile(r"%s|\?|\$\d+")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """SQL sem comentários e literais, em uma linha (IN (?, ?, ...) -> IN (?))."""
+    text = _COMMENT_RE.sub(" ", sql)
+    text = _STRING_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    text = _PARAM_RE.sub("?", text)
+    text = _IN_LIST_RE.sub("(?)", text)
+    return _SPACE_RE.sub(" ", text).strip().rstrip(";").strip()
+
+
+def fingerprint(sql: str) -> tuple[str, str]:
+    """(id curto, SQL normalizado) da consulta."""
+    normalized = normalize_sql(sql)
+    digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=6).hexdigest()
+    return digest, normalized
+
+
+# ======================================================
+#  Histograma
+# ======================================================
+class Histogram:
+    """Contagens por bucket de latência; percentis por interpolação."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank:
+                low = _BUCKETS[i - 1] if i > 0 else 0.0
+                high = _BUCKETS[i] if i < len(_BUCKETS) else self.max
+                value = low + (high - low) * (rank - seen) / n
+                return min(value, self.max)
+            seen += n
+        return self.max
+
+
+class _QueryStats:
+    __slots__ = (
+        "sql", "kind", "latency", "wait", "rows", "bytes", "errors",
+        "replica", "last_error", "last_at",
+    )
+
+    def __init__(self, sql: str, kind: str):
+        self.sql = sql
+        self.kind = kind
+        self.latency = Histogram()
+        self.wait = Histogram()
+        self.rows = 0
+        self.bytes = 0
+        self.errors = 0
+        self.replica = 0
+        self.last_error = None
+        self.last_at = 0.0
+
+
+# ======================================================
+#  Coletor por contexto (um rerun, uma seção...)
+# ======================================================
+class Collector:
+    """Contadores de uma unidade de trabalho; somados de qualquer thread."""
+
+    __slots__ = ("db_calls", "db_seconds", "db_rows", "cache_hits", "cache_misses", "_lock")
+
+    def __init__(self):
+        self.db_calls = 0
+        self.db_seconds = 0.0
+        self.db_rows = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._lock = threading.Lock()
+
+    def add_query(self, seconds: float, rows: int) -> None:
+        with self._lock:
+            self.db_calls += 1
+            self.db_seconds += seconds
+            self.db_rows += rows
+
+    def add_cache(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+
+    def totals(self) -> dict:
+        with self._lock:
+            return {
+                "db_calls": self.db_calls,
+                "db_ms": self.db_seconds * 1000,
+                "db_rows": self.db_rows,
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+            }
+
+
+_collector: contextvars.ContextVar = contextvars.ContextVar(
+    "core_metrics_collector", default=None
+)
+
+
+@contextmanager
+def collect():
+    """Conta consultas / acessos a cache feitos dentro do bloco (neste contexto)."""
+    collector = Collector()
+    token = _collector.set(collector)
+    try:
+        yield collector
+    finally:
+        _collector.reset(token)
+
+
+def current_collector() -> Collector | None:
+    return _collector.get()
+
+
+# ======================================================
+#  Registro
+# ======================================================
+def record(
+    kind: str,
+    sql: str,
+    seconds: float,
+    *,
+    rows: int = 0,
+    nbytes: int = 0,
+    wait: float = 0.0,
+    error: Exception | None = None,
+    replica: bool = False,
+) -> None:
+    """Registra uma execução (chamado por core.connection / core.aio)."""
+    fp, normalized = fingerprint(sql)
+    with _lock:
+        stats = _stats.get(fp)
+        if stats is None:
+            if len(_stats) >= _MAX_FINGERPRINTS:
+                # SQL montado dinamicamente demais: agrupa o excedente
+                fp, normalized = "overflow", "(outras consultas)"
+                stats = _stats.get(fp)
+            if stats is None:
+                stats = _stats[fp] = _QueryStats(normalized, kind)
+        stats.latency.add(seconds)
+        stats.wait.add(wait)
+        stats.rows += rows
+        stats.bytes += nbytes
+        stats.replica += bool(replica)
+        stats.last_at = time.time()
+        if error is not None:
+            stats.errors += 1
+            stats.last_error = f"{type(error).__name__}: {error}"[:300]
+
+    collector = _collector.get()
+    if collector is not None:
+        collector.add_query(seconds, rows)
+
+    cfg = get_section("metrics")
+    slow_ms = float(cfg.get("log_slow_ms", DEFAULT_LOG_SLOW_MS))
+    if seconds * 1000 >= slow_ms:
+        tag = "[replica]" if replica else ""
+        print(f"[PERF][{kind}]{tag} {seconds:.3f}s  -> {normalized[:80]}...")
+
+    _maybe_export(cfg)
+
+
+def dataframe_bytes(df: pd.DataFrame) -> int:
+    """Tamanho em memória do resultado (aproxima os bytes trafegados)."""
+    try:
+        return int(df.memory_usage(index=False, deep=True).sum())
+    except Exception:
+        return 0
+
+
+def reset() -> None:
+    with _lock:
+        _stats.clear()
+
+
+# ======================================================
+#  Leitura / exportação
+# ======================================================
+def snapshot() -> dict:
+    """Todas as métricas do processo (serializável em JSON)."""
+    with _lock:
+        queries = []
+        for fp, s in _stats.items():
+            lat = s.latency
+            queries.append(
+                {
+                    "fingerprint": fp,
+                    "kind": s.kind,
+                    "sql": s.sql,
+                    "calls": lat.count,
+                    "errors": s.errors,
+                    "replica_calls": s.replica,
+                    "total_s": lat.total,
+                    "mean_ms": lat.total / lat.count * 1000 if lat.count else 0.0,
+                    "p50_ms": lat.percentile(0.50) * 1000,
+                    "p95_ms": lat.percentile(0.95) * 1000,
+                    "p99_ms": lat.percentile(0.99) * 1000,
+                    "max_ms": lat.max * 1000,
+                    "wait_p95_ms": s.wait.percentile(0.95) * 1000,
+                    "wait_max_ms": s.wait.max * 1000,
+                    "rows": s.rows,
+                    "bytes": s.bytes,
+                    "last_error": s.last_error,
+                    "last_at": s.last_at,
+                }
+            )
+    queries.sort(key=lambda q: q["total_s"], reverse=True)
+    return {
+        "pid": os.getpid(),
+        "started_at": _started_at,
+        "generated_at": time.time(),
+        "queries": queries,
+    }
+
+
+def summary_df() -> pd.DataFrame:
+    """Uma linha por consulta, ordenado pelo tempo total gasto."""
+    import pandas as pd
+
+    return pd.DataFrame(snapshot()["queries"])
+
+
+def metrics_dir() -> Path:
+    path = Path(get_section("metrics").get("dir", DEFAULT_DIR))
+    return path if path.is_absolute() else ROOT / path
+
+
+def export_json(path: Path | None = None) -> Path:
+    """Grava snapshot() em JSON (padrão <dir>/metrics-<pid>.json), de forma atômica."""
+    path = Path(path) if path else metrics_dir() / f"metrics-{os.getpid()}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, indent=2, default=str)
+    os.replace(tmp, path)
+    return path
+
+
+def _maybe_export(cfg: dict) -> None:
+    global _exported_at
+    interval = float(cfg.get("export_interval", DEFAULT_EXPORT_INTERVAL))
+    if interval <= 0:
+        return
+    with _lock:
+        # Só uma thread exporta por intervalo
+        if time.monotonic() - _exported_at < interval:
+            return
+        _exported_at = time.monotonic()
+    try:
+        export_json()
+    except OSError as e:
+        print(f"[WARN] Falha ao exportar métricas: {e}")
+
+
+@atexit.register
+def _export_at_exit() -> None:
+    if not _stats:
+        return
+    try:
+        if float(get_section("metrics").get("export_interval", DEFAULT_EXPORT_INTERVAL)) > 0:
+            export_json()
+    except Exception:
+        pass
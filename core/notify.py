@@ -0,0 +1,203 @@
+# core/notify.py
+"""
+Invalidação de cache entre processos via LISTEN/NOTIFY do Postgres.
+
+Triggers em prices e price_change_requests publicam no canal
+`ragnarok_cache` um JSON {"table", "item_id", "variation_key"} a cada
+INSERT/UPDATE/DELETE. Cada processo mantém uma thread que escuta o canal e:
+  - prices: chama core.events.notify_variation_change(item_id, variation_key),
+    que remove só as entradas daquele item/variação (caches do repository,
+    specs de gráfico, snapshot Arrow);
+  - price_change_requests: limpa a lista de pendências.
+
+A réplica pode ainda não ter a escrita notificada: as releituras dessas
+chaves (item, agregados de preços, pendências) vão ao primário pela janela
+read_your_writes (connection.mark_remote_write). As demais leituras do
+processo seguem na réplica — mark_write() fica só com quem escreveu.
+
+Com o listener conectado os caches de leitura podem usar TTL longo
+([cache] ttl_with_listener, padrão 3600s); ao reconectar tudo é limpo
+(notificações perdidas durante a queda).
+
+Ligado por padrão no backend Postgres; [notify] enabled = false desliga.
+"""
+from __future__ import annotations
+
+import json
+import select
+import threading
+
+from core import connection
+from core.cache import clear_all
+from core.config import get_section
+from core.events import notify_variation_change
+
+CHANNEL = "ragnarok_cache"
+
+_thread: threading.Thread | None = None
+_stop = threading.Event()
+_state = {"connected": False, "received": 0, "last_error": None}
+_lock = threading.Lock()
+
+_request_listeners: list = []
+
+TRIGGERS_SQL = f"""
+CREATE OR REPLACE FUNCTION ragnarok_notify_cache() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM pg_notify('{CHANNEL}', json_build_object(
+            'table', TG_TABLE_NAME,
+            'item_id', OLD.item_id,
+            'variation_key', OLD.variation_key
+        )::text);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        -- UPDATE só notifica de novo se mudou de item / variação
+        IF TG_OP = 'INSERT'
+           OR NEW.item_id IS DISTINCT FROM OLD.item_id
+           OR NEW.variation_key IS DISTINCT FROM OLD.variation_key THEN
+            PERFORM pg_notify('{CHANNEL}', json_build_object(
+                'table', TG_TABLE_NAME,
+                'item_id', NEW.item_id,
+                'variation_key', NEW.variation_key
+            )::text);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_prices_notify_cache ON prices;
+CREATE TRIGGER trg_prices_notify_cache
+    AFTER INSERT OR UPDATE OR DELETE ON prices
+    FOR EACH ROW EXECUTE FUNCTION ragnarok_notify_cache();
+
+DROP TRIGGER IF EXISTS trg_requests_notify_cache ON price_change_requests;
+CREATE TRIGGER trg_requests_notify_cache
+    AFTER INSERT OR UPDATE OR DELETE ON price_change_requests
+    FOR EACH ROW EXECUTE FUNCTION ragnarok_notify_cache();
+"""
+
+
+def install_triggers() -> None:
+    """Cria/atualiza a função e os triggers de NOTIFY (idempotente)."""
+    connection.execute(TRIGGERS_SQL)
+
+
+def on_request_change(callback) -> None:
+    """Registra callback() chamado quando price_change_requests muda em qualquer processo."""
+    with _lock:
+        if callback not in _request_listeners:
+            _request_listeners.append(callback)
+
+
+def is_enabled() -> bool:
+    if connection.get_backend() != "postgres":
+        return False
+    value = get_section("notify").get("enabled", True)
+    return str(value).lower() not in ("false", "0", "no")
+
+
+def listener_connected() -> bool:
+    return _state["connected"]
+
+
+def listener_status() -> dict:
+    with _lock:
+        return {
+            "running": _thread is not None and _thread.is_alive(),
+            **_state,
+        }
+
+
+def _handle(payload: str) -> None:
+    try:
+        data = json.loads(payload)
+    except json.JSONDecodeError:
+        print(f"[WARN] NOTIFY com payload inválido: {payload[:80]}")
+        return
+
+    with _lock:
+        _state["received"] += 1
+        request_listeners = list(_request_listeners)
+
+    if data.get("table") == "price_change_requests":
+        connection.mark_remote_write("price_change_requests")
+        for callback in request_listeners:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[WARN] Falha no listener de solicitações: {e}")
+        return
+
+    if data.get("item_id") is not None:
+        # A réplica pode ainda não ter a escrita: só as releituras deste
+        # item (e dos agregados de preços) vão ao primário
+        item_id = int(data["item_id"])
+        connection.mark_remote_write("prices", ("prices", item_id))
+        notify_variation_change(item_id, data.get("variation_key"))
+
+
+def _listen_loop() -> None:
+    backoff = 1.0
+    while not _stop.is_set():
+        conn = None
+        try:
+            import psycopg2.extensions
+
+            conn = connection._connect_postgres(connection.PRIMARY)
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            cur = conn.cursor()
+            cur.execute(f"LISTEN {CHANNEL};")
+
+            # O que mudou enquanto estávamos desconectados não foi notificado
+            clear_all()
+            with _lock:
+                _state.update(connected=True, last_error=None)
+            backoff = 1.0
+
+            while not _stop.is_set():
+                if select.select([conn], [], [], 5.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    _handle(conn.notifies.pop(0).payload)
+        except Exception as e:
+            with _lock:
+                _state.update(connected=False, last_error=str(e))
+            print(f"[WARN] Listener de cache desconectado ({e}); nova tentativa em {backoff:.0f}s")
+            _stop.wait(backoff)
+            backoff = min(backoff * 2, 60.0)
+        finally:
+            with _lock:
+                _state["connected"] = False
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+
+def start_listener() -> bool:
+    """Inicia a thread de LISTEN (uma por processo). Retorna True se está rodando."""
+    global _thread
+    if not is_enabled():
+        return False
+    with _lock:
+        if _thread is not None and _thread.is_alive():
+            return True
+        _stop.clear()
+        _thread = threading.Thread(
+            target=_listen_loop, name="core-notify-listener", daemon=True
+        )
+        _thread.start()
+    return True
+
+
+def stop_listener(timeout: float = 10.0) -> None:
+    global _thread
+    _stop.set()
+    thread = _thread
+    if thread is not None:
+        thread.join(timeout)
+    _thread = None
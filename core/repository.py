@@ -0,0 +1,1430 @@
+# core/repository.py
+"""
+Repositório de dados do Ragnarok Tools (sem Streamlit).
+
+Funções de leitura/escrita sobre items, prices e tabelas de auditoria.
+Leituras usam core.cache (TTL curto, compartilhado no processo); escritas
+de preço disparam core.events, cujos listeners despejam só o que depende
+da variação alterada. Quem executa a ação (actor)
+é sempre passado explicitamente — nada de session_state aqui.
+"""
+from __future__ import annotations
+
+from datetime import date, timedelta
+from functools import partial
+from typing import TYPE_CHECKING
+
+from core import audit, audit_archive, catalog, diagnostics, notify
+from core.cache import clear_all, ttl_cache
+from core.config import get_section
+from core.connection import (
+    execute,
+    get_backend,
+    get_connection,
+    mark_write,
+    query_df,
+    read_primary,
+)
+from core.events import notify_variation_change, on_variation_change
+from core.market import BUY_THRESHOLD, SELL_THRESHOLD, summarize_last_prices
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def to_int_or_none(value):
+    """
+    Converte qualquer tipo numérico (incluindo numpy.int64) para int normal.
+    Retorna None se vier NaN ou None.
+    """
+    import pandas as pd
+
+    if value is None:
+        return None
+    # pd.isna cobre pandas/numpy
+    try:
+        if pd.isna(value):
+            return None
+    except Exception:
+        pass
+    return int(value)
+
+
+# ======================================================
+#  Função para checar preço existente
+#  (agora considerando variation_key)
+# ======================================================
+def get_existing_price(
+    item_id: int,
+    date_str: str,
+    variation_key: str | None = None,
+) -> int | None:
+    """
+    Retorna o preço já cadastrado para (item_id, date, variation_key).
+    Se variation_key não for informado, usa string vazia (variação padrão).
+    """
+    vk = variation_key or ""
+
+    df = query_df(
+        """
+        SELECT price_zeny
+        FROM prices
+        WHERE item_id = %s
+          AND date = %s
+          AND variation_key = %s
+        ORDER BY created_at DESC
+        LIMIT 1;
+        """,
+        (item_id, date_str, vk),
+        # Usado no salvar: precisa enxergar escritas recentes (primário)
+        primary=True,
+    )
+
+    if df.empty:
+        return None
+
+    return int(df.iloc[0]["price_zeny"])
+
+
+# ======================================================
+#  Função para atualizar preço existente
+# ======================================================
+def update_price(
+    item_id: int,
+    date_str: str,
+    price_zeny: float,
+    variation_key: str = "",
+):
+    """
+    Atualiza o preço de um item em um dia específico
+    para uma DETERMINADA variação (variation_key).
+    """
+    if price_zeny <= 0:
+        raise ValueError("price_zeny deve ser > 0")
+
+    execute(
+        """
+        UPDATE prices
+           SET price_zeny = %s,
+               updated_at = NOW()
+         WHERE item_id = %s
+           AND date = %s
+           AND variation_key = %s;
+        """,
+        (price_zeny, item_id, date_str, variation_key or ""),
+    )
+
+    # Despeja só o que depende desta variação (on_variation_change)
+    notify_variation_change(item_id, variation_key)
+
+
+# ======================================================
+#  Funções de auditoria básicas (logs simples)
+# ======================================================
+def log_price_change(
+    item_id: int,
+    date_str: str,
+    old_price_zeny: int | None,
+    new_price_zeny: int,
+    changed_by: str,
+    source: str = "DIRECT_ADMIN",
+    refine: int | None = None,
+    card_ids: str | None = None,
+    extra_desc: str | None = None,
+    variation_key: str | None = None,
+):
+    """
+    Registra um log simples de alteração de preço.
+    Usa tabela price_change_logs (se existir).
+    Agora inclui campos de variação (refine, card_ids, extra_desc, variation_key).
+    A gravação é em lote, em segundo plano (core.audit).
+    """
+    try:
+        audit.submit(
+            "price_change_logs",
+            {
+                "item_id": item_id,
+                "date": date_str,
+                "old_price_zeny": old_price_zeny,
+                "new_price_zeny": new_price_zeny,
+                "changed_by": changed_by,
+                "source": source,
+                "refine": refine,
+                "card_ids": card_ids,
+                "extra_desc": extra_desc,
+                "variation_key": variation_key or "",
+            },
+        )
+    except Exception as e:
+        # Não queremos quebrar nada se essa tabela não existir ainda
+        print(f"[WARN] Falha ao gravar em price_change_logs: {e}")
+
+
+# ======================================================
+#  Inicialização do schema (somente manual)
+#  (mantida simples, já que hoje você cria as tabelas via script SQL separado)
+# ======================================================
+def init_db():
+    """Cria tabelas base no PostgreSQL (roda só via script/init_supabase.py)."""
+    if get_backend() == "sqlite":
+        # SQLite: schema completo (e migração do market.db) no próprio backend
+        from core import sqlite_backend
+
+        sqlite_backend.init_schema()
+        diagnostics.init_table()
+        return
+
+    q_items = """
+    CREATE TABLE IF NOT EXISTS items (
+        id   INTEGER PRIMARY KEY,
+        name TEXT NOT NULL
+    );
+    """
+
+    # Versão atualizada da tabela prices para novos ambientes
+    q_prices = """
+    CREATE TABLE IF NOT EXISTS prices (
+        id            SERIAL PRIMARY KEY,
+        item_id       INTEGER NOT NULL REFERENCES items(id),
+        date          DATE NOT NULL,
+        price_zeny    INTEGER NOT NULL,
+        refine        INTEGER NOT NULL DEFAULT 0,
+        card_ids      TEXT,
+        extra_desc    TEXT,
+        variation_key TEXT NOT NULL DEFAULT '',
+        created_at    TIMESTAMP NOT NULL DEFAULT NOW(),
+        updated_at    TIMESTAMP
+    );
+    """
+
+    # Índices usados pelas consultas por item / variação e pelo
+    # "último preço cadastrado" (get_latest_priced_item)
+    q_prices_indexes = """
+    CREATE INDEX IF NOT EXISTS idx_prices_item_variation_date
+        ON prices (item_id, variation_key, date DESC, created_at DESC);
+    CREATE INDEX IF NOT EXISTS idx_prices_date_created
+        ON prices (date DESC, created_at DESC);
+    """
+
+    execute(q_items)
+    execute(q_prices)
+    execute(q_prices_indexes)
+    diagnostics.init_table()
+
+    # Auditoria particionada por mês (tabelas antigas: scripts.archive_audit --migrate)
+    try:
+        audit_archive.init_tables()
+    except Exception as e:
+        print(f"[WARN] Falha ao criar tabelas de auditoria particionadas: {e}")
+
+    # Fila de pendentes (keyset em created_at, id): índice parcial, pequeno
+    try:
+        execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_price_change_requests_pending
+                ON price_change_requests (created_at, id)
+                WHERE status = 'pending';
+            """
+        )
+    except Exception as e:
+        # price_change_requests pode ainda não existir (criada por script SQL)
+        print(f"[WARN] Falha ao criar índice da fila de pendentes: {e}")
+
+    # Triggers de NOTIFY para invalidar caches entre processos
+    try:
+        notify.install_triggers()
+    except Exception as e:
+        # price_change_requests pode ainda não existir (criada por script SQL)
+        print(f"[WARN] Falha ao instalar triggers de NOTIFY: {e}")
+
+
+# ======================================================
+#  Sincronização do catálogo (items.json -> items)
+# ======================================================
+def sync_items(rows: list[tuple[int, str]], dry_run: bool = False) -> dict:
+    """
+    Sincroniza a tabela items com `rows` [(id, name), ...] numa transação:
+    COPY para uma tabela temporária e diff set-based (insere novos,
+    atualiza nomes alterados). Itens que sumiram do arquivo só são
+    reportados — prices referencia items, então nada é apagado.
+
+    Retorna {"received", "inserted", "updated", "removed", "removed_sample"}.
+    Com dry_run=True tudo é desfeito no final (só as contagens valem).
+    """
+    import csv
+    import io
+
+    sqlite = get_backend() == "sqlite"
+    buf = io.StringIO()
+    if not sqlite:
+        csv.writer(buf).writerows(rows)
+        buf.seek(0)
+
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        if sqlite:
+            # SQLite: sem COPY / ON COMMIT DROP -> executemany + DROP no fim
+            cur.execute(
+                "CREATE TEMP TABLE tmp_items (id INTEGER PRIMARY KEY, name TEXT NOT NULL);"
+            )
+            cur.executemany("INSERT INTO tmp_items (id, name) VALUES (%s, %s);", rows)
+        else:
+            cur.execute(
+                """
+                CREATE TEMP TABLE tmp_items (
+                    id   INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL
+                ) ON COMMIT DROP;
+                """
+            )
+            cur.copy_expert(
+                "COPY tmp_items (id, name) FROM STDIN WITH (FORMAT csv)", buf
+            )
+
+        cur.execute(
+            """
+            UPDATE items AS i
+            SET name = t.name
+            FROM tmp_items AS t
+            WHERE i.id = t.id
+              AND i.name <> t.name;
+            """
+        )
+        updated = cur.rowcount
+
+        cur.execute(
+            """
+            INSERT INTO items (id, name)
+            SELECT t.id, t.name
+            FROM tmp_items AS t
+            WHERE NOT EXISTS (SELECT 1 FROM items AS i WHERE i.id = t.id);
+            """
+        )
+        inserted = cur.rowcount
+
+        cur.execute(
+            """
+            SELECT i.id, i.name
+            FROM items AS i
+            WHERE NOT EXISTS (SELECT 1 FROM tmp_items AS t WHERE t.id = i.id)
+            ORDER BY i.id;
+            """
+        )
+        removed = cur.fetchall()
+
+        if sqlite:
+            cur.execute("DROP TABLE tmp_items;")
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+        cur.close()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    if not dry_run and (inserted or updated):
+        mark_write()
+        clear_all()
+        # Nomes novos/renomeados: o catálogo reconfere a versão já na próxima leitura
+        catalog.invalidate_catalog()
+
+    return {
+        "received": len(rows),
+        "inserted": inserted,
+        "updated": updated,
+        "removed": len(removed),
+        "removed_sample": removed[:10],
+    }
+
+
+# ======================================================
+#  CRUD COM CACHE NAS LEITURAS
+# ======================================================
+def _read_ttl() -> float:
+    """
+    TTL dos caches de leitura: curto por padrão ([cache] ttl, 5s); longo
+    ([cache] ttl_with_listener, 3600s) enquanto o LISTEN/NOTIFY estiver
+    conectado, porque aí as escritas de qualquer processo já invalidam.
+    """
+    cfg = get_section("cache")
+    if notify.listener_connected():
+        return float(cfg.get("ttl_with_listener", 3600))
+    return float(cfg.get("ttl", 5))
+
+
+def _cache_mb(key: str, default: int) -> int:
+    """Limite em bytes de um cache ([cache] <key> em MB)."""
+    return int(float(get_section("cache").get(key, default)) * 1024 * 1024)
+
+
+@ttl_cache(ttl=_read_ttl, maxsize=1)
+def _get_items_df_cached() -> pd.DataFrame:
+    return query_df("SELECT id, name FROM items ORDER BY name ASC;")
+
+
+def get_items_df() -> pd.DataFrame:
+    """
+    Wrapper em cima do cache.
+    Usamos .copy() pra não correr risco de alterar o dataframe cacheado.
+    """
+    return _get_items_df_cached().copy()
+
+
+@ttl_cache(ttl=_read_ttl, maxsize=1024, max_bytes=partial(_cache_mb, "history_mb", 64))
+def _get_price_history_df_cached(item_id: int) -> pd.DataFrame:
+    return query_df(
+        """
+        SELECT *
+        FROM prices
+        WHERE item_id = %s
+        ORDER BY date ASC, created_at ASC;
+        """,
+        (item_id,),
+        primary=read_primary(("prices", item_id)),
+    )
+
+
+def get_price_history_df(item_id: int) -> pd.DataFrame:
+    return _get_price_history_df_cached(item_id).copy()
+
+
+@ttl_cache(ttl=_read_ttl, maxsize=1)
+def _get_all_prices_df_cached() -> pd.DataFrame:
+    return query_df(
+        """
+        SELECT 
+            p.item_id,
+            i.name AS item_name,
+            p.date,
+            p.price_zeny,
+            p.refine,
+            p.card_ids,
+            p.extra_desc,
+            p.variation_key
+        FROM prices p
+        JOIN items i ON i.id = p.item_id;
+        """,
+        primary=read_primary("prices"),
+    )
+
+
+def get_all_prices_df() -> pd.DataFrame:
+    return _get_all_prices_df_cached().copy()
+
+
+# ------------------------------------------------------
+#  Leituras por item / variação (sem carregar a tabela toda)
+# ------------------------------------------------------
+
+# Mesma regra de normalize_variation_key_df (Monitor), em SQL:
+# '' / NULL / 'r0' "puro" (sem refino, cartas e extra) viram 'base'.
+_VARIATION_KEY_SQL = """
+    CASE
+        WHEN COALESCE(p.variation_key, '') = ''
+          OR (p.variation_key = 'r0'
+              AND COALESCE(p.refine, 0) = 0
+              AND COALESCE(p.card_ids, '') IN ('', '[]')
+              AND TRIM(COALESCE(p.extra_desc, '')) = '')
+        THEN 'base'
+        ELSE p.variation_key
+    END
+"""
+
+
+def _variation_filter_sql(variation_key: str) -> tuple[str, tuple]:
+    """
+    Filtro por variação já normalizada, mantendo o uso do índice
+    (item_id, variation_key, ...): 'base' pode estar gravada como '', 'base' ou 'r0'.
+    """
+    if variation_key == "base":
+        return (
+            f"p.variation_key IN ('', 'base', 'r0') AND {_VARIATION_KEY_SQL} = 'base'",
+            (),
+        )
+    return "p.variation_key = %s", (variation_key,)
+
+
+@ttl_cache(ttl=_read_ttl, maxsize=1)
+def get_latest_priced_item() -> int | None:
+    """
+    Retorna o item_id do preço mais recente (por data e criação).
+    Usa o índice idx_prices_date_created, então custa 1 linha.
+    """
+    df = query_df(
+        """
+        SELECT item_id
+        FROM prices
+        ORDER BY date DESC, created_at DESC
+        LIMIT 1;
+        """,
+        primary=read_primary("prices"),
+    )
+    if df.empty:
+        return None
+    return int(df.iloc[0]["item_id"])
+
+
+@ttl_cache(ttl=_read_ttl, maxsize=1024)
+def _get_item_variations_cached(item_id: int) -> pd.DataFrame:
+    return query_df(
+        f"""
+        SELECT variation_key, refine, card_ids, extra_desc,
+               date AS last_date, n_records
+        FROM (
+            SELECT
+                {_VARIATION_KEY_SQL} AS variation_key,
+                p.refine,
+                p.card_ids,
+                p.extra_desc,
+                p.date,
+                ROW_NUMBER() OVER (
+                    PARTITION BY {_VARIATION_KEY_SQL}
+                    ORDER BY p.date DESC, p.created_at DESC
+                ) AS rn,
+                COUNT(*) OVER (PARTITION BY {_VARIATION_KEY_SQL}) AS n_records
+            FROM prices p
+            WHERE p.item_id = %s
+        ) v
+        WHERE rn = 1
+        ORDER BY variation_key ASC;
+        """,
+        (item_id,),
+        primary=read_primary(("prices", item_id)),
+    )
+
+
+def get_item_variations(item_id: int) -> pd.DataFrame:
+    """
+    Uma linha por variação (variation_key normalizada) do item,
+    com refine / card_ids / extra_desc do registro mais recente,
+    a data desse registro (last_date) e o total de registros (n_records).
+    """
+    return _get_item_variations_cached(item_id).copy()
+
+
+@ttl_cache(ttl=_read_ttl, maxsize=4096)
+def _get_last_prices_cached(item_id: int, variation_key: str) -> pd.DataFrame:
+    vk_filter, vk_params = _variation_filter_sql(variation_key)
+    return query_df(
+        f"""
+        SELECT p.date, p.price_zeny
+        FROM prices p
+        WHERE p.item_id = %s
+          AND {vk_filter}
+        ORDER BY p.date DESC, p.created_at DESC
+        LIMIT 5;
+        """,
+        (item_id, *vk_params),
+        primary=read_primary(("prices", item_id)),
+    )
+
+
+def get_summary_row(item_id: int, variation_key: str) -> dict | None:
+    """
+    Resumo (mesmas colunas de compute_summary) de UMA variação do item,
+    calculado só com os últimos 5 registros dela.
+    variation_key deve vir normalizada ('base' para a variação padrão).
+    Retorna None se a variação não tiver preços.
+    """
+    df = _get_last_prices_cached(item_id, variation_key or "base")
+    if df.empty:
+        return None
+
+    import pandas as pd
+
+    df = df.iloc[::-1]
+    return {
+        "Última data": pd.to_datetime(df.iloc[-1]["date"]).date(),
+        **summarize_last_prices(df["price_zeny"]),
+    }
+
+
+# ------------------------------------------------------
+#  Tabela global de mercado (paginada no servidor)
+# ------------------------------------------------------
+
+# Resumo por variação (último preço, média dos últimos 5, variação e status),
+# calculado no banco. Mesmas regras de compute_summary / status_from_variation.
+_MARKET_SQL = f"""
+    WITH ranked AS (
+        SELECT
+            p.item_id,
+            {_VARIATION_KEY_SQL} AS variation_key,
+            p.date,
+            p.price_zeny,
+            p.refine,
+            p.card_ids,
+            p.extra_desc,
+            ROW_NUMBER() OVER (
+                PARTITION BY p.item_id, {_VARIATION_KEY_SQL}
+                ORDER BY p.date DESC, p.created_at DESC
+            ) AS rn
+        FROM prices p
+    ),
+    summary AS (
+        SELECT
+            r.item_id,
+            r.variation_key,
+            MAX(CASE WHEN r.rn = 1 THEN r.date END)       AS last_date,
+            MAX(CASE WHEN r.rn = 1 THEN r.price_zeny END) AS last_price,
+            CAST(AVG(r.price_zeny) AS DOUBLE PRECISION)   AS mean_5,
+            MAX(CASE WHEN r.rn = 1 THEN r.refine END)     AS refine,
+            MAX(CASE WHEN r.rn = 1 THEN r.card_ids END)   AS card_ids,
+            MAX(CASE WHEN r.rn = 1 THEN r.extra_desc END) AS extra_desc
+        FROM ranked r
+        WHERE r.rn <= 5
+        GROUP BY r.item_id, r.variation_key
+    ),
+    with_var AS (
+        SELECT
+            s.*,
+            i.name AS item_name,
+            CASE WHEN s.mean_5 > 0 THEN s.last_price / s.mean_5 - 1 ELSE 0 END
+                AS var_pct
+        FROM summary s
+        JOIN items i ON i.id = s.item_id
+    )
+    SELECT
+        m.*,
+        CASE
+            WHEN m.var_pct <= {BUY_THRESHOLD} THEN 'Comprar'
+            WHEN m.var_pct >= {SELL_THRESHOLD} THEN 'Vender'
+            ELSE 'Neutro'
+        END AS status
+    FROM with_var m
+"""
+
+# Colunas aceitas para ordenação (nome público -> coluna do SQL)
+MARKET_SORT_COLUMNS = {
+    "item": "item_name",
+    "last_date": "last_date",
+    "last_price": "last_price",
+    "mean_5": "mean_5",
+    "var_pct": "var_pct",
+    "status": "status",
+}
+
+
+def _market_filters_sql(
+    status: tuple[str, ...] | None,
+    name_query: str | None,
+    has_cards: bool | None,
+) -> tuple[list[str], list]:
+    """Monta as cláusulas WHERE (e parâmetros) dos filtros da tabela de mercado."""
+    clauses: list[str] = []
+    params: list = []
+
+    if status:
+        clauses.append("mk.status IN (" + ", ".join(["%s"] * len(status)) + ")")
+        params.extend(status)
+
+    if name_query and name_query.strip():
+        clauses.append("LOWER(mk.item_name) LIKE %s")
+        params.append(f"%{name_query.strip().lower()}%")
+
+    if has_cards is True:
+        clauses.append("COALESCE(mk.card_ids, '') NOT IN ('', '[]')")
+    elif has_cards is False:
+        clauses.append("COALESCE(mk.card_ids, '') IN ('', '[]')")
+
+    return clauses, params
+
+
+@ttl_cache(ttl=_read_ttl, maxsize=256, max_bytes=partial(_cache_mb, "market_mb", 32))
+def _get_market_page_cached(
+    sort_by: str,
+    descending: bool,
+    status: tuple[str, ...] | None,
+    name_query: str | None,
+    has_cards: bool | None,
+    after: tuple | None,
+    page_size: int,
+) -> pd.DataFrame:
+    sort_col = MARKET_SORT_COLUMNS[sort_by]
+    clauses, params = _market_filters_sql(status, name_query, has_cards)
+
+    # Keyset: (coluna de ordenação, item_id, variation_key) desempata sempre
+    op = "<" if descending else ">"
+    direction = "DESC" if descending else "ASC"
+    if after is not None:
+        clauses.append(
+            f"(mk.{sort_col}, mk.item_id, mk.variation_key) {op} (%s, %s, %s)"
+        )
+        params.extend(after)
+
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+
+    return query_df(
+        f"""
+        SELECT *
+        FROM ({_MARKET_SQL}) mk
+        {where}
+        ORDER BY mk.{sort_col} {direction},
+                 mk.item_id {direction},
+                 mk.variation_key {direction}
+        LIMIT %s;
+        """,
+        (*params, page_size + 1),
+        primary=read_primary("prices"),
+    )
+
+
+def get_market_page(
+    sort_by: str = "item",
+    descending: bool = False,
+    status: tuple[str, ...] | None = None,
+    name_query: str | None = None,
+    has_cards: bool | None = None,
+    after: tuple | None = None,
+    page_size: int = 25,
+) -> tuple[pd.DataFrame, tuple | None]:
+    """
+    Uma página da tabela global de mercado (uma linha por variação),
+    ordenada e filtrada no banco.
+
+    - sort_by: chave de MARKET_SORT_COLUMNS
+    - status: filtra por ("Comprar", "Vender", "Neutro")
+    - name_query: substring do nome do item (sem diferenciar maiúsculas)
+    - has_cards: True = só com cartas, False = só sem cartas, None = todos
+    - after: cursor devolvido pela página anterior (keyset pagination)
+
+    Retorna (df_pagina, cursor_da_proxima_pagina). O cursor é None na última página.
+    """
+    if sort_by not in MARKET_SORT_COLUMNS:
+        raise ValueError(f"Coluna de ordenação inválida: {sort_by}")
+
+    df = _get_market_page_cached(
+        sort_by,
+        descending,
+        tuple(status) if status else None,
+        name_query or None,
+        has_cards,
+        tuple(after) if after is not None else None,
+        int(page_size),
+    ).copy()
+
+    next_cursor = None
+    if len(df) > page_size:
+        df = df.iloc[:page_size]
+        last = df.iloc[-1]
+        next_cursor = (
+            _cursor_value(last[MARKET_SORT_COLUMNS[sort_by]]),
+            int(last["item_id"]),
+            str(last["variation_key"]),
+        )
+
+    return df, next_cursor
+
+
+def _cursor_value(value):
+    """Converte valores numpy/pandas em tipos simples (hasheáveis e aceitos pelo driver)."""
+    if hasattr(value, "item"):
+        value = value.item()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()[:10]
+    return value
+
+
+@ttl_cache(ttl=_read_ttl, maxsize=256)
+def count_market_rows(
+    status: tuple[str, ...] | None = None,
+    name_query: str | None = None,
+    has_cards: bool | None = None,
+) -> int:
+    """Total de variações que passam pelos filtros (para o rodapé da tabela)."""
+    clauses, params = _market_filters_sql(status, name_query, has_cards)
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+
+    df = query_df(
+        f"""
+        SELECT COUNT(*) AS n
+        FROM ({_MARKET_SQL}) mk
+        {where};
+        """,
+        tuple(params) or None,
+        primary=read_primary("prices"),
+    )
+    return int(df.iloc[0]["n"]) if not df.empty else 0
+
+
+def insert_price(
+    item_id: int,
+    date_str: str,
+    price_zeny: int,
+    refine: int | None = 0,
+    card_ids: list[int] | None = None,
+    extra_desc: str | None = None,
+    variation_key: str | None = None,
+    actor_email: str = "desconhecido",
+    actor_role: str = "user",
+):
+    """
+    Insere um preço no histórico.
+    Assumimos que (item_id, date, variation_key) ainda NÃO existe.
+
+    OBS:
+      - refine / card_ids / extra_desc / variation_key têm default,
+        então chamadas antigas com 3 parâmetros continuam funcionando
+        (variação "default": variation_key = "").
+      - actor_email / actor_role identificam quem registrou (auditoria).
+    """
+
+    # garante que refine nunca vai como NULL
+    if refine is None:
+        refine = 0
+
+    if price_zeny <= 0:
+        raise ValueError("price_zeny deve ser > 0")
+
+    vk = variation_key or ""
+
+    # Converte card_ids (lista) para string, pois a coluna é text
+    if isinstance(card_ids, list):
+        card_ids_db = ",".join(map(str, card_ids)) if card_ids else None
+    else:
+        card_ids_db = card_ids  # já é string ou None
+
+    execute(
+        """
+        INSERT INTO prices
+            (item_id, date, price_zeny, refine, card_ids, extra_desc, variation_key)
+        VALUES (%s, %s, %s, %s, %s, %s, %s);
+        """,
+        (item_id, date_str, int(price_zeny), refine, card_ids_db, extra_desc, vk),
+    )
+
+    # 🔍 Log fino de auditoria (price_audit_log)
+    try:
+        log_price_action(
+            item_id=item_id,
+            date_str=date_str,
+            action_type="insert",
+            actor_email=actor_email,
+            actor_role=actor_role,
+            old_price=None,
+            new_price=int(price_zeny),
+            request_id=None,
+            refine=refine,
+            card_ids=card_ids_db,
+            extra_desc=extra_desc,
+            variation_key=vk,
+        )
+    except Exception as e:
+        print(f"[WARN] Falha ao logar insert em price_audit_log: {e}")
+
+    # 📚 Log macro na price_change_logs (criação de preço)
+    try:
+        log_price_change(
+            item_id=item_id,
+            date_str=date_str,
+            old_price_zeny=0,  # ou None, se você preferir marcar como "sem valor anterior"
+            new_price_zeny=int(price_zeny),
+            changed_by=actor_email,
+            source="INSERT",
+            refine=refine,
+            card_ids=card_ids_db,
+            extra_desc=extra_desc,
+            variation_key=vk,
+        )
+    except Exception as e:
+        print(f"[WARN] Falha ao logar criação de preço: {e}")
+
+    # Depois de inserir, despeja só os caches desta variação
+    notify_variation_change(item_id, vk)
+
+
+def delete_price(item_id: int, date_str: str, variation_key: str | None) -> None:
+    """
+    Remove o registro único de preço de (item_id, date, variation_key).
+    Como em todo o resto do código, tratamos variation_key None como string vazia ("").
+    """
+    vk = variation_key or ""
+
+    execute(
+        """
+        DELETE FROM prices
+        WHERE item_id = %s
+          AND date = %s
+          AND variation_key = %s;
+        """,
+        (item_id, date_str, vk),
+    )
+
+    # Despeja os caches da variação para refletir o delete na UI
+    notify_variation_change(item_id, vk)
+
+
+# ======================================================
+#  Auditoria avançada (price_change_requests + price_audit_log)
+# ======================================================
+def log_price_action(
+    item_id: int,
+    date_str: str,
+    action_type: str,
+    actor_email: str,
+    actor_role: str,
+    old_price: int | None = None,
+    new_price: int | None = None,
+    request_id: int | None = None,
+    refine: int | None = None,
+    card_ids: str | None = None,
+    extra_desc: str | None = None,
+    variation_key: str | None = None,
+):
+    """
+    Grava um log de qualquer ação de preço.
+    action_type: insert | update | delete | request_create | request_approve | request_reject
+    Usa tabela price_audit_log (se existir).
+    Agora registra também os campos de variação.
+    A gravação é em lote, em segundo plano (core.audit).
+    """
+    try:
+        audit.submit(
+            "price_audit_log",
+            {
+                "item_id": item_id,
+                "date": date_str,
+                "action_type": action_type,
+                "old_price": old_price,
+                "new_price": new_price,
+                "actor_email": actor_email,
+                "actor_role": actor_role,
+                "request_id": request_id,
+                "refine": refine,
+                "card_ids": card_ids,
+                "extra_desc": extra_desc,
+                "variation_key": variation_key or "",
+            },
+        )
+    except Exception as e:
+        print(f"[WARN] Falha ao gravar em price_audit_log: {e}")
+
+
+AUDIT_ACTION_TYPES = (
+    "insert",
+    "update",
+    "delete",
+    "request_create",
+    "request_approve",
+    "request_reject",
+)
+
+
+def get_audit_page(
+    item_id: int | None = None,
+    actor_email: str | None = None,
+    action_types: tuple[str, ...] | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    after: tuple | None = None,
+    page_size: int = 50,
+    include_archived: bool = False,
+) -> tuple[pd.DataFrame, tuple | None]:
+    """
+    Uma página da price_audit_log, mais recentes primeiro.
+
+    - item_id / actor_email: igualdade exata
+    - action_types: qualquer um de AUDIT_ACTION_TYPES
+    - start / end: dias (inclusive) de created_at
+    - after: cursor (created_at, id) devolvido pela página anterior
+    - include_archived: junta os meses já arquivados (core.audit_archive)
+      que caem no período, com a mesma ordem e o mesmo cursor
+
+    Keyset em (created_at, id) com índices que terminam nessas colunas
+    (ver core.sqlite_backend / core.audit_archive): qualquer página custa
+    o mesmo, sem OFFSET. Os meses arquivados são lidos dos arquivos a cada
+    página (opcional, sem índice). Retorna (df_pagina,
+    cursor_da_proxima_pagina); o cursor é None na última página. Sem cache
+    (consulta de admin).
+    """
+    clauses: list[str] = []
+    params: list = []
+
+    if item_id is not None:
+        clauses.append("a.item_id = %s")
+        params.append(int(item_id))
+    if actor_email:
+        clauses.append("a.actor_email = %s")
+        params.append(actor_email.strip())
+    if action_types:
+        clauses.append("a.action_type IN (" + ", ".join(["%s"] * len(action_types)) + ")")
+        params.extend(action_types)
+    if start is not None:
+        clauses.append("a.created_at >= %s")
+        params.append(start)
+    if end is not None:
+        clauses.append("a.created_at < %s")
+        params.append(end + timedelta(days=1))
+    if after is not None:
+        clauses.append("(a.created_at, a.id) < (%s, %s)")
+        params.extend(after)
+
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+
+    # O JOIN com items vem depois do LIMIT: só as linhas da página
+    df = query_df(
+        f"""
+        SELECT pg.*, i.name AS item_name
+        FROM (
+            SELECT a.*
+            FROM price_audit_log a
+            {where}
+            ORDER BY a.created_at DESC, a.id DESC
+            LIMIT %s
+        ) pg
+        LEFT JOIN items i ON i.id = pg.item_id
+        ORDER BY pg.created_at DESC, pg.id DESC;
+        """,
+        (*params, int(page_size) + 1),
+    )
+
+    if include_archived:
+        import pandas as pd
+
+        archived = _archived_audit_page(
+            item_id, actor_email, action_types, start, end, after, int(page_size) + 1
+        )
+        if not archived.empty:
+            df = pd.concat([d for d in (df, archived) if not d.empty], ignore_index=True)
+            df["created_at"] = pd.to_datetime(df["created_at"])
+            df = df.sort_values(["created_at", "id"], ascending=False, ignore_index=True)
+            df = df.head(int(page_size) + 1)
+
+    next_cursor = None
+    if len(df) > page_size:
+        df = df.iloc[:page_size]
+        last = df.iloc[-1]
+        created_at = last["created_at"]
+        if hasattr(created_at, "isoformat"):
+            created_at = created_at.isoformat(sep=" ")
+        next_cursor = (str(created_at), int(last["id"]))
+
+    return df, next_cursor
+
+
+def _archived_audit_page(
+    item_id: int | None,
+    actor_email: str | None,
+    action_types: tuple[str, ...] | None,
+    start: date | None,
+    end: date | None,
+    after: tuple | None,
+    limit: int,
+) -> pd.DataFrame:
+    """Mesmos filtros e keyset de get_audit_page sobre os meses arquivados."""
+    import pandas as pd
+
+    end_exclusive = end + timedelta(days=1) if end is not None else None
+    df = audit_archive._archived_df("price_audit_log", start, end_exclusive)
+    if df.empty:
+        return df
+
+    df["created_at"] = pd.to_datetime(df["created_at"])
+    mask = pd.Series(True, index=df.index)
+    if item_id is not None:
+        mask &= df["item_id"] == int(item_id)
+    if actor_email:
+        mask &= df["actor_email"] == actor_email.strip()
+    if action_types:
+        mask &= df["action_type"].isin(action_types)
+    if start is not None:
+        mask &= df["created_at"] >= pd.Timestamp(start)
+    if end_exclusive is not None:
+        mask &= df["created_at"] < pd.Timestamp(end_exclusive)
+    if after is not None:
+        after_at = pd.Timestamp(after[0])
+        mask &= (df["created_at"] < after_at) | (
+            (df["created_at"] == after_at) & (df["id"] < int(after[1]))
+        )
+
+    df = df.loc[mask].sort_values(["created_at", "id"], ascending=False).head(limit)
+    names = get_items_df().set_index("id")["name"]
+    df["item_name"] = df["item_id"].map(names)
+    return df.reset_index(drop=True)
+
+
+def create_price_change_request(
+    item_id: int,
+    date_str: str,
+    old_price_zeny: int,
+    new_price_zeny: int,
+    requested_by: str,
+    reason: str | None = None,
+    refine: int | None = None,
+    card_ids: str | None = None,
+    extra_desc: str | None = None,
+    variation_key: str | None = None,
+) -> int:
+    """
+    Cria um pedido de alteração e retorna seu ID.
+
+    OBS: refine / card_ids / extra_desc / variation_key têm default,
+    então chamadas antigas continuam válidas.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    vk = variation_key or ""
+    cur.execute(
+        """
+        INSERT INTO price_change_requests
+            (item_id, date, old_price, new_price,
+             reason, created_by, refine, card_ids, extra_desc, variation_key)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        RETURNING id;
+        """,
+        (
+            item_id,
+            date_str,
+            old_price_zeny,
+            new_price_zeny,
+            reason,
+            requested_by,
+            refine,
+            card_ids,
+            extra_desc,
+            vk,
+        ),
+    )
+    req_id = cur.fetchone()[0]
+    conn.commit()
+    cur.close()
+    conn.close()
+    mark_write()
+    _clear_pending_caches()
+
+    # tenta logar na price_audit_log (se existir)
+    try:
+        log_price_action(
+            item_id=item_id,
+            date_str=date_str,
+            action_type="request_create",
+            actor_email=requested_by,
+            actor_role="user",
+            old_price=old_price_zeny,
+            new_price=new_price_zeny,
+            request_id=req_id,
+            refine=refine,
+            card_ids=card_ids,
+            extra_desc=extra_desc,
+            variation_key=vk,
+        )
+    except Exception as e:
+        print(f"[WARN] Falha ao gravar em price_audit_log (create): {e}")
+
+    return req_id
+
+
+@ttl_cache(ttl=_read_ttl, maxsize=1)
+def get_pending_requests():
+    """
+    Retorna todos os pedidos pendentes (para admins).
+    """
+    return query_df(
+        """
+        SELECT r.*, i.name AS item_name
+        FROM price_change_requests r
+        JOIN items i ON i.id = r.item_id
+        WHERE r.status = 'pending'
+        ORDER BY r.created_at ASC;
+        """,
+        primary=read_primary("price_change_requests"),
+    )
+
+
+@ttl_cache(ttl=_read_ttl, maxsize=1)
+def count_pending_requests() -> int:
+    """Quantidade de pedidos pendentes (badge da fila de admin)."""
+    df = query_df(
+        "SELECT COUNT(*) AS n FROM price_change_requests WHERE status = 'pending';",
+        primary=read_primary("price_change_requests"),
+    )
+    return int(df.iloc[0]["n"]) if not df.empty else 0
+
+
+@ttl_cache(ttl=_read_ttl, maxsize=64)
+def get_pending_requests_page(
+    after: tuple | None = None,
+    page_size: int = 25,
+) -> tuple[pd.DataFrame, tuple | None]:
+    """
+    Uma página da fila de pendentes, mais antigos primeiro.
+
+    - after: cursor (created_at, id) devolvido pela página anterior
+
+    Keyset em (created_at, id): no Postgres usa o índice parcial de
+    pendentes (init_db); no SQLite, idx_price_change_requests_status (o id
+    já vem no rowid). Cada página lê só page_size + 1 linhas, sem OFFSET.
+    Retorna (df_pagina, cursor_da_proxima_pagina); o cursor é None na
+    última página.
+    """
+    clause = ""
+    params: list = []
+    if after is not None:
+        clause = "AND (r.created_at, r.id) > (%s, %s)"
+        params.extend(after)
+
+    df = query_df(
+        f"""
+        SELECT pg.*, i.name AS item_name
+        FROM (
+            SELECT r.*
+            FROM price_change_requests r
+            WHERE r.status = 'pending'
+              {clause}
+            ORDER BY r.created_at ASC, r.id ASC
+            LIMIT %s
+        ) pg
+        JOIN items i ON i.id = pg.item_id
+        ORDER BY pg.created_at ASC, pg.id ASC;
+        """,
+        (*params, int(page_size) + 1),
+        primary=read_primary("price_change_requests"),
+    )
+
+    next_cursor = None
+    if len(df) > page_size:
+        df = df.iloc[:page_size]
+        last = df.iloc[-1]
+        created_at = last["created_at"]
+        if hasattr(created_at, "isoformat"):
+            created_at = created_at.isoformat(sep=" ")
+        next_cursor = (str(created_at), int(last["id"]))
+
+    return df, next_cursor
+
+
+def _clear_pending_caches() -> None:
+    """Limpa tudo que depende da fila de pendentes (lista, páginas, contagem)."""
+    get_pending_requests.clear()
+    get_pending_requests_page.clear()
+    count_pending_requests.clear()
+
+
+_REQUEST_COLUMNS = (
+    "id, item_id, date, old_price, new_price, "
+    "refine, card_ids, extra_desc, variation_key"
+)
+
+
+def _close_requests(
+    request_ids,
+    status: str,
+    reviewer_email: str,
+    comment: str | None = None,
+) -> tuple[list[dict], object]:
+    """
+    Fecha (status + revisor) as solicitações ainda pendentes entre request_ids e
+    devolve as linhas fechadas junto com a conexão ABERTA, sem commit: quem chama
+    completa a transação. O filtro status = 'pending' trava as linhas no
+    Postgres, então duas revisões simultâneas não fecham o mesmo pedido.
+    """
+    ids = sorted({int(i) for i in request_ids})
+    conn = get_connection()
+    if not ids:
+        return [], conn
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            f"""
+            UPDATE price_change_requests
+               SET status = %s,
+                   reviewed_by = %s,
+                   reviewed_at = NOW(),
+                   review_comment = COALESCE(%s, review_comment)
+             WHERE id IN ({", ".join(["%s"] * len(ids))})
+               AND status = 'pending'
+            RETURNING {_REQUEST_COLUMNS};
+            """,
+            (status, reviewer_email, comment, *ids),
+        )
+        names = [c.strip() for c in _REQUEST_COLUMNS.split(",")]
+        rows = [dict(zip(names, r)) for r in cur.fetchall()]
+    except Exception:
+        conn.rollback()
+        conn.close()
+        raise
+    finally:
+        cur.close()
+
+    for row in rows:
+        row["id"] = int(row["id"])
+        row["item_id"] = int(row["item_id"])
+        row["date"] = str(row["date"])
+        row["old_price"] = to_int_or_none(row["old_price"])
+        row["new_price"] = to_int_or_none(row["new_price"])
+        row["refine"] = to_int_or_none(row["refine"])
+        row["variation_key"] = row["variation_key"] or ""
+    rows.sort(key=lambda r: r["id"])
+    return rows, conn
+
+
+def _request_audit_row(row: dict, action_type: str, reviewer_email: str) -> dict:
+    return {
+        "item_id": row["item_id"],
+        "date": row["date"],
+        "action_type": action_type,
+        "old_price": row["old_price"],
+        "new_price": row["new_price"],
+        "actor_email": reviewer_email,
+        "actor_role": "admin",
+        "request_id": row["id"],
+        "refine": row["refine"],
+        "card_ids": row["card_ids"],
+        "extra_desc": row["extra_desc"],
+        "variation_key": row["variation_key"],
+    }
+
+
+def approve_price_requests(request_ids, reviewer_email: str) -> list[int]:
+    """
+    Aprova várias solicitações de uma vez, numa única transação: fecha os
+    pedidos, aplica os novos preços (um UPDATE ... FROM) e grava a auditoria
+    (price_audit_log + price_change_logs). Depois do commit: fila de pendentes
+    limpa e um evento por variação alterada (despejo só do que depende dela).
+
+    Pedidos que já não estavam pendentes são ignorados. Se vários pedidos
+    mexem no mesmo (item, dia, variação), vale o mais recente (maior id),
+    como se tivessem sido aprovados um a um.
+    Retorna os IDs efetivamente aprovados.
+    """
+    rows, conn = _close_requests(request_ids, "approved", reviewer_email)
+    if not rows:
+        conn.close()
+        return []
+
+    latest: dict[tuple, int] = {}
+    for row in rows:
+        latest[(row["item_id"], row["date"], row["variation_key"])] = row["id"]
+    winners = sorted(latest.values())
+
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            f"""
+            UPDATE prices
+               SET price_zeny = r.new_price,
+                   updated_at = NOW()
+              FROM price_change_requests r
+             WHERE r.id IN ({", ".join(["%s"] * len(winners))})
+               AND prices.item_id = r.item_id
+               AND prices.date = r.date
+               AND prices.variation_key = COALESCE(r.variation_key, '');
+            """,
+            tuple(winners),
+        )
+        audit.insert_rows(
+            cur,
+            "price_audit_log",
+            [_request_audit_row(r, "request_approve", reviewer_email) for r in rows],
+        )
+        audit.insert_rows(
+            cur,
+            "price_change_logs",
+            [
+                {
+                    "item_id": r["item_id"],
+                    "date": r["date"],
+                    "old_price_zeny": r["old_price"] if r["old_price"] is not None else 0,
+                    "new_price_zeny": r["new_price"],
+                    "changed_by": reviewer_email,
+                    "source": "REQUEST_APPROVED",
+                    "refine": r["refine"],
+                    "card_ids": r["card_ids"],
+                    "extra_desc": r["extra_desc"],
+                    "variation_key": r["variation_key"],
+                }
+                for r in rows
+            ],
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+    mark_write()
+
+    _clear_pending_caches()
+    for item_id, variation_key in sorted({(r["item_id"], r["variation_key"]) for r in rows}):
+        notify_variation_change(item_id, variation_key)
+    return [r["id"] for r in rows]
+
+
+def reject_price_requests(
+    request_ids,
+    reviewer_email: str,
+    comment: str | None = None,
+) -> list[int]:
+    """
+    Rejeita várias solicitações numa única transação (pedidos + auditoria).
+    Retorna os IDs efetivamente rejeitados (os que ainda estavam pendentes).
+    """
+    rows, conn = _close_requests(request_ids, "rejected", reviewer_email, comment)
+    if not rows:
+        conn.close()
+        return []
+
+    cur = conn.cursor()
+    try:
+        audit.insert_rows(
+            cur,
+            "price_audit_log",
+            [_request_audit_row(r, "request_reject", reviewer_email) for r in rows],
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+    mark_write()
+
+    # Nenhum preço mudou: basta a fila de pendentes
+    _clear_pending_caches()
+    return [r["id"] for r in rows]
+
+
+def approve_price_request(
+    request_id: int,
+    reviewer_email: str,
+):
+    """
+    Admin aprova a solicitação → atualiza o preço e fecha o pedido.
+    """
+    if not approve_price_requests([request_id], reviewer_email):
+        raise ValueError("Solicitação não encontrada (ou já revisada).")
+
+
+def reject_price_request(
+    request_id: int,
+    reviewer_email: str,
+    comment: str | None = None,
+):
+    """
+    Admin rejeita a solicitação.
+    """
+    reject_price_requests([request_id], reviewer_email, comment)
+
+
+# ======================================================
+#  Invalidação fina (escritas deste ou de outros processos)
+# ======================================================
+def _evict_variation_caches(item_id: int, variation_key: str) -> None:
+    """Remove só o que depende de (item_id, variation_key); agregados globais são limpos."""
+    _get_price_history_df_cached.evict(lambda args: args[:1] == (item_id,))
+    _get_item_variations_cached.evict(lambda args: args[:1] == (item_id,))
+    _get_last_prices_cached.evict(lambda args: args[:2] == (item_id, variation_key))
+    get_latest_priced_item.clear()
+    _get_all_prices_df_cached.clear()
+    _get_market_page_cached.clear()
+    count_market_rows.clear()
+
+
+on_variation_change(_evict_variation_caches)
+notify.on_request_change(_clear_pending_caches)
@@ -0,0 +1,237 @@
+# core/snapshot.py
+"""
+Snapshot de preços compartilhado entre processos do mesmo host (Arrow IPC).
+
+Com vários servidores Streamlit na mesma máquina, cada um guardava sua
+própria cópia da tabela de preços. Aqui:
+
+  - um processo publica prices como arquivo Arrow IPC em
+    <dir>/prices-<v>.arrow e troca o ponteiro <dir>/current.json de forma
+    atômica (os.replace);
+  - todos os processos abrem os arquivos com memory-map (zero-copy): a
+    memória é a do page cache do SO, paga uma vez por host;
+  - a publicação é protegida por um lock de arquivo (<dir>/.lock): quando a
+    versão do banco muda, só um processo reconstrói, os outros esperam e
+    reaproveitam.
+
+A versão é uma impressão digital barata do banco (linhas, maior id, última
+criação/edição), conferida no máximo a cada [snapshot] check_interval
+segundos (padrão 5) — ou logo após uma escrita neste processo.
+
+O resumo de mercado NÃO entra no snapshot: o Monitor já lê a tabela de
+mercado paginada no banco (get_market_page), então publicá-lo só custava
+uma consulta e um arquivo a cada versão. Leitor atual: a página de
+exclusão de preços.
+
+Diretório: [snapshot] dir (padrão .cache/snapshot). O tempo de cada
+publicação vai para core.metrics (kind "snapshot").
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from core import metrics
+from core.config import ROOT, get_section
+from core.connection import query_df, read_primary
+from core.events import on_variation_change
+from core.locks import HostLock
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+DEFAULT_DIR = ROOT / ".cache" / "snapshot"
+DEFAULT_CHECK_INTERVAL = 5.0
+POINTER_NAME = "current.json"
+
+_current: Snapshot | None = None
+_checked_at = float("-inf")
+_dirty = False
+_lock = threading.Lock()
+
+
+def snapshot_dir() -> Path:
+    path = Path(get_section("snapshot").get("dir", DEFAULT_DIR))
+    return path if path.is_absolute() else ROOT / path
+
+
+class Snapshot:
+    """Tabelas Arrow mapeadas em memória (somente leitura)."""
+
+    __slots__ = ("version", "prices", "_sources")
+
+    def __init__(self, version: str, prices: pa.Table, sources):
+        self.version = version
+        self.prices = prices
+        # Mantém os arquivos mapeados vivos enquanto o snapshot existir
+        self._sources = sources
+
+    @property
+    def n_prices(self) -> int:
+        return self.prices.num_rows
+
+    def item_ids_with_prices(self) -> list[int]:
+        import pyarrow.compute as pc
+
+        return sorted(pc.unique(self.prices["item_id"]).to_pylist())
+
+    def prices_df(self, item_id: int | None = None) -> pd.DataFrame:
+        """Preços (todos ou de um item) como DataFrame novo."""
+        table = self.prices
+        if item_id is not None:
+            import pyarrow.compute as pc
+
+            table = table.filter(pc.equal(table["item_id"], int(item_id)))
+        return table.to_pandas()
+
+
+def _mark_dirty(item_id: int, variation_key: str) -> None:
+    global _dirty
+    _dirty = True
+
+
+on_variation_change(_mark_dirty)
+
+
+# ======================================================
+#  Publicação (um processo por host)
+# ======================================================
+def _db_fingerprint() -> str:
+    df = query_df(
+        """
+        SELECT COUNT(*) AS n_rows,
+               MAX(id) AS max_id,
+               MAX(COALESCE(updated_at, created_at)) AS last_change
+        FROM prices;
+        """,
+        primary=read_primary("prices"),
+    )
+    row = df.iloc[0]
+    return f"{int(row['n_rows'])}:{row['max_id']}:{row['last_change']}"
+
+
+def _read_pointer(base: Path) -> dict | None:
+    try:
+        with open(base / POINTER_NAME, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_arrow(df: pd.DataFrame, path: Path) -> None:
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp = path.with_name(path.name + ".tmp")
+    with pa.OSFile(str(tmp), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def _cleanup(base: Path, keep: set[str]) -> None:
+    # Processos que ainda mapeiam arquivos antigos continuam funcionando:
+    # no POSIX o conteúdo só some quando o último mapeamento fecha
+    for path in base.glob("*.arrow"):
+        if path.name not in keep:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def publish(version: str | None = None) -> dict:
+    """
+    Gera uma nova versão do snapshot (se o banco mudou) e troca o ponteiro.
+    Seguro para chamar de vários processos ao mesmo tempo.
+    """
+    # SQL do repository: mesma tabela de preços
+    from core.repository import _get_all_prices_df_cached
+
+    base = snapshot_dir()
+    with HostLock(base / ".lock"):
+        version = version or _db_fingerprint()
+        pointer = _read_pointer(base)
+        # Outro processo publicou esta versão enquanto esperávamos o lock
+        if pointer and pointer["version"] == version:
+            return pointer
+
+        start = time.perf_counter()
+        token = f"{int(time.time() * 1000):x}"
+        prices_name = f"prices-{token}.arrow"
+
+        prices = _get_all_prices_df_cached.__wrapped__()
+        _write_arrow(prices, base / prices_name)
+
+        new_pointer = {
+            "version": version,
+            "prices": prices_name,
+            "published_at": time.time(),
+        }
+        tmp = base / (POINTER_NAME + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(new_pointer, f)
+        os.replace(tmp, base / POINTER_NAME)
+
+        keep = {prices_name}
+        if pointer:
+            keep.add(pointer["prices"])
+        _cleanup(base, keep)
+
+        metrics.record(
+            "snapshot",
+            "publish prices snapshot",
+            time.perf_counter() - start,
+            rows=len(prices),
+            nbytes=(base / prices_name).stat().st_size,
+        )
+        return new_pointer
+
+
+# ======================================================
+#  Leitura (memory-map em cada processo)
+# ======================================================
+def _open(base: Path, pointer: dict) -> Snapshot:
+    import pyarrow as pa
+
+    source = pa.memory_map(str(base / pointer["prices"]), "r")
+    prices = pa.ipc.open_file(source).read_all()
+    return Snapshot(pointer["version"], prices, [source])
+
+
+def get_snapshot() -> Snapshot:
+    """
+    Snapshot atual do host. Confere a versão do banco no máximo a cada
+    check_interval segundos (ou após escrita local) e republica se mudou.
+    """
+    global _current, _checked_at, _dirty
+
+    interval = float(
+        get_section("snapshot").get("check_interval", DEFAULT_CHECK_INTERVAL)
+    )
+    base = snapshot_dir()
+
+    with _lock:
+        now = time.monotonic()
+        if _current is not None and not _dirty and now - _checked_at < interval:
+            return _current
+
+        _dirty = False
+        version = _db_fingerprint()
+        pointer = _read_pointer(base)
+        if pointer is None or pointer["version"] != version:
+            pointer = publish(version)
+
+        if _current is None or _current.version != pointer["version"]:
+            try:
+                _current = _open(base, pointer)
+            except FileNotFoundError:
+                # Ponteiro trocou e limpou os arquivos entre a leitura e o open
+                _current = _open(base, _read_pointer(base))
+        _checked_at = now
+        return _current
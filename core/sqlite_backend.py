@@ -0,0 +1,316 @@
+# core/sqlite_backend.py
+"""
+Backend SQLite (arquivo local, modo WAL) com a mesma API do Postgres.
+
+O repository continua escrevendo SQL no dialeto do Postgres com
+placeholders %s; aqui a conexão traduz para o SQLite:
+  - %s -> ?
+  - NOW() vira uma função registrada (hora local, como o market.db antigo)
+  - DATE / TIMESTAMP declarados voltam como date / datetime
+
+O schema (todas as tabelas + índices) é criado/migrado na primeira conexão
+do processo. Um market.db legado (prices sem colunas de variação, preço
+REAL) é migrado in-place; a versão fica em PRAGMA user_version.
+
+Selecionado com [database] backend = "sqlite" (caminho em [sqlite] path,
+padrão .cache/market.db). Sem path configurado, o market.db versionado na
+raiz nunca é aberto para escrita: na primeira conexão ele é COPIADO para
+.cache/market.db e só a cópia é migrada.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import sqlite3
+import threading
+from datetime import date, datetime
+from pathlib import Path
+
+from core.config import ROOT, get_section
+
+DEFAULT_PATH = ROOT / ".cache" / "market.db"
+LEGACY_PATH = ROOT / "market.db"
+SCHEMA_VERSION = 2
+
+_schema_ready: set[str] = set()
+_schema_lock = threading.Lock()
+
+
+def _adapt_numpy() -> None:
+    # Inteiros/floats do pandas (numpy) chegam como parâmetros com frequência
+    try:
+        import numpy as np
+    except ImportError:
+        return
+    for t in (np.int64, np.int32):
+        sqlite3.register_adapter(t, int)
+    sqlite3.register_adapter(np.float64, float)
+
+
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda v: v.isoformat(sep=" "))
+sqlite3.register_converter("DATE", lambda b: date.fromisoformat(b.decode()[:10]))
+sqlite3.register_converter("TIMESTAMP", lambda b: datetime.fromisoformat(b.decode()))
+_adapt_numpy()
+
+
+def db_path() -> Path:
+    path = Path(get_section("sqlite").get("path", DEFAULT_PATH))
+    return path if path.is_absolute() else ROOT / path
+
+
+def translate(sql: str) -> str:
+    """Placeholders do psycopg2 (%s) -> sqlite3 (?)."""
+    return sql.replace("%s", "?")
+
+
+def _now() -> str:
+    return datetime.now().isoformat(sep=" ", timespec="seconds")
+
+
+class Cursor:
+    """Cursor sqlite3 que aceita SQL com %s (mesma interface usada do psycopg2)."""
+
+    def __init__(self, cur: sqlite3.Cursor):
+        self._cur = cur
+
+    def execute(self, sql, params=None):
+        self._cur.execute(translate(sql), params or ())
+        return self
+
+    def executemany(self, sql, seq):
+        self._cur.executemany(translate(sql), seq)
+        return self
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+    @property
+    def rowcount(self) -> int:
+        return self._cur.rowcount
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    def close(self) -> None:
+        self._cur.close()
+
+    def __iter__(self):
+        return iter(self._cur)
+
+
+class Connection:
+    """Conexão no formato esperado pelo repository (cursor/commit/rollback/close)."""
+
+    def __init__(self, raw: sqlite3.Connection):
+        self.raw = raw
+
+    def cursor(self) -> Cursor:
+        return Cursor(self.raw.cursor())
+
+    def commit(self) -> None:
+        self.raw.commit()
+
+    def rollback(self) -> None:
+        self.raw.rollback()
+
+    def close(self) -> None:
+        self.raw.close()
+
+
+def _prepare_file(path: Path) -> None:
+    """Cria a pasta do arquivo; o padrão nasce como cópia do market.db da raiz."""
+    with _schema_lock:
+        if path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path == DEFAULT_PATH and LEGACY_PATH.exists():
+            print(f"[INFO] Copiando {LEGACY_PATH.name} para {path} (o original não é alterado)...")
+            tmp = path.with_name(path.name + ".tmp")
+            shutil.copyfile(LEGACY_PATH, tmp)
+            os.replace(tmp, path)
+
+
+def connect_raw() -> sqlite3.Connection:
+    """sqlite3.Connection configurada (usada direto pelo pandas.read_sql)."""
+    path = db_path()
+    if str(path) not in _schema_ready:
+        _prepare_file(path)
+    raw = sqlite3.connect(
+        path,
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        timeout=5.0,
+        check_same_thread=False,
+    )
+    raw.create_function("NOW", 0, _now)
+    raw.execute("PRAGMA synchronous = NORMAL;")
+    raw.execute("PRAGMA foreign_keys = ON;")
+    _ensure_schema(raw, str(path))
+    return raw
+
+
+def connect() -> Connection:
+    return Connection(connect_raw())
+
+
+# ======================================================
+#  Schema + migração do market.db legado
+# ======================================================
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id   INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS prices (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_id       INTEGER NOT NULL REFERENCES items(id),
+    date          DATE NOT NULL,
+    price_zeny    INTEGER NOT NULL,
+    refine        INTEGER NOT NULL DEFAULT 0,
+    card_ids      TEXT,
+    extra_desc    TEXT,
+    variation_key TEXT NOT NULL DEFAULT '',
+    created_at    TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime')),
+    updated_at    TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_prices_item_variation_date
+    ON prices (item_id, variation_key, date DESC, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_prices_date_created
+    ON prices (date DESC, created_at DESC);
+
+CREATE TABLE IF NOT EXISTS price_change_logs (
+    id             INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_id        INTEGER NOT NULL,
+    date           DATE NOT NULL,
+    old_price_zeny INTEGER,
+    new_price_zeny INTEGER NOT NULL,
+    changed_by     TEXT,
+    source         TEXT,
+    refine         INTEGER,
+    card_ids       TEXT,
+    extra_desc     TEXT,
+    variation_key  TEXT NOT NULL DEFAULT '',
+    created_at     TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE IF NOT EXISTS price_change_requests (
+    id             INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_id        INTEGER NOT NULL REFERENCES items(id),
+    date           DATE NOT NULL,
+    old_price      INTEGER,
+    new_price      INTEGER NOT NULL,
+    reason         TEXT,
+    created_by     TEXT,
+    status         TEXT NOT NULL DEFAULT 'pending',
+    refine         INTEGER,
+    card_ids       TEXT,
+    extra_desc     TEXT,
+    variation_key  TEXT NOT NULL DEFAULT '',
+    created_at     TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime')),
+    reviewed_by    TEXT,
+    reviewed_at    TIMESTAMP,
+    review_comment TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_price_change_requests_status
+    ON price_change_requests (status, created_at);
+
+CREATE TABLE IF NOT EXISTS price_audit_log (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_id       INTEGER NOT NULL,
+    date          DATE NOT NULL,
+    action_type   TEXT NOT NULL,
+    old_price     INTEGER,
+    new_price     INTEGER,
+    actor_email   TEXT,
+    actor_role    TEXT,
+    request_id    INTEGER,
+    refine        INTEGER,
+    card_ids      TEXT,
+    extra_desc    TEXT,
+    variation_key TEXT NOT NULL DEFAULT '',
+    created_at    TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+
+-- Explorador da auditoria: keyset em (created_at, id), com e sem filtro
+CREATE INDEX IF NOT EXISTS idx_price_audit_log_created
+    ON price_audit_log (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_price_audit_log_item_created
+    ON price_audit_log (item_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_price_audit_log_actor_created
+    ON price_audit_log (actor_email, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_price_audit_log_action_created
+    ON price_audit_log (action_type, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_price_change_logs_created
+    ON price_change_logs (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_price_change_logs_item_created
+    ON price_change_logs (item_id, created_at DESC, id DESC);
+"""
+
+
+def _apply_schema(raw: sqlite3.Connection) -> None:
+    # Um statement por vez (executescript faria COMMIT no meio da migração)
+    for stmt in _SCHEMA.split(";"):
+        if stmt.strip():
+            raw.execute(stmt)
+
+
+def _migrate_legacy_prices(raw: sqlite3.Connection) -> None:
+    """
+    market.db antigo: prices(id, item_id, date TEXT, price_zeny REAL, created_at).
+    Recria a tabela no schema atual preservando ids e datas.
+    """
+    cols = {r[1] for r in raw.execute("PRAGMA table_info(prices);")}
+    if not cols or "variation_key" in cols:
+        return
+
+    print("[INFO] Migrando prices do market.db legado para o schema atual...")
+    raw.execute("ALTER TABLE prices RENAME TO prices_legacy;")
+    # O índice antigo (se houver) foi junto com a tabela renomeada
+    raw.execute("DROP INDEX IF EXISTS idx_prices_item_variation_date;")
+    raw.execute("DROP INDEX IF EXISTS idx_prices_date_created;")
+    _apply_schema(raw)
+    raw.execute(
+        """
+        INSERT INTO prices (id, item_id, date, price_zeny, created_at)
+        SELECT id, item_id, date, CAST(ROUND(price_zeny) AS INTEGER), created_at
+        FROM prices_legacy;
+        """
+    )
+    raw.execute("DROP TABLE prices_legacy;")
+
+
+def _ensure_schema(raw: sqlite3.Connection, key: str) -> None:
+    if key in _schema_ready:
+        return
+    with _schema_lock:
+        if key in _schema_ready:
+            return
+        # WAL é persistente no arquivo: leitores não bloqueiam o escritor
+        raw.execute("PRAGMA journal_mode = WAL;")
+        version = raw.execute("PRAGMA user_version;").fetchone()[0]
+        if version < SCHEMA_VERSION:
+            raw.execute("PRAGMA foreign_keys = OFF;")
+            raw.execute("BEGIN;")
+            try:
+                _migrate_legacy_prices(raw)
+                _apply_schema(raw)
+                raw.execute(f"PRAGMA user_version = {SCHEMA_VERSION};")
+                raw.commit()
+            except Exception:
+                raw.rollback()
+                raise
+            finally:
+                raw.execute("PRAGMA foreign_keys = ON;")
+        _schema_ready.add(key)
+
+
+def init_schema() -> None:
+    """Cria/migra o schema (equivalente ao init_db do Postgres)."""
+    connect_raw().close()
@@ -1,25 +1,32 @@
 # pages/01_📈_Monitor_de_Mercado.py
+from collections import Counter
 from datetime import date, timedelta
+from functools import partial
 
-import altair as alt
 import pandas as pd
 import streamlit as st
-import unicodedata
 
+from core.aio import load_concurrently
+from core.catalog import get_catalog, normalize_text
+from ui.charts import history_spec, sparkline_spec
+from ui.profiling import render_overlay, section, timed
 from ui.theme import apply_theme
 from db.database import (
-    get_items_df,
     insert_price,
     get_price_history_df,
-    get_all_prices_df,
     get_existing_price,
     update_price,
     create_price_change_request,
     log_price_change,
     log_price_action,
     get_pending_requests,
+    get_latest_priced_item,
+    get_item_variations,
+    get_summary_row,
+    to_int_or_none,
+    get_market_page,
+    count_market_rows,
 )
-from services.market import compute_summary
 
 # ============================================
 #  Tema / layout base
@@ -84,6 +91,9 @@ st.markdown(
 
 apply_theme("Monitor de Mercado – Ragnarok LATAM", page_icon="📈")
 
+# Máximo de pontos enviados ao gráfico de histórico (configurável em secrets [charts])
+CHART_MAX_POINTS = int(st.secrets.get("charts", {}).get("max_points", 400))
+
 
 def is_admin() -> bool:
     """Retorna True se o e-mail logado estiver na lista de admins."""
@@ -92,26 +102,17 @@ def is_admin() -> bool:
     return email in admins
 
 
-def normalize_text(txt: str) -> str:
-    if not isinstance(txt, str):
-        return ""
-    return (
-        unicodedata.normalize("NFKD", txt)
-        .encode("ASCII", "ignore")
-        .decode("utf-8")
-        .lower()
-    )
-
-
-def normalize_variation_key_df(df: pd.DataFrame) -> pd.DataFrame:
+def normalize_variation_key_df(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """
     Normaliza a coluna variation_key para evitar duplicidade entre:
     - registros antigos (variation_key = '' ou NULL)
     - registros novos simples (variation_key = 'r0' sem cartas / extra)
 
-    Tudo isso vira 'base'.
+    Tudo isso vira 'base'. copy=False altera df no lugar (quando ele já é
+    uma cópia própria).
     """
-    df = df.copy()
+    if copy:
+        df = df.copy()
 
     if "variation_key" not in df.columns:
         df["variation_key"] = "base"
@@ -148,32 +149,22 @@ def normalize_variation_key_df(df: pd.DataFrame) -> pd.DataFrame:
 
 
 # ============================================
-#  Cache de dados
+#  Histórico por variação
 # ============================================
-@st.cache_data(ttl=30, show_spinner=False)
-def get_items_cached() -> pd.DataFrame:
-    return get_items_df()
-
-
-@st.cache_data(ttl=30, show_spinner=False)
-def get_all_prices_cached() -> pd.DataFrame:
-    return get_all_prices_df()
-
-
-@st.cache_data(ttl=30, show_spinner=False)
-def get_price_history_cached(item_id: int, variation_key: str | None) -> pd.DataFrame:
+def get_variation_history(item_id: int, variation_key: str | None) -> pd.DataFrame:
     """
-    Wrapper cacheado para histórico.
+    Wrapper para histórico (o cache fica no core, invalidado por item via
+    LISTEN/NOTIFY; aqui só normaliza e filtra).
     Se variation_key for informado, filtra; caso contrário, retorna histórico completo do item.
     Normaliza variation_key para unir registros antigos ('', NULL, 'r0' simples) em 'base'.
     """
-    df = get_price_history_df(item_id)
-    df = normalize_variation_key_df(df)
+    # get_price_history_df já devolve uma cópia: normaliza no lugar
+    df = normalize_variation_key_df(prefetched(get_price_history_df, item_id), copy=False)
 
     if variation_key:
-        df = df[df["variation_key"] == variation_key]
+        df = df.loc[df["variation_key"] == variation_key].reset_index(drop=True)
 
-    return df.copy()
+    return df
 
 
 def build_display_name(
@@ -227,112 +218,65 @@ def build_display_name(
         return item_name
 
 
-@st.cache_data(ttl=30, show_spinner=False)
-def get_global_summary_cached() -> pd.DataFrame:
+def summarize_cards(card_ids_raw, card_id_to_name: dict[int, str]) -> str:
     """
-    Resumo global por VARIAÇÃO do item (cada combinação refino+cartas+extra vira uma linha).
-    Agora já devolve também uma coluna 'Cartas' agregada
+    Cartas agregadas de uma variação
     (ex: "2x Carta Louva-a-deus Angra, 1x Carta Cavaleiro do Abismo").
     """
-    df_prices_all = get_all_prices_cached()
-    if df_prices_all.empty:
-        return pd.DataFrame()
-
-    # Mapa id -> nome (para cartas / display)
-    items_df = get_items_cached()
-    card_id_to_name = dict(zip(items_df["id"], items_df["name"]))
-
-    # Normaliza variation_key ('' / NULL / 'r0' simples -> 'base')
-    df = normalize_variation_key_df(df_prices_all)
-
-    # Nome exibido levando em conta refino, cartas e encantos
-    df["item_display"] = df.apply(
-        lambda r: build_display_name(
-            item_name=r["item_name"],
-            refine=r.get("refine"),
-            card_ids=r.get("card_ids"),
-            extra_desc=r.get("extra_desc"),
-            card_id_to_name=card_id_to_name,
-        ),
-        axis=1,
-    )
-
-    # Cada combinação (item_id + variation_key) vira um "item" independente
-    df["item_id_var"] = df["item_id"].astype(str) + "|" + df["variation_key"]
-
-    # ---- Cartas agregadas por variação (para o resumo) ----
-    df["date_parsed"] = pd.to_datetime(df["date"])
-
-    last_per_var = (
-        df.sort_values("date_parsed")
-        .groupby("item_id_var", as_index=False)
-        .last()
-    )
-
-    from collections import Counter
-
-    def summarize_cards(card_ids_raw):
-        ids_list: list[int] = []
-        if isinstance(card_ids_raw, list):
-            ids_list = [int(c) for c in card_ids_raw if c is not None]
-        elif isinstance(card_ids_raw, str) and card_ids_raw.strip():
-            for tok in card_ids_raw.split(","):
-                tok = tok.strip()
-                if tok:
-                    try:
-                        ids_list.append(int(tok))
-                    except ValueError:
-                        pass
-
-        if not ids_list:
-            return "-"
+    ids_list: list[int] = []
+    if isinstance(card_ids_raw, list):
+        ids_list = [int(c) for c in card_ids_raw if c is not None]
+    elif isinstance(card_ids_raw, str) and card_ids_raw.strip():
+        for tok in card_ids_raw.split(","):
+            tok = tok.strip()
+            if tok:
+                try:
+                    ids_list.append(int(tok))
+                except ValueError:
+                    pass
 
-        counts = Counter(ids_list)
-        labels: list[str] = []
-        for cid, qty in counts.items():
-            name = card_id_to_name.get(cid, str(cid))
-            labels.append(f"{qty}x {name}")
-        return ", ".join(labels)
+    if not ids_list:
+        return "-"
 
-    last_per_var["Cartas"] = last_per_var["card_ids"].apply(summarize_cards)
+    counts = Counter(ids_list)
+    labels: list[str] = []
+    for cid, qty in counts.items():
+        name = card_id_to_name.get(cid, str(cid))
+        labels.append(f"{qty}x {name}")
+    return ", ".join(labels)
 
-    df_cards_agg = last_per_var[["item_id_var", "item_display", "Cartas"]].rename(
-        columns={"item_display": "Item"}
-    )
 
-    # ---- DataFrame de entrada para compute_summary ----
-    df_summary_input = df[
-        ["item_id_var", "item_display", "date", "price_zeny"]
-    ].rename(
-        columns={
-            "item_id_var": "item_id",
-            "item_display": "item",
+def market_page_display(
+    df_page: pd.DataFrame,
+    card_id_to_name: dict[int, str],
+) -> pd.DataFrame:
+    """
+    Converte uma página de get_market_page (uma linha por variação)
+    nas colunas exibidas no dashboard. Só formata as linhas da página.
+    """
+    df = pd.DataFrame(
+        {
+            "Item": [
+                build_display_name(
+                    item_name=r["item_name"],
+                    refine=r.get("refine"),
+                    card_ids=r.get("card_ids"),
+                    extra_desc=r.get("extra_desc"),
+                    card_id_to_name=card_id_to_name,
+                )
+                for r in df_page.to_dict(orient="records")
+            ],
+            "Cartas": [
+                summarize_cards(c, card_id_to_name) for c in df_page["card_ids"]
+            ],
+            "Última data": pd.to_datetime(df_page["last_date"]).dt.date.astype(str),
+            "Últ. preço": df_page["last_price"].apply(fmt_zeny),
+            "Média 5d": df_page["mean_5"].apply(fmt_zeny),
+            "Var % vs 5d": df_page["var_pct"].apply(lambda x: fmt_pct(x * 100.0)),
+            "Status": df_page["status"],
         }
     )
-
-    df_summary = compute_summary(df_summary_input)
-
-    # Merge das cartas no resumo global
-    if "Item ID" in df_summary.columns:
-        df_summary = df_summary.merge(
-            df_cards_agg[["item_id_var", "Cartas"]]
-            .rename(columns={"item_id_var": "Item ID"}),
-            on="Item ID",
-            how="left",
-        )
-    else:
-        df_summary = df_summary.merge(
-            df_cards_agg[["Item", "Cartas"]],
-            on="Item",
-            how="left",
-        )
-
-    if "Cartas" not in df_summary.columns:
-        df_summary["Cartas"] = "-"
-
-    df_summary["Cartas"] = df_summary["Cartas"].fillna("-")
-
-    return df_summary
+    return df.reset_index(drop=True)
 
 
 # ============================================
@@ -461,136 +405,11 @@ def describe_variation(
     return " | ".join(parts)
 
 
-# ============================================
-#  Página principal
-# ============================================
-def render():
-    ss = st.session_state
-
-    # -------------------------------------------------
-    # RESET DE CAMPOS DE VARIAÇÃO (rodado ANTES DOS WIDGETS)
-    # -------------------------------------------------
-    if ss.get("reset_variation_fields", False):
-        ss["var_refine"] = 0
-        ss["var_extra_desc"] = ""
-        ss["var_card_slot_1"] = "(vazio)"
-        ss["var_card_slot_2"] = "(vazio)"
-        ss["var_card_slot_3"] = "(vazio)"
-        ss["var_card_slot_4"] = "(vazio)"
-        ss["reset_variation_fields"] = False
-
-    st.title("📈 Monitor de Mercado – Ragnarok LATAM")
-
-    if "is_saving" not in ss:
-        ss["is_saving"] = False
-
-    # Overlay global enquanto está salvando
-    if ss.get("is_saving", False):
-        st.markdown(
-            """
-            <style>
-            .loading-overlay {
-                position: fixed;
-                top: 0;
-                left: 0;
-                width: 100vw;
-                height: 100vh;
-                background: rgba(0, 0, 0, 0.65);
-                z-index: 9999;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-            }
-            .loading-overlay-content {
-                background: rgba(15,23,42,0.95);
-                padding: 1.5rem 2rem;
-                border-radius: 0.75rem;
-                border: 1px solid rgba(59,130,246,0.7);
-                font-size: 0.95rem;
-            }
-            </style>
-            <div class="loading-overlay">
-              <div class="loading-overlay-content">
-                ⏳ Processando sua ação...<br/>
-                <small>Por favor, aguarde alguns segundos.</small>
-              </div>
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
-
-    # ------------------------------
-    #  Estado global simples
-    # ------------------------------
-    if "price_value" not in ss:
-        ss["price_value"] = ""
-    if "last_item_id" not in ss:
-        ss["last_item_id"] = None
-    if "clear_price" not in ss:
-        ss["clear_price"] = False
-    if "flash_message" not in ss:
-        ss["flash_message"] = ""
-    if "flash_type" not in ss:
-        ss["flash_type"] = "success"
-    if "pending_update" not in ss:
-        ss["pending_update"] = None
-    if "price_action" not in ss:
-        ss["price_action"] = None
-    if "var_refine" not in ss:
-        ss["var_refine"] = 0
-    if "var_extra_desc" not in ss:
-        ss["var_extra_desc"] = ""
-    for i in range(1, 5):
-        key = f"var_card_slot_{i}"
-        if key not in ss:
-            ss[key] = "(vazio)"
-
-    # ------------------------------
-    #  Carrega itens e preços
-    # ------------------------------
-    items_df = get_items_cached()
-    if items_df.empty:
-        st.warning("Nenhum item encontrado. Verifique o arquivo items.json.")
-        return
-
-    df_prices_all = get_all_prices_cached()
-
-    # Itens "canônicos" por nome
-    items_df_sorted = items_df.sort_values("id")
-    items_canonical = (
-        items_df_sorted.groupby("name", as_index=False).first()[["id", "name"]]
-    )
-
-    item_list: list[dict] = []
-    for row in items_canonical.to_dict(orient="records"):
-        name = row["name"]
-        item_list.append(
-            {
-                "id": int(row["id"]),
-                "name": name,
-                "norm": normalize_text(name),
-            }
-        )
-
-    # Lista de cartas
-    cards_df = items_df_sorted[
-        items_df_sorted["name"].str.contains("carta", case=False, na=False)
-    ]
-    cards_list: list[dict] = []
-    for row in cards_df.to_dict(orient="records"):
-        name = row["name"]
-        cards_list.append(
-            {
-                "id": int(row["id"]),
-                "name": name,
-                "norm": normalize_text(name),
-            }
-        )
-    card_id_to_name: dict[int, str] = {c["id"]: c["name"] for c in cards_list}
-
-    # ======================================================
-    #  Seleção de item (somente fluxo normal, sem demo)
-    # ======================================================
+def select_item(item_list: list[dict]) -> dict | None:
+    """
+    Busca + seleção do item (somente fluxo normal, sem demo).
+    Retorna o item escolhido ou None (busca vazia / ampla demais).
+    """
     item_selected = None
 
     col_search, col_btn_search = st.columns([4, 1])
@@ -625,7 +444,7 @@ def render():
 
         if not filtered_items:
             st.warning("Nenhum item encontrado para esse termo de busca.")
-            return
+            return None
 
         n = len(filtered_items)
 
@@ -673,20 +492,16 @@ def render():
                 "Refine sua busca adicionando mais termos, "
                 "por exemplo: `pocao branca pequena`."
             )
-            return
+            return None
     else:
         filtered_items = item_list
         if not filtered_items:
             st.warning("Nenhum item encontrado. Verifique o arquivo items.json.")
-            return
+            return None
 
         selectbox_kwargs: dict = {}
-        default_item_id = None
-        if not df_prices_all.empty:
-            df_tmp = df_prices_all.copy()
-            df_tmp["date_parsed"] = pd.to_datetime(df_tmp["date"])
-            last_row = df_tmp.sort_values("date_parsed", ascending=False).iloc[0]
-            default_item_id = int(last_row["item_id"])
+        # Item padrão = item do preço mais recente (consulta de 1 linha)
+        default_item_id = get_latest_priced_item()
 
         if default_item_id is not None:
             for i, it in enumerate(filtered_items):
@@ -705,69 +520,177 @@ def render():
                 **selectbox_kwargs,
             )
 
-    if item_selected is None:
-        st.info("Escolha um item para começar.")
-        return
+    return item_selected
 
-    item_id = item_selected["id"]
-    item_name = item_selected["name"]
 
-    # ======================================================
-    #  Variações existentes desse item (para combo + análise)
-    # ======================================================
+def load_existing_variations(
+    item_id: int,
+    item_name: str,
+    card_id_to_name: dict[int, str],
+) -> list[dict]:
+    """Variações existentes do item (para combo de configuração + análise)."""
     existing_variations: list[dict] = []
-    if not df_prices_all.empty:
-        df_item_vars = df_prices_all[df_prices_all["item_id"] == item_id].copy()
-        df_item_vars = normalize_variation_key_df(df_item_vars)
-
-        if not df_item_vars.empty:
-            df_item_vars["date_parsed"] = pd.to_datetime(df_item_vars["date"])
-            df_item_vars = df_item_vars.sort_values("date_parsed")
-
-            # Um registro por variation_key (mais recente)
-            last_per_var = df_item_vars.groupby("variation_key", as_index=False).last()
-
-            for _, row in last_per_var.iterrows():
-                vk = row["variation_key"]
-                refine_val = row.get("refine")
-                extra_desc_val = row.get("extra_desc")
-                card_ids_raw = row.get("card_ids")
-
-                card_ids_list: list[int] = []
-                if isinstance(card_ids_raw, list):
-                    card_ids_list = [int(c) for c in card_ids_raw if c is not None]
-                elif isinstance(card_ids_raw, str) and card_ids_raw.strip():
-                    for tok in card_ids_raw.split(","):
-                        tok = tok.strip()
-                        if tok:
-                            try:
-                                card_ids_list.append(int(tok))
-                            except ValueError:
-                                pass
-
-                display_name = build_display_name(
-                    item_name=item_name,
-                    refine=refine_val,
-                    card_ids=card_ids_list,
-                    extra_desc=extra_desc_val,
-                    card_id_to_name=card_id_to_name,
-                )
 
-                existing_variations.append(
-                    {
-                        "variation_key": vk,
-                        "refine": int(refine_val) if refine_val is not None else 0,
-                        "extra_desc": extra_desc_val or "",
-                        "card_ids_list": card_ids_list,
-                        "display_name": display_name,
-                    }
-                )
+    # Um registro por variation_key (mais recente), já normalizada no banco
+    last_per_var = prefetched(get_item_variations, item_id)
+
+    for _, row in last_per_var.iterrows():
+        vk = row["variation_key"]
+        refine_val = to_int_or_none(row.get("refine"))
+        extra_desc_val = row.get("extra_desc")
+        card_ids_raw = row.get("card_ids")
+
+        card_ids_list: list[int] = []
+        if isinstance(card_ids_raw, list):
+            card_ids_list = [int(c) for c in card_ids_raw if c is not None]
+        elif isinstance(card_ids_raw, str) and card_ids_raw.strip():
+            for tok in card_ids_raw.split(","):
+                tok = tok.strip()
+                if tok:
+                    try:
+                        card_ids_list.append(int(tok))
+                    except ValueError:
+                        pass
+
+        display_name = build_display_name(
+            item_name=item_name,
+            refine=refine_val,
+            card_ids=card_ids_list,
+            extra_desc=extra_desc_val,
+            card_id_to_name=card_id_to_name,
+        )
+
+        existing_variations.append(
+            {
+                "variation_key": vk,
+                "refine": refine_val if refine_val is not None else 0,
+                "extra_desc": extra_desc_val or "",
+                "card_ids_list": card_ids_list,
+                "display_name": display_name,
+            }
+        )
+
+    return existing_variations
+
+
+def prefetch_page_data(item_id: int) -> None:
+    """
+    Dispara em paralelo as leituras independentes da página (variações,
+    histórico, resumo, top movers e tabela de mercado) e guarda os
+    resultados para esta execução completa: os blocos abaixo os pegam com
+    prefetched() em vez de esperar uma ida ao banco de cada vez.
+    """
+    ss = st.session_state
+
+    # Tabela de mercado: mesma página que o fragmento vai pedir
+    market_filters = {
+        "sort_by": "item",
+        "descending": False,
+        "status": None,
+        "name_query": None,
+        "has_cards": None,
+    }
+    page_size = 25
+    after = None
+    if ss.get("market_filters_sig"):
+        filters_items, page_size = ss["market_filters_sig"]
+        market_filters = dict(filters_items)
+        after = (ss.get("market_cursors") or [None])[-1]
+
+    calls = {
+        "variations": partial(get_item_variations, item_id),
+        "history": partial(get_price_history_df, item_id),
+        "summary": partial(
+            get_summary_row,
+            item_id,
+            ss.get("monitor_current_variation_key") or "base",
+        ),
+        "top_gain": partial(
+            get_market_page, sort_by="var_pct", descending=True, page_size=5
+        ),
+        "top_loss": partial(
+            get_market_page, sort_by="var_pct", descending=False, page_size=5
+        ),
+        "market_page": partial(
+            get_market_page, **market_filters, after=after, page_size=page_size
+        ),
+        "market_count": partial(
+            count_market_rows,
+            status=market_filters["status"],
+            name_query=market_filters["name_query"],
+            has_cards=market_filters["has_cards"],
+        ),
+    }
+    results = load_concurrently(calls)
+    ss["monitor_prefetch"] = {
+        name: (calls[name], value)
+        for name, value in results.items()
+        if not isinstance(value, Exception)
+    }
+
+
+def prefetched(fn, *args, **kwargs):
+    """
+    fn(*args, **kwargs), usando o resultado de prefetch_page_data quando a
+    mesma chamada já foi feita nesta execução (cada resultado é usado uma
+    vez). Em reruns de fragmento, com outros argumentos ou se a leitura
+    concorrente falhou, lê de novo.
+    """
+    prefetch = st.session_state.get("monitor_prefetch") or {}
+    for name, (call, value) in prefetch.items():
+        if call.func is fn and call.args == args and call.keywords == kwargs:
+            del prefetch[name]
+            return value
+    return fn(*args, **kwargs)
+
+
+# ============================================
+#  Fragmentos da página
+# ============================================
+# Cada bloco roda como st.fragment: interações dentro dele só re-executam
+# (e reenviam) aquele bloco. A página inteira só roda de novo quando muda o
+# item selecionado, a variação que a análise acompanha ou quando um preço
+# é gravado — casos em que os outros blocos dependem do que mudou.
 
-    # ======================================================
-    #  BLOCO DE EDIÇÃO / REGISTRO DE PREÇO
-    # ======================================================
-    current_variation_key: str | None = None
-    current_display_name = item_name
+
+def _is_fragment_rerun() -> bool:
+    """True quando só um fragmento está sendo re-executado (não a página toda)."""
+    return not st.session_state.get("monitor_full_run", False)
+
+
+@st.fragment
+@timed("busca / item")
+def render_item_selection(item_list: list[dict]):
+    """Busca / seleção do item; o resultado fica em session_state["monitor_item"]."""
+    ss = st.session_state
+
+    item_selected = select_item(item_list)
+
+    prev = ss.get("monitor_item")
+    ss["monitor_item"] = item_selected
+
+    prev_id = prev["id"] if prev else None
+    new_id = item_selected["id"] if item_selected else None
+    if _is_fragment_rerun() and new_id != prev_id:
+        # Outro item: formulário, análise etc. dependem dele
+        st.rerun()
+
+
+@st.fragment
+@timed("formulário")
+def render_price_form(
+    item_id: int,
+    item_name: str,
+    existing_variations: list[dict],
+    cards_list: list[dict],
+    card_id_to_name: dict[int, str],
+):
+    """
+    Configuração da variação (refino, cartas, encantos) + registro de preço
+    + confirmação de atualização. Slots, refino e erros de validação só
+    re-executam este fragmento.
+    """
+    ss = st.session_state
 
     action = ss.get("price_action")
 
@@ -821,15 +744,12 @@ def render():
                         f"[WARN] Falha ao logar ação de update em price_audit_log: {e}"
                     )
 
-                get_all_prices_cached.clear()
-                get_global_summary_cached.clear()
-                get_price_history_cached.clear()
-
                 ss["clear_price"] = True
                 ss["flash_message"] = "Preço atualizado com sucesso!"
                 ss["flash_type"] = "success"
                 ss["pending_update"] = None
                 ss["price_action"] = None
+                # Preço mudou: análise, ranking e tabela precisam reler
                 st.rerun()
             else:
                 try:
@@ -861,16 +781,15 @@ def render():
                         "Tente novamente mais tarde ou fale com um admin."
                     )
 
+                # Solicitação não altera preços: segue só neste fragmento
                 ss["pending_update"] = None
                 ss["price_action"] = None
-                st.rerun()
 
     elif action == "cancel_update":
         ss["pending_update"] = None
         ss["flash_message"] = "Atualização cancelada. Nenhuma alteração foi feita."
         ss["flash_type"] = "info"
         ss["price_action"] = None
-        st.rerun()
 
     # ------------------------------
     #  Bloco de variação do item
@@ -986,6 +905,18 @@ def render():
         card_id_to_name=card_id_to_name,
     )
 
+    # Análise acompanha a configuração escolhida: se ela passou a apontar
+    # para outra variação existente, a página toda precisa reagir
+    prev_variation_key = ss.get("monitor_current_variation_key")
+    ss["monitor_current_variation_key"] = current_variation_key
+    ss["monitor_current_display_name"] = current_display_name
+    if (
+        _is_fragment_rerun()
+        and current_variation_key != prev_variation_key
+        and any(v["variation_key"] == current_variation_key for v in existing_variations)
+    ):
+        st.rerun()
+
     st.markdown("---")
 
     # ------------------------------
@@ -1094,9 +1025,6 @@ def render():
                             variation_key=variation_key,
                         )
 
-                        get_all_prices_cached.clear()
-                        get_global_summary_cached.clear()
-                        get_price_history_cached.clear()
 
                         # Marca para resetar variação na próxima execução
                         ss["reset_variation_fields"] = True
@@ -1106,6 +1034,7 @@ def render():
                         ss["pending_update"] = None
                         ss["is_saving"] = False
 
+                        # Preço novo: análise, ranking e tabela precisam reler
                         st.rerun()
 
                     else:
@@ -1181,65 +1110,73 @@ def render():
             on_click=lambda: ss.update(price_action="cancel_update"),
         )
 
-    st.markdown("---")
-
-    # ======================================================
-    #  KPIs e escolha de variação para análise
-    # ======================================================
-    analysis_variation_key = current_variation_key
-    analysis_display_name = current_display_name
-
-    if existing_variations:
-        st.markdown("**Variação para análise**")
-        labels_analysis = [v["display_name"] for v in existing_variations]
-        label_to_var_analysis = {v["display_name"]: v for v in existing_variations}
-
-        # chave de estado do selectbox de análise (uma por item)
-        analysis_key = f"analysis_variation_select_{item_id}"
-
-        # 🔄 Sincroniza automaticamente a variação de análise
-        # com a variação escolhida em "Configuração base para registrar"
-        if current_variation_key:
-            matched_label = None
-            for v in existing_variations:
-                if v["variation_key"] == current_variation_key:
-                    matched_label = v["display_name"]
-                    break
 
-            if matched_label is not None:
-                if st.session_state.get(analysis_key) != matched_label:
-                    st.session_state[analysis_key] = matched_label
+@st.fragment
+@timed("análise")
+def render_analysis(item_id: int, item_name: str, existing_variations: list[dict]):
+    """
+    KPIs, painel de insights e histórico da variação em análise.
+    Trocar variação de análise ou período do gráfico só re-executa este fragmento.
+    """
+    ss = st.session_state
 
-        selected_label_analysis = st.selectbox(
-            "",
-            options=labels_analysis,
-            key=analysis_key,
-            label_visibility="collapsed",
-        )
+    with section("KPIs"):
+        # ======================================================
+        #  KPIs e escolha de variação para análise
+        # ======================================================
+        current_variation_key = ss.get("monitor_current_variation_key")
+        analysis_variation_key = current_variation_key
+        analysis_display_name = ss.get("monitor_current_display_name", item_name)
+
+        if existing_variations:
+            st.markdown("**Variação para análise**")
+            labels_analysis = [v["display_name"] for v in existing_variations]
+            label_to_var_analysis = {v["display_name"]: v for v in existing_variations}
+
+            # chave de estado do selectbox de análise (uma por item)
+            analysis_key = f"analysis_variation_select_{item_id}"
+
+            # 🔄 Sincroniza automaticamente a variação de análise
+            # com a variação escolhida em "Configuração base para registrar"
+            if current_variation_key:
+                matched_label = None
+                for v in existing_variations:
+                    if v["variation_key"] == current_variation_key:
+                        matched_label = v["display_name"]
+                        break
+
+                if matched_label is not None:
+                    if st.session_state.get(analysis_key) != matched_label:
+                        st.session_state[analysis_key] = matched_label
+
+            selected_label_analysis = st.selectbox(
+                "",
+                options=labels_analysis,
+                key=analysis_key,
+                label_visibility="collapsed",
+            )
 
-        rec_analysis = label_to_var_analysis[selected_label_analysis]
-        analysis_variation_key = rec_analysis["variation_key"]
-        analysis_display_name = rec_analysis["display_name"]
+            rec_analysis = label_to_var_analysis[selected_label_analysis]
+            analysis_variation_key = rec_analysis["variation_key"]
+            analysis_display_name = rec_analysis["display_name"]
 
-    # Histórico já filtrado pela variação em análise
-    hist_local_raw = get_price_history_cached(item_id, analysis_variation_key)
-    if not hist_local_raw.empty:
-        hist_local = hist_local_raw.copy()
-        hist_local["date"] = pd.to_datetime(hist_local["date"])
-        hist_local = hist_local.sort_values("date")
-    else:
-        hist_local = pd.DataFrame()
+        # Histórico já filtrado pela variação em análise
+        hist_local_raw = get_variation_history(item_id, analysis_variation_key)
+        if not hist_local_raw.empty:
+            hist_local = hist_local_raw
+            hist_local["date"] = pd.to_datetime(hist_local["date"])
+            hist_local = hist_local.sort_values("date")
+        else:
+            hist_local = pd.DataFrame()
 
-    df_sum_global = get_global_summary_cached()
-    kpi_cols = st.columns(4)
+        # Resumo só da variação em análise (últimos 5 registros dela)
+        row = prefetched(get_summary_row, item_id, analysis_variation_key)
+        kpi_cols = st.columns(4)
 
-    last_price = mean_5 = var_pct = None
-    status = "-"
+        last_price = mean_5 = var_pct = None
+        status = "-"
 
-    if not df_sum_global.empty:
-        item_summary = df_sum_global[df_sum_global["Item"] == analysis_display_name]
-        if not item_summary.empty:
-            row = item_summary.iloc[0]
+        if row is not None:
             try:
                 last_price = float(row["Último preço (zeny)"])
             except Exception:
@@ -1257,254 +1194,225 @@ def render():
 
             status = str(row.get("Status", "-"))
 
-    labels = [
-        "Último preço (zeny)",
-        "Média últimos 5 dias",
-        "Variação vs média 5",
-        "Status",
-    ]
-    values = [
-        fmt_zeny(last_price),
-        fmt_zeny(mean_5),
-        fmt_pct(var_pct) if var_pct is not None else "-",
-        status or "-",
-    ]
-
-    for col, label, value in zip(kpi_cols, labels, values):
-        with col:
-            st.markdown(
-                f"""
-                <div class="kpi-card">
-                    <div class="kpi-label">{label}</div>
-                    <div class="kpi-value">{value}</div>
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
-
-    st.markdown("<div style='margin-top: 0.75rem;'></div>", unsafe_allow_html=True)
-
-    # ======================================================
-    #  Painel de insights do item
-    # ======================================================
-    st.markdown(
-        """
-        <div class="section-title">
-          <span class="icon">🧠</span>
-          <span>Painel de insights do item</span>
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
-
-    if hist_local.empty:
-        st.info("Ainda não há dados suficientes para gerar insights para esta variação.")
-    else:
-        hist_last5 = hist_local.tail(5)
-        prices_5 = hist_last5["price_zeny"]
+        labels = [
+            "Último preço (zeny)",
+            "Média últimos 5 dias",
+            "Variação vs média 5",
+            "Status",
+        ]
+        values = [
+            fmt_zeny(last_price),
+            fmt_zeny(mean_5),
+            fmt_pct(var_pct) if var_pct is not None else "-",
+            status or "-",
+        ]
 
-        min_5 = float(prices_5.min())
-        max_5 = float(prices_5.max())
-        media_5 = float(prices_5.mean())
+        for col, label, value in zip(kpi_cols, labels, values):
+            with col:
+                st.markdown(
+                    f"""
+                    <div class="kpi-card">
+                        <div class="kpi-label">{label}</div>
+                        <div class="kpi-value">{value}</div>
+                    </div>
+                    """,
+                    unsafe_allow_html=True,
+                )
 
-        osc_pct = 0.0
-        if media_5 > 0:
-            osc_pct = (max_5 - min_5) / media_5 * 100
+        st.markdown("<div style='margin-top: 0.75rem;'></div>", unsafe_allow_html=True)
 
-        std_5 = float(prices_5.std())
-        preco_atual = float(prices_5.iloc[-1])
+    with section("insights"):
+        # ======================================================
+        #  Painel de insights do item
+        # ======================================================
+        st.markdown(
+            """
+            <div class="section-title">
+              <span class="icon">🧠</span>
+              <span>Painel de insights do item</span>
+            </div>
+            """,
+            unsafe_allow_html=True,
+        )
 
-        if media_5 > 0:
-            diff_media_pct = (preco_atual - media_5) / media_5 * 100
+        if hist_local.empty:
+            st.info("Ainda não há dados suficientes para gerar insights para esta variação.")
         else:
-            diff_media_pct = 0.0
+            hist_last5 = hist_local.tail(5)
+            prices_5 = hist_last5["price_zeny"]
 
-        if diff_media_pct > 3:
-            msg_text = (
-                "acima da média recente (tendência de alta / possível momento de venda)."
-            )
-        elif diff_media_pct < -3:
-            msg_text = (
-                "abaixo da média recente (tendência de baixa / possível oportunidade de compra)."
-            )
-        else:
-            msg_text = "próximo da média recente (região neutra)."
+            min_5 = float(prices_5.min())
+            max_5 = float(prices_5.max())
+            media_5 = float(prices_5.mean())
 
-        verdict_text = (
-            f"Preço atual está {diff_media_pct:+.1f}% em relação à média "
-            f"dos últimos 5 registros — {msg_text}"
-        )
+            osc_pct = 0.0
+            if media_5 > 0:
+                osc_pct = (max_5 - min_5) / media_5 * 100
 
-        col_left, col_right = st.columns([1.15, 1.1])
+            std_5 = float(prices_5.std())
+            preco_atual = float(prices_5.iloc[-1])
 
-        with col_left:
-            col_a, col_b = st.columns(2)
+            if media_5 > 0:
+                diff_media_pct = (preco_atual - media_5) / media_5 * 100
+            else:
+                diff_media_pct = 0.0
 
-            with col_a:
-                st.markdown(
-                    "<p style='margin-bottom:0.15rem'><strong>Mínimo (últimos 5)</strong></p>",
-                    unsafe_allow_html=True,
+            if diff_media_pct > 3:
+                msg_text = (
+                    "acima da média recente (tendência de alta / possível momento de venda)."
                 )
-                st.markdown(
-                    f"<h3 style='margin-top:0;margin-bottom:0.6rem'>{fmt_zeny(min_5)}</h3>",
-                    unsafe_allow_html=True,
+            elif diff_media_pct < -3:
+                msg_text = (
+                    "abaixo da média recente (tendência de baixa / possível oportunidade de compra)."
                 )
+            else:
+                msg_text = "próximo da média recente (região neutra)."
 
-                st.markdown(
-                    "<p style='margin-bottom:0.15rem'><strong>Máximo (últimos 5)</strong></p>",
-                    unsafe_allow_html=True,
-                )
-                st.markdown(
-                    f"<h3 style='margin-top:0'>{fmt_zeny(max_5)}</h3>",
-                    unsafe_allow_html=True,
-                )
+            verdict_text = (
+                f"Preço atual está {diff_media_pct:+.1f}% em relação à média "
+                f"dos últimos 5 registros — {msg_text}"
+            )
 
-            with col_b:
-                st.markdown(
-                    "<p style='margin-bottom:0.15rem'><strong>Oscilação (últimos 5)</strong></p>",
-                    unsafe_allow_html=True,
-                )
-                st.markdown(
-                    f"<h3 style='margin-top:0;margin-bottom:0.6rem'>{osc_pct:.1f}%</h3>",
-                    unsafe_allow_html=True,
-                )
+            col_left, col_right = st.columns([1.15, 1.1])
 
-                st.markdown(
-                    "<p style='margin-bottom:0.15rem'><strong>Desvio padrão (5)</strong></p>",
-                    unsafe_allow_html=True,
-                )
-                st.markdown(
-                    f"<h3 style='margin-top:0'>{fmt_zeny(std_5)}</h3>",
-                    unsafe_allow_html=True,
-                )
+            with col_left:
+                col_a, col_b = st.columns(2)
 
-        with col_right:
-            st.markdown("**Tendência (últimos 5 registros)**")
+                with col_a:
+                    st.markdown(
+                        "<p style='margin-bottom:0.15rem'><strong>Mínimo (últimos 5)</strong></p>",
+                        unsafe_allow_html=True,
+                    )
+                    st.markdown(
+                        f"<h3 style='margin-top:0;margin-bottom:0.6rem'>{fmt_zeny(min_5)}</h3>",
+                        unsafe_allow_html=True,
+                    )
 
-            y_min = float(min_5) * 0.98
-            y_max = float(max_5) * 1.02
+                    st.markdown(
+                        "<p style='margin-bottom:0.15rem'><strong>Máximo (últimos 5)</strong></p>",
+                        unsafe_allow_html=True,
+                    )
+                    st.markdown(
+                        f"<h3 style='margin-top:0'>{fmt_zeny(max_5)}</h3>",
+                        unsafe_allow_html=True,
+                    )
 
-            spark_data = hist_last5.copy()
-            spark_data["date_str"] = spark_data["date"].dt.strftime("%Y-%m-%d")
+                with col_b:
+                    st.markdown(
+                        "<p style='margin-bottom:0.15rem'><strong>Oscilação (últimos 5)</strong></p>",
+                        unsafe_allow_html=True,
+                    )
+                    st.markdown(
+                        f"<h3 style='margin-top:0;margin-bottom:0.6rem'>{osc_pct:.1f}%</h3>",
+                        unsafe_allow_html=True,
+                    )
 
-            spark = (
-                alt.Chart(spark_data)
-                .mark_line(point=True)
-                .encode(
-                    x=alt.X(
-                        "date_str:O",
-                        axis=alt.Axis(title="", labels=False, ticks=False),
-                    ),
-                    y=alt.Y(
-                        "price_zeny:Q",
-                        axis=alt.Axis(title="", labels=False, ticks=False),
-                        scale=alt.Scale(domain=[y_min, y_max]),
-                    ),
-                    tooltip=[
-                        alt.Tooltip("date_str:O", title="Data"),
-                        alt.Tooltip("price_zeny:Q", title="Preço (zeny)"),
-                    ],
-                )
-                .properties(height=70)
-            )
+                    st.markdown(
+                        "<p style='margin-bottom:0.15rem'><strong>Desvio padrão (5)</strong></p>",
+                        unsafe_allow_html=True,
+                    )
+                    st.markdown(
+                        f"<h3 style='margin-top:0'>{fmt_zeny(std_5)}</h3>",
+                        unsafe_allow_html=True,
+                    )
 
-            st.altair_chart(spark, use_container_width=True)
+            with col_right:
+                st.markdown("**Tendência (últimos 5 registros)**")
 
-        st.markdown(
-            f"""
-            <div style="
-                margin-top:0.9rem;
-                padding:0.75rem 1rem;
-                border-radius:0.8rem;
-                background:linear-gradient(90deg, #020617, #020617);
-                border:1px solid rgba(59,130,246,0.6);
-                font-size:0.95rem;">
-              <span style="margin-right:0.5rem;">✨</span>
-              <strong>Veredito do dia:</strong> {verdict_text}
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
+                st.vega_lite_chart(
+                    spec=sparkline_spec(item_id, analysis_variation_key, hist_last5),
+                    use_container_width=True,
+                )
 
-    st.markdown("---")
+            st.markdown(
+                f"""
+                <div style="
+                    margin-top:0.9rem;
+                    padding:0.75rem 1rem;
+                    border-radius:0.8rem;
+                    background:linear-gradient(90deg, #020617, #020617);
+                    border:1px solid rgba(59,130,246,0.6);
+                    font-size:0.95rem;">
+                  <span style="margin-right:0.5rem;">✨</span>
+                  <strong>Veredito do dia:</strong> {verdict_text}
+                </div>
+                """,
+                unsafe_allow_html=True,
+            )
 
-    # ======================================================
-    #  Histórico de preços (por variação)
-    # ======================================================
-    st.subheader(f"📈 Histórico de preços – {analysis_display_name}")
+        st.markdown("---")
 
-    if hist_local.empty:
-        st.info("Ainda não há histórico para esta variação.")
-    else:
-        st.caption("Período do gráfico (últimos registros)")
-        periodo = st.radio(
-            "",
-            options=["7 dias", "30 dias", "Tudo"],
-            horizontal=True,
-            label_visibility="collapsed",
-        )
+    with section("histórico / gráfico"):
+        # ======================================================
+        #  Histórico de preços (por variação)
+        # ======================================================
+        st.subheader(f"📈 Histórico de preços – {analysis_display_name}")
 
-        if periodo == "7 dias":
-            # últimos 7 registros (ou menos, se não tiver tudo isso)
-            hist_plot = hist_local.tail(7)
-        elif periodo == "30 dias":
-            # últimos 30 registros (ou menos)
-            hist_plot = hist_local.tail(30)
+        if hist_local.empty:
+            st.info("Ainda não há histórico para esta variação.")
         else:
-            # todos os registros
-            hist_plot = hist_local
-
-
-        hist_plot = hist_plot.copy()
-        hist_plot["date_str"] = hist_plot["date"].dt.date.astype(str)
-
-        area = (
-            alt.Chart(hist_plot)
-            .mark_area(opacity=0.3)
-            .encode(
-                x=alt.X("date_str:O", title="Data", axis=alt.Axis(labelAngle=0)),
-                y=alt.Y("price_zeny:Q", title="Preço (zeny)"),
+            st.caption("Período do gráfico (últimos registros)")
+            periodo = st.radio(
+                "",
+                options=["7 dias", "30 dias", "Tudo"],
+                horizontal=True,
+                label_visibility="collapsed",
             )
-            .properties(height=340)
-        )
 
-        line = (
-            alt.Chart(hist_plot)
-            .mark_line(point=True)
-            .encode(
-                x=alt.X("date_str:O", axis=alt.Axis(labelAngle=0)),
-                y="price_zeny:Q",
-                tooltip=[
-                    alt.Tooltip("date_str:O", title="Data"),
-                    alt.Tooltip("price_zeny:Q", title="Preço (zeny)"),
-                ],
+            if periodo == "7 dias":
+                # últimos 7 registros (ou menos, se não tiver tudo isso)
+                hist_plot = hist_local.tail(7)
+            elif periodo == "30 dias":
+                # últimos 30 registros (ou menos)
+                hist_plot = hist_local.tail(30)
+            else:
+                # todos os registros
+                hist_plot = hist_local
+
+
+            # Spec cacheada por (item, variação, versão dos dados, período);
+            # séries longas passam por LTTB (no máximo CHART_MAX_POINTS pontos)
+            spec = history_spec(
+                item_id,
+                analysis_variation_key,
+                hist_plot,
+                period=periodo,
+                max_points=CHART_MAX_POINTS,
             )
-        )
+            usermeta = spec.get("usermeta", {})
+            if usermeta.get("n_points", 0) < usermeta.get("n_records", 0):
+                st.caption(
+                    f"Exibindo {usermeta['n_points']} de {usermeta['n_records']} registros "
+                    "(amostragem que preserva picos e vales)."
+                )
 
-        chart_key = (
-            f"hist_chart_{item_id}_{analysis_variation_key}_{periodo}_{len(hist_plot)}"
-        )
-        st.altair_chart(area + line, use_container_width=True, key=chart_key)
+            chart_key = (
+                f"hist_chart_{item_id}_{analysis_variation_key}_{periodo}_{len(hist_plot)}"
+            )
+            st.vega_lite_chart(spec=spec, use_container_width=True, key=chart_key)
 
-        with st.expander("📜 Ver tabela completa de histórico desta variação"):
-            hist_display = hist_local.copy()
-            hist_display["Data"] = hist_display["date"].dt.date.astype(str)
-            hist_display["Preço (zeny)"] = hist_display["price_zeny"].apply(fmt_zeny)
-            hist_display["Criado em"] = hist_display["created_at"]
+            with st.expander("📜 Ver tabela completa de histórico desta variação"):
+                hist_display = hist_local.copy()
+                hist_display["Data"] = hist_display["date"].dt.date.astype(str)
+                hist_display["Preço (zeny)"] = hist_display["price_zeny"].apply(fmt_zeny)
+                hist_display["Criado em"] = hist_display["created_at"]
 
-            hist_display = hist_display[["Data", "Preço (zeny)", "Criado em"]]
+                hist_display = hist_display[["Data", "Preço (zeny)", "Criado em"]]
 
-            st.dataframe(
-                hist_display.sort_values("Data", ascending=False).reset_index(
-                    drop=True
-                ),
-                use_container_width=True,
-                hide_index=True,
-                height=400,
-            )
+                st.dataframe(
+                    hist_display.sort_values("Data", ascending=False).reset_index(
+                        drop=True
+                    ),
+                    use_container_width=True,
+                    hide_index=True,
+                    height=400,
+                )
 
-    st.markdown("---")
 
+@st.fragment
+@timed("top movers")
+def render_top_movers(card_id_to_name: dict[int, str]):
+    """Top 5 maiores altas / quedas (lidas direto da tabela de mercado)."""
     # ======================================================
     #  Top 5 maiores altas / quedas
     # ======================================================
@@ -1518,51 +1426,30 @@ def render():
         unsafe_allow_html=True,
     )
 
-    df_sum_all = get_global_summary_cached()
-    if df_sum_all.empty:
+    # Ranking direto do banco: só as 5 primeiras linhas de cada ordenação
+    df_top_gain, _ = prefetched(
+        get_market_page, sort_by="var_pct", descending=True, page_size=5
+    )
+    if df_top_gain.empty:
         st.info("Ainda não há dados suficientes para montar o ranking.")
     else:
-        top_gain = (
-            df_sum_all.sort_values("Variação % vs média 5", ascending=False)
-            .head(5)
-            .copy()
-        )
-        top_loss = (
-            df_sum_all.sort_values("Variação % vs média 5", ascending=True)
-            .head(5)
-            .copy()
+        df_top_loss, _ = prefetched(
+            get_market_page, sort_by="var_pct", descending=False, page_size=5
         )
 
-        def prepare_top(df_top: pd.DataFrame) -> pd.DataFrame:
-            df = df_top.copy()
-            df["Último preço (zeny)"] = df["Último preço (zeny)"].apply(fmt_zeny)
-            df["Média últimos 5"] = df["Média últimos 5"].apply(fmt_zeny)
-            df["Variação % vs média 5"] = df["Variação % vs média 5"].apply(
-                lambda x: fmt_pct(x * 100.0 if abs(x) < 1.0 else x)
-            )
-            df = df.rename(
-                columns={
-                    "Último preço (zeny)": "Últ. preço",
-                    "Média últimos 5": "Média 5d",
-                    "Variação % vs média 5": "Var % vs 5d",
-                }
-            )
-
-            return df[
-                [
-                    "Item",
-                    "Última data",
-                    "Últ. preço",
-                    "Média 5d",
-                    "Var % vs 5d",
-                    "Status",
-                ]
-            ]
+        top_columns = [
+            "Item",
+            "Última data",
+            "Últ. preço",
+            "Média 5d",
+            "Var % vs 5d",
+            "Status",
+        ]
 
         tab_up, tab_down = st.tabs(["📈 Maiores altas", "📉 Maiores quedas"])
 
         with tab_up:
-            df_up = prepare_top(top_gain)
+            df_up = market_page_display(df_top_gain, card_id_to_name)[top_columns]
             st.dataframe(
                 style_market_table(df_up),
                 use_container_width=True,
@@ -1571,7 +1458,7 @@ def render():
             )
 
         with tab_down:
-            df_down = prepare_top(top_loss)
+            df_down = market_page_display(df_top_loss, card_id_to_name)[top_columns]
             st.dataframe(
                 style_market_table(df_down),
                 use_container_width=True,
@@ -1579,56 +1466,116 @@ def render():
                 height=230,
             )
 
-    st.markdown("---")
+
+@st.fragment
+@timed("tabela de mercado")
+def render_market_table(card_id_to_name: dict[int, str]):
+    """
+    Resumo geral do mercado, paginado no servidor.
+    Filtros, ordenação e paginação só re-executam este fragmento.
+    """
+    ss = st.session_state
 
     # ======================================================
-    #  Resumo geral do mercado
+    #  Resumo geral do mercado (paginado no servidor)
     # ======================================================
     st.subheader("🌐 Resumo geral do mercado")
 
-    df_sum = get_global_summary_cached()
-    if df_sum.empty:
-        st.info("Ainda não há dados suficientes para montar o resumo.")
-        return
+    sort_labels = {
+        "Item": "item",
+        "Última data": "last_date",
+        "Último preço": "last_price",
+        "Média 5d": "mean_5",
+        "Variação % vs 5d": "var_pct",
+        "Status": "status",
+    }
+    cards_filter_options = {"Todos": None, "Com cartas": True, "Sem cartas": False}
+
+    col_name, col_status, col_cards = st.columns([2, 2, 1])
+    with col_name:
+        market_name_query = st.text_input(
+            "Filtrar por nome",
+            key="market_name_query",
+            placeholder="Ex: pocao, carta...",
+        )
+    with col_status:
+        market_status = st.multiselect(
+            "Status",
+            options=["Comprar", "Neutro", "Vender"],
+            key="market_status",
+        )
+    with col_cards:
+        market_cards_label = st.selectbox(
+            "Cartas",
+            options=list(cards_filter_options),
+            key="market_has_cards",
+        )
 
-    df_display = df_sum.copy()
-    df_display["Último preço (zeny)"] = df_display["Último preço (zeny)"].apply(
-        fmt_zeny
-    )
-    df_display["Média últimos 5"] = df_display["Média últimos 5"].apply(fmt_zeny)
-    df_display["Variação % vs média 5"] = df_display["Variação % vs média 5"].apply(
-        lambda x: fmt_pct(x * 100.0 if abs(x) < 1.0 else x)
-    )
+    col_sort, col_dir, col_size = st.columns([2, 2, 1])
+    with col_sort:
+        market_sort_label = st.selectbox(
+            "Ordenar por",
+            options=list(sort_labels),
+            key="market_sort_by",
+        )
+    with col_dir:
+        market_desc = (
+            st.radio(
+                "Ordem",
+                options=["Crescente", "Decrescente"],
+                horizontal=True,
+                key="market_sort_dir",
+            )
+            == "Decrescente"
+        )
+    with col_size:
+        market_page_size = st.selectbox(
+            "Por página",
+            options=[25, 50, 100],
+            key="market_page_size",
+        )
 
-    df_display = df_display.rename(
-        columns={
-            "Último preço (zeny)": "Últ. preço",
-            "Média últimos 5": "Média 5d",
-            "Variação % vs média 5": "Var % vs 5d",
-        }
+    market_filters = {
+        "sort_by": sort_labels[market_sort_label],
+        "descending": market_desc,
+        "status": tuple(market_status) or None,
+        "name_query": (market_name_query or "").strip() or None,
+        "has_cards": cards_filter_options[market_cards_label],
+    }
+
+    # Pilha de cursores (keyset): volta para a 1ª página quando os filtros mudam
+    filters_sig = (tuple(market_filters.items()), market_page_size)
+    if ss.get("market_filters_sig") != filters_sig:
+        ss["market_filters_sig"] = filters_sig
+        ss["market_cursors"] = [None]
+
+    cursors: list = ss["market_cursors"]
+    df_page, next_cursor = prefetched(
+        get_market_page,
+        **market_filters,
+        after=cursors[-1],
+        page_size=market_page_size,
     )
 
-    # Garantir coluna Cartas preenchida
-    if "Cartas" not in df_display.columns:
-        df_display["Cartas"] = "-"
+    if df_page.empty:
+        st.info("Ainda não há dados suficientes para montar o resumo.")
+        return
 
-    df_display = df_display[
-        [
-            "Item",
-            "Cartas",
-            "Última data",
-            "Últ. preço",
-            "Média 5d",
-            "Var % vs 5d",
-            "Status",
-        ]
-    ]
+    total_rows = prefetched(
+        count_market_rows,
+        status=market_filters["status"],
+        name_query=market_filters["name_query"],
+        has_cards=market_filters["has_cards"],
+    )
+    n_pages = max(1, -(-total_rows // market_page_size))
+
+    df_display = market_page_display(df_page, card_id_to_name)
 
     st.dataframe(
         style_market_table(df_display),
         use_container_width=True,
         hide_index=True,
-        height=450,
+        height=min(450, 38 + 35 * len(df_display)),
         column_config={
             "Item": st.column_config.TextColumn(
                 "Item",
@@ -1661,5 +1608,170 @@ def render():
         },
     )
 
+    # Navegação via callbacks: o clique re-executa só este fragmento
+    col_prev, col_info, col_next = st.columns([1, 3, 1])
+    with col_prev:
+        st.button(
+            "◀ Anterior",
+            key="market_prev",
+            use_container_width=True,
+            disabled=len(cursors) <= 1,
+            on_click=cursors.pop,
+        )
+    with col_info:
+        st.caption(
+            f"Página {len(cursors)} de {n_pages} · {total_rows} variação(ões)"
+        )
+    with col_next:
+        st.button(
+            "Próxima ▶",
+            key="market_next",
+            use_container_width=True,
+            disabled=next_cursor is None,
+            on_click=cursors.append,
+            args=(next_cursor,),
+        )
+
+
+# ============================================
+#  Página principal
+# ============================================
+@timed("página")
+def render():
+    ss = st.session_state
+
+    # -------------------------------------------------
+    # RESET DE CAMPOS DE VARIAÇÃO (rodado ANTES DOS WIDGETS)
+    # -------------------------------------------------
+    if ss.get("reset_variation_fields", False):
+        ss["var_refine"] = 0
+        ss["var_extra_desc"] = ""
+        ss["var_card_slot_1"] = "(vazio)"
+        ss["var_card_slot_2"] = "(vazio)"
+        ss["var_card_slot_3"] = "(vazio)"
+        ss["var_card_slot_4"] = "(vazio)"
+        ss["reset_variation_fields"] = False
+
+    st.title("📈 Monitor de Mercado – Ragnarok LATAM")
+
+    if "is_saving" not in ss:
+        ss["is_saving"] = False
+
+    # Overlay global enquanto está salvando
+    if ss.get("is_saving", False):
+        st.markdown(
+            """
+            <style>
+            .loading-overlay {
+                position: fixed;
+                top: 0;
+                left: 0;
+                width: 100vw;
+                height: 100vh;
+                background: rgba(0, 0, 0, 0.65);
+                z-index: 9999;
+                display: flex;
+                align-items: center;
+                justify-content: center;
+            }
+            .loading-overlay-content {
+                background: rgba(15,23,42,0.95);
+                padding: 1.5rem 2rem;
+                border-radius: 0.75rem;
+                border: 1px solid rgba(59,130,246,0.7);
+                font-size: 0.95rem;
+            }
+            </style>
+            <div class="loading-overlay">
+              <div class="loading-overlay-content">
+                ⏳ Processando sua ação...<br/>
+                <small>Por favor, aguarde alguns segundos.</small>
+              </div>
+            </div>
+            """,
+            unsafe_allow_html=True,
+        )
+
+    # ------------------------------
+    #  Estado global simples
+    # ------------------------------
+    if "price_value" not in ss:
+        ss["price_value"] = ""
+    if "last_item_id" not in ss:
+        ss["last_item_id"] = None
+    if "clear_price" not in ss:
+        ss["clear_price"] = False
+    if "flash_message" not in ss:
+        ss["flash_message"] = ""
+    if "flash_type" not in ss:
+        ss["flash_type"] = "success"
+    if "pending_update" not in ss:
+        ss["pending_update"] = None
+    if "price_action" not in ss:
+        ss["price_action"] = None
+    if "var_refine" not in ss:
+        ss["var_refine"] = 0
+    if "var_extra_desc" not in ss:
+        ss["var_extra_desc"] = ""
+    for i in range(1, 5):
+        key = f"var_card_slot_{i}"
+        if key not in ss:
+            ss[key] = "(vazio)"
+
+    # ------------------------------
+    #  Carrega itens e preços
+    # ------------------------------
+    # Catálogo compartilhado pelo processo (carregado uma vez, só leitura)
+    with section("catálogo"):
+        catalog = get_catalog()
+    if not len(catalog):
+        st.warning("Nenhum item encontrado. Verifique o arquivo items.json.")
+        return
+
+    item_list = catalog.item_list
+    cards_list = catalog.cards_list
+    card_id_to_name = catalog.card_id_to_name
+
+    # ======================================================
+    #  Blocos (fragmentos) da página
+    # ======================================================
+    ss["monitor_full_run"] = True
+    try:
+        render_item_selection(item_list)
+
+        item_selected = ss.get("monitor_item")
+        if item_selected is None:
+            st.info("Escolha um item para começar.")
+            return
+
+        item_id = item_selected["id"]
+        item_name = item_selected["name"]
+
+        with section("prefetch"):
+            prefetch_page_data(item_id)
+
+        with section("variações"):
+            existing_variations = load_existing_variations(
+                item_id, item_name, card_id_to_name
+            )
+
+        render_price_form(
+            item_id, item_name, existing_variations, cards_list, card_id_to_name
+        )
+        st.markdown("---")
+
+        render_analysis(item_id, item_name, existing_variations)
+        st.markdown("---")
+
+        render_top_movers(card_id_to_name)
+        st.markdown("---")
+
+        render_market_table(card_id_to_name)
+    finally:
+        ss["monitor_full_run"] = False
+        # Resultados do prefetch valem só para esta execução
+        ss.pop("monitor_prefetch", None)
+
 
 render()
+render_overlay()
@@ -1,11 +1,15 @@
 # pages/02_🛠️_Admin_Solicitações.py
+import pandas as pd
 import streamlit as st
 
 from ui.theme import apply_theme
 from db.database import (
-    get_pending_requests,
+    count_pending_requests,
+    get_pending_requests_page,
     approve_price_request,
+    approve_price_requests,
     reject_price_request,
+    reject_price_requests,
 )
 
 # ---------------------------------------
@@ -21,6 +25,42 @@ def is_admin() -> bool:
 
 apply_theme("Admin – Solicitações de Preço", page_icon="🛠️")
 
+PAGE_SIZES = [10, 25, 50, 100]
+
+
+def fmt_zeny(v) -> str:
+    if v is None or pd.isna(v):
+        return "N/A"
+    return f"{int(v):,}".replace(",", ".")
+
+
+def _select_all(ids: list[int]):
+    st.session_state["bulk_ids"] = ids
+
+
+def _review_bulk(action: str, reviewer_email: str):
+    """Aprova/rejeita as selecionadas numa transação só (callback dos botões)."""
+    ss = st.session_state
+    ids = list(ss.get("bulk_ids") or [])
+    try:
+        if action == "approve":
+            done = approve_price_requests(ids, reviewer_email)
+            verb = "aprovada(s)"
+        else:
+            done = reject_price_requests(ids, reviewer_email, ss.get("bulk_comment") or None)
+            verb = "rejeitada(s)"
+    except Exception as e:
+        ss["requests_flash"] = ("error", f"Erro na revisão em lote: {e}")
+        return
+
+    skipped = len(ids) - len(done)
+    msg = f"{len(done)} solicitação(ões) {verb}."
+    if skipped:
+        msg += f" {skipped} já tinha(m) sido revisada(s) por outro admin."
+    ss["requests_flash"] = ("success", msg)
+    ss["bulk_ids"] = []
+    ss["bulk_comment"] = ""
+
 
 def render():
     st.title("🛠️ Painel de Admin – Solicitações de preço")
@@ -58,47 +98,142 @@ def render():
         unsafe_allow_html=True,
     )
 
-    # Carrega solicitações pendentes
-    df_req = get_pending_requests()
+    flash = ss.pop("requests_flash", None)
+    if flash:
+        getattr(st, flash[0])(flash[1])
+
+    # Badge com a contagem (cacheada) em vez de carregar a fila inteira
+    total = count_pending_requests()
+    if total == 0:
+        st.success("Nenhuma solicitação pendente no momento. 🎉")
+        return
+
+    col_title, col_size = st.columns([3, 1])
+    with col_title:
+        st.subheader(f"Solicitações pendentes :orange-badge[{total}]")
+    with col_size:
+        page_size = st.selectbox("Por página", PAGE_SIZES, index=1, key="req_page_size")
+
+    # Pilha de cursores (keyset, mais antigas primeiro); reinicia ao mudar o tamanho
+    if ss.get("req_page_size_sig") != page_size:
+        ss["req_page_size_sig"] = page_size
+        ss["req_cursors"] = [None]
+    cursors: list = ss["req_cursors"]
+
+    df_req, next_cursor = get_pending_requests_page(cursors[-1], int(page_size))
+    # Página esvaziada por revisões: volta até achar linhas
+    while df_req.empty and len(cursors) > 1:
+        cursors.pop()
+        df_req, next_cursor = get_pending_requests_page(cursors[-1], int(page_size))
 
     if df_req.empty:
         st.success("Nenhuma solicitação pendente no momento. 🎉")
         return
 
-    st.subheader("Solicitações pendentes")
-
-    # Ordena por data de criação (só por garantia)
-    df_req = df_req.sort_values("created_at", ascending=True)
-
-    # Visão geral (tabela compacta)
-    with st.expander("📋 Ver tabela geral", expanded=False):
-        df_display = df_req.copy()
-        df_display["Data"] = df_display["date"].astype(str)
-        df_display["Preço antigo"] = df_display["old_price"]
-        df_display["Preço novo"] = df_display["new_price"]
-        df_display["Criado em"] = df_display["created_at"].astype(str)
-        df_display["Criado por"] = df_display["created_by"]
-
-        st.dataframe(
-            df_display[
-                [
-                    "id",
-                    "item_name",
-                    "Data",
-                    "Preço antigo",
-                    "Preço novo",
-                    "Criado por",
-                    "Criado em",
-                ]
-            ].reset_index(drop=True),
+    # Visão geral da página (tabela compacta)
+    df_display = pd.DataFrame(
+        {
+            "ID": df_req["id"].astype(int),
+            "Item": df_req["item_name"],
+            "Data": df_req["date"].astype(str),
+            "Preço antigo": df_req["old_price"].map(fmt_zeny),
+            "Preço novo": df_req["new_price"].map(fmt_zeny),
+            "Criado por": df_req["created_by"],
+            "Criado em": df_req["created_at"].astype(str).str.slice(0, 19),
+        }
+    )
+    st.dataframe(
+        df_display,
+        use_container_width=True,
+        hide_index=True,
+        height=min(600, 38 + 35 * len(df_display)),
+    )
+
+    first = (len(cursors) - 1) * int(page_size) + 1
+    col_prev, col_info, col_next = st.columns([1, 3, 1])
+    with col_prev:
+        st.button(
+            "◀ Anterior",
+            key="req_prev",
+            use_container_width=True,
+            disabled=len(cursors) <= 1,
+            on_click=cursors.pop,
+        )
+    with col_info:
+        st.caption(
+            f"Página {len(cursors)} · solicitações {first}–{first + len(df_req) - 1} "
+            f"de {total}"
+        )
+    with col_next:
+        st.button(
+            "Próxima ▶",
+            key="req_next",
+            use_container_width=True,
+            disabled=next_cursor is None,
+            on_click=cursors.append,
+            args=(next_cursor,),
+        )
+
+    st.markdown("---")
+    st.markdown("### Revisar em lote (página atual)")
+
+    pending_ids = [int(i) for i in df_req["id"]]
+    labels = {
+        int(r["id"]): f"#{int(r['id'])} – {r['item_name']} ({r['date']})"
+        for _, r in df_req.iterrows()
+    }
+    # Remove da seleção o que já saiu da fila (revisado em outra sessão)
+    ss["bulk_ids"] = [i for i in ss.get("bulk_ids", []) if i in labels]
+
+    col_sel, col_all = st.columns([4, 1])
+    with col_sel:
+        st.multiselect(
+            "Solicitações selecionadas",
+            options=pending_ids,
+            format_func=lambda i: labels.get(i, f"#{i}"),
+            key="bulk_ids",
+            placeholder="Escolha as solicitações...",
+        )
+    with col_all:
+        st.button(
+            "Selecionar página",
+            key="bulk_select_all",
+            use_container_width=True,
+            on_click=_select_all,
+            args=(pending_ids,),
+        )
+
+    st.text_input(
+        "Comentário da rejeição em lote (opcional)",
+        key="bulk_comment",
+        placeholder="Vale para todas as rejeitadas...",
+    )
+
+    n_selected = len(ss["bulk_ids"])
+    col_bulk_approve, col_bulk_reject = st.columns([1, 1])
+    with col_bulk_approve:
+        st.button(
+            f"✅ Aprovar selecionadas ({n_selected})",
+            key="bulk_approve",
             use_container_width=True,
-            hide_index=True,
+            disabled=n_selected == 0,
+            on_click=_review_bulk,
+            args=("approve", user_display),
+        )
+    with col_bulk_reject:
+        st.button(
+            f"❌ Rejeitar selecionadas ({n_selected})",
+            key="bulk_reject",
+            use_container_width=True,
+            disabled=n_selected == 0,
+            on_click=_review_bulk,
+            args=("reject", user_display),
         )
 
     st.markdown("---")
     st.markdown("### Analisar uma por uma")
 
-    # Loop em cada solicitação com blocos individuais
+    # Cards só da página atual
     for _, row in df_req.iterrows():
         req_id = int(row["id"])
         item_name = row["item_name"]
@@ -116,16 +251,9 @@ def render():
             )
 
             # Resumo dos preços
-            if old_price is None:
-                old_txt = "N/A"
-            else:
-                old_txt = f"{int(old_price):,}".replace(",", ".")
-
-            new_txt = f"{int(new_price):,}".replace(",", ".")
-
             st.markdown(
-                f"- Preço atual registrado: **{old_txt} zeny**  \n"
-                f"- Preço solicitado: **{new_txt} zeny**"
+                f"- Preço atual registrado: **{fmt_zeny(old_price)} zeny**  \n"
+                f"- Preço solicitado: **{fmt_zeny(new_price)} zeny**"
             )
 
             # Campo de comentário ocupa a largura inteira
@@ -157,9 +285,8 @@ def render():
             if approve_clicked:
                 try:
                     reviewer_email = user_display
+                    # o repository limpa os caches (fila, página, contagem)
                     approve_price_request(req_id, reviewer_email)
-                    # limpa cache para recarregar lista sem essa solicitação
-                    get_pending_requests.clear()
                     st.success(f"Solicitação #{req_id} aprovada com sucesso.")
                     st.rerun()
                 except Exception as e:
@@ -170,7 +297,6 @@ def render():
                 try:
                     reviewer_email = user_display
                     reject_price_request(req_id, reviewer_email, comment or None)
-                    get_pending_requests.clear()
                     st.info(f"Solicitação #{req_id} rejeitada.")
                     st.rerun()
                 except Exception as e:
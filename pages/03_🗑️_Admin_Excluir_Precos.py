@@ -5,10 +5,10 @@ import pandas as pd
 import streamlit as st
 import unicodedata
 
+from core.catalog import get_catalog
+from core.snapshot import get_snapshot
 from ui.theme import apply_theme
 from db.database import (
-    get_items_df,
-    get_all_prices_df,
     get_price_history_df,
     delete_price,
     log_price_action,
@@ -106,14 +106,15 @@ def render():
     # -------------------------------------------------
     # Carrega itens e preços
     # -------------------------------------------------
-    items_df = get_items_df()
-    df_prices_all = get_all_prices_df()
+    items_df = get_catalog().to_df()
+    # Snapshot Arrow compartilhado pelos processos do host (memory-map)
+    snapshot = get_snapshot()
 
-    if df_prices_all.empty:
+    if snapshot.n_prices == 0:
         st.info("Ainda não há registros de preço cadastrados para excluir.")
         return
 
-    item_ids_with_prices = sorted(df_prices_all["item_id"].unique())
+    item_ids_with_prices = snapshot.item_ids_with_prices()
     items_df = items_df[items_df["id"].isin(item_ids_with_prices)]
 
     if items_df.empty:
@@ -153,7 +154,7 @@ def render():
     item_id = int(item_selected["id"])
     item_name = item_selected["name"]
 
-    df_item = df_prices_all[df_prices_all["item_id"] == item_id].copy()
+    df_item = snapshot.prices_df(item_id)
     if df_item.empty:
         st.info("Este item não possui registros.")
         st.stop()
@@ -0,0 +1,178 @@
+# pages/04_📊_Admin_Performance.py
+import json
+
+import pandas as pd
+import streamlit as st
+
+import db.database  # noqa: F401  (liga a config do core ao st.secrets)
+from core import audit, metrics, notify
+from core.cache import cache_stats
+from core.connection import replica_status
+from ui.theme import apply_theme
+
+
+# ---------------------------------------
+# Mesmo helper de admin usado no Monitor
+# ---------------------------------------
+def is_admin() -> bool:
+    """Retorna True se o e-mail logado estiver na lista de admins."""
+    email = (st.session_state.get("user_email") or "").lower()
+    admins = [e.lower() for e in st.secrets["roles"]["admins"]]
+    return email in admins
+
+
+apply_theme("Admin – Performance", page_icon="📊")
+
+
+def fmt_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024:
+            return f"{n:,.0f} {unit}".replace(",", ".")
+        n /= 1024
+    return f"{n:,.1f} TB".replace(",", ".")
+
+
+def render():
+    st.title("📊 Performance – consultas ao banco")
+
+    ss = st.session_state
+
+    if not ss.get("auth_ok", False):
+        st.error("Você não está autenticado. Faça login para continuar.")
+        st.stop()
+
+    if not is_admin():
+        st.error("Você não tem permissão para acessar esta página.")
+        st.stop()
+
+    snap = metrics.snapshot()
+    df = pd.DataFrame(snap["queries"])
+
+    st.caption(
+        "Métricas deste processo do servidor (zeram ao reiniciar). "
+        "Latências em ms; percentis estimados por histograma."
+    )
+
+    col_a, col_b, col_c, col_d = st.columns(4)
+    if df.empty:
+        col_a.metric("Consultas distintas", 0)
+        col_b.metric("Execuções", 0)
+        col_c.metric("Erros", 0)
+        col_d.metric("Tempo total no banco", "0.0 s")
+    else:
+        col_a.metric("Consultas distintas", len(df))
+        col_b.metric("Execuções", f"{int(df['calls'].sum()):,}".replace(",", "."))
+        col_c.metric("Erros", int(df["errors"].sum()))
+        col_d.metric("Tempo total no banco", f"{df['total_s'].sum():.1f} s")
+
+    # Ações
+    col_dl, col_export, col_reset = st.columns([1, 1, 1])
+    with col_dl:
+        st.download_button(
+            "⬇️ Baixar JSON",
+            data=json.dumps(snap, indent=2, default=str),
+            file_name="metrics.json",
+            mime="application/json",
+            use_container_width=True,
+        )
+    with col_export:
+        if st.button("💾 Gravar arquivo", use_container_width=True):
+            try:
+                path = metrics.export_json()
+                st.success(f"Métricas gravadas em {path}")
+            except OSError as e:
+                st.error(f"Erro ao gravar métricas: {e}")
+    with col_reset:
+        if st.button("🧹 Zerar métricas", use_container_width=True):
+            metrics.reset()
+            st.rerun()
+
+    st.markdown("### Consultas")
+
+    if df.empty:
+        st.info("Nenhuma consulta registrada ainda neste processo.")
+    else:
+        kinds = sorted(df["kind"].unique())
+        chosen = st.multiselect("Tipo", kinds, default=kinds)
+        search = st.text_input("Filtrar SQL", placeholder="ex.: FROM prices")
+
+        view = df[df["kind"].isin(chosen)]
+        if search:
+            view = view[view["sql"].str.contains(search, case=False, regex=False)]
+
+        view = view.assign(
+            mb=view["bytes"] / (1024 * 1024),
+            sql=view["sql"].str.slice(0, 160),
+        )
+        st.dataframe(
+            view[
+                [
+                    "kind",
+                    "calls",
+                    "errors",
+                    "p50_ms",
+                    "p95_ms",
+                    "p99_ms",
+                    "max_ms",
+                    "mean_ms",
+                    "total_s",
+                    "wait_p95_ms",
+                    "rows",
+                    "mb",
+                    "replica_calls",
+                    "sql",
+                    "fingerprint",
+                ]
+            ].reset_index(drop=True),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "kind": "Tipo",
+                "calls": "Execuções",
+                "errors": "Erros",
+                "p50_ms": st.column_config.NumberColumn("p50", format="%.1f"),
+                "p95_ms": st.column_config.NumberColumn("p95", format="%.1f"),
+                "p99_ms": st.column_config.NumberColumn("p99", format="%.1f"),
+                "max_ms": st.column_config.NumberColumn("máx", format="%.1f"),
+                "mean_ms": st.column_config.NumberColumn("média", format="%.1f"),
+                "total_s": st.column_config.NumberColumn("total (s)", format="%.2f"),
+                "wait_p95_ms": st.column_config.NumberColumn(
+                    "espera conexão p95", format="%.1f"
+                ),
+                "rows": "Linhas",
+                "mb": st.column_config.NumberColumn("MB", format="%.2f"),
+                "replica_calls": "Réplica",
+                "sql": "SQL",
+                "fingerprint": "ID",
+            },
+        )
+
+        errors = df[df["errors"] > 0]
+        if not errors.empty:
+            with st.expander(f"⚠️ Últimos erros ({len(errors)})", expanded=False):
+                for _, row in errors.iterrows():
+                    st.markdown(f"**{row['fingerprint']}** · {row['errors']} erro(s)")
+                    st.code(row["last_error"] or "", language=None)
+                    st.code(row["sql"], language="sql")
+
+        st.caption(f"Volume total lido: {fmt_bytes(float(df['bytes'].sum()))}")
+
+    st.markdown("### Caches em memória")
+    df_cache = pd.DataFrame(cache_stats())
+    if df_cache.empty:
+        st.info("Nenhum cache criado ainda.")
+    else:
+        st.dataframe(df_cache, use_container_width=True, hide_index=True)
+
+    st.markdown("### Banco")
+    st.json(
+        {
+            "réplica": replica_status(),
+            "listener de cache (NOTIFY)": notify.listener_status(),
+            "fila de auditoria": audit.writer_status(),
+        },
+        expanded=False,
+    )
+
+
+render()
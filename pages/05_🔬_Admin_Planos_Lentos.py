@@ -0,0 +1,132 @@
+# pages/05_🔬_Admin_Planos_Lentos.py
+import json
+
+import pandas as pd
+import streamlit as st
+
+import db.database  # noqa: F401  (liga a config do core ao st.secrets)
+from core import diagnostics
+from ui.theme import apply_theme
+
+
+# ---------------------------------------
+# Mesmo helper de admin usado no Monitor
+# ---------------------------------------
+def is_admin() -> bool:
+    """Retorna True se o e-mail logado estiver na lista de admins."""
+    email = (st.session_state.get("user_email") or "").lower()
+    admins = [e.lower() for e in st.secrets["roles"]["admins"]]
+    return email in admins
+
+
+apply_theme("Admin – Consultas lentas", page_icon="🔬")
+
+
+def render():
+    st.title("🔬 Consultas lentas – planos capturados")
+
+    ss = st.session_state
+
+    if not ss.get("auth_ok", False):
+        st.error("Você não está autenticado. Faça login para continuar.")
+        st.stop()
+
+    if not is_admin():
+        st.error("Você não tem permissão para acessar esta página.")
+        st.stop()
+
+    cfg = diagnostics.settings()
+    st.caption(
+        f"Capturados automaticamente quando uma consulta passa de "
+        f"{cfg['slow_query_ms']:.0f} ms (amostra {cfg['sample_rate']:.0%}, "
+        f"no máx. 1 por consulta a cada {cfg['min_interval']:.0f}s e "
+        f"{cfg['max_per_hour']} por hora em cada processo)."
+    )
+
+    col_filter, col_limit = st.columns([2, 1])
+    with col_filter:
+        only_seq = st.checkbox("Só planos com scan sequencial", value=False)
+    with col_limit:
+        limit = st.number_input("Máx. linhas", min_value=10, max_value=2000, value=200)
+
+    try:
+        df = diagnostics.recent_plans(limit=int(limit), only_seq_scans=only_seq)
+    except Exception as e:
+        st.error(f"Erro ao carregar planos: {e}")
+        return
+
+    if df.empty:
+        st.success("Nenhuma consulta lenta capturada. 🎉")
+        return
+
+    # Resumo por consulta (impressão digital)
+    st.markdown("### Por consulta")
+    df_group = (
+        df.groupby("fingerprint")
+        .agg(
+            capturas=("id", "count"),
+            pior_ms=("duration_ms", "max"),
+            ultima=("created_at", "max"),
+            seq_scans=("seq_scans", lambda s: ", ".join(sorted({x for x in s if x}))),
+            sql=("query_text", "first"),
+        )
+        .sort_values("pior_ms", ascending=False)
+        .reset_index()
+    )
+    df_group["sql"] = df_group["sql"].str.replace(r"\s+", " ", regex=True).str.slice(0, 160)
+    st.dataframe(
+        df_group,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "fingerprint": "ID",
+            "pior_ms": st.column_config.NumberColumn("pior (ms)", format="%.0f"),
+            "ultima": "Última",
+            "seq_scans": "Scan sequencial",
+            "sql": "SQL",
+        },
+    )
+
+    # Detalhe de uma captura
+    st.markdown("### Plano")
+    labels = {
+        int(r["id"]): (
+            f"#{int(r['id'])} · {r['created_at']} · {r['duration_ms']:.0f} ms · "
+            f"{r['fingerprint']}" + (f" · seq scan: {r['seq_scans']}" if r["seq_scans"] else "")
+        )
+        for r in df.to_dict(orient="records")
+    }
+    plan_id = st.selectbox(
+        "Captura", list(labels), format_func=labels.get, label_visibility="collapsed"
+    )
+    row = diagnostics.get_plan(plan_id)
+    if row is None:
+        st.warning("Captura não encontrada (pode ter sido apagada).")
+        return
+
+    col_a, col_b, col_c = st.columns(3)
+    col_a.metric("Duração original", f"{row['duration_ms']:.0f} ms")
+    explain_ms = row.get("explain_ms")
+    col_b.metric(
+        "No EXPLAIN ANALYZE",
+        "-" if explain_ms is None or pd.isna(explain_ms) else f"{explain_ms:.0f} ms",
+    )
+    col_c.metric("Servidor", row.get("role") or row["backend"])
+
+    st.markdown(f"**Parâmetros:** `{row['params_shape']}`")
+    st.code(row["query_text"], language="sql")
+
+    if row["backend"] == "postgres":
+        st.json(json.loads(row["plan"]), expanded=4)
+    else:
+        st.code(row["plan"], language=None)
+
+    st.markdown("---")
+    with st.expander("🧹 Limpeza", expanded=False):
+        days = st.number_input("Apagar capturas com mais de (dias)", min_value=1, value=30)
+        if st.button("Apagar capturas antigas"):
+            diagnostics.delete_plans_before(int(days))
+            st.rerun()
+
+
+render()
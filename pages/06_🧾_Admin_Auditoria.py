@@ -0,0 +1,179 @@
+# pages/06_🧾_Admin_Auditoria.py
+from datetime import date, timedelta
+
+import pandas as pd
+import streamlit as st
+
+import db.database  # noqa: F401  (liga a config do core ao st.secrets)
+from core.repository import AUDIT_ACTION_TYPES, get_audit_page
+from ui.theme import apply_theme
+
+
+# ---------------------------------------
+# Mesmo helper de admin usado no Monitor
+# ---------------------------------------
+def is_admin() -> bool:
+    """Retorna True se o e-mail logado estiver na lista de admins."""
+    email = (st.session_state.get("user_email") or "").lower()
+    admins = [e.lower() for e in st.secrets["roles"]["admins"]]
+    return email in admins
+
+
+apply_theme("Admin – Auditoria", page_icon="🧾")
+
+PAGE_SIZES = [25, 50, 100, 200]
+
+ACTION_LABELS = {
+    "insert": "Inclusão",
+    "update": "Alteração",
+    "delete": "Exclusão",
+    "request_create": "Solicitação criada",
+    "request_approve": "Solicitação aprovada",
+    "request_reject": "Solicitação rejeitada",
+}
+
+
+def fmt_zeny(v) -> str:
+    if v is None or pd.isna(v):
+        return "-"
+    return f"{float(v):,.0f}".replace(",", ".")
+
+
+def render():
+    st.title("🧾 Auditoria de preços")
+
+    ss = st.session_state
+
+    if not ss.get("auth_ok", False):
+        st.error("Você não está autenticado. Faça login para continuar.")
+        st.stop()
+
+    if not is_admin():
+        st.error("Você não tem permissão para acessar esta página.")
+        st.stop()
+
+    st.caption(
+        "Eventos da price_audit_log, mais recentes primeiro. Meses já "
+        "arquivados (scripts.archive_audit) só aparecem com "
+        "'Incluir meses arquivados' (mais lento: lê os arquivos)."
+    )
+
+    # -------------------------------------------------
+    # Filtros
+    # -------------------------------------------------
+    col_item, col_actor, col_size = st.columns([1, 2, 1])
+    with col_item:
+        item_id = st.number_input(
+            "ID do item (0 = todos)", min_value=0, value=0, step=1, key="audit_item_id"
+        )
+    with col_actor:
+        actor = st.text_input(
+            "Autor (e-mail exato)", key="audit_actor", placeholder="ex: membro@guilda"
+        )
+    with col_size:
+        page_size = st.selectbox("Por página", PAGE_SIZES, index=1, key="audit_page_size")
+
+    col_actions, col_period = st.columns([2, 1])
+    with col_actions:
+        action_types = st.multiselect(
+            "Ações",
+            options=list(AUDIT_ACTION_TYPES),
+            format_func=lambda a: ACTION_LABELS.get(a, a),
+            key="audit_actions",
+        )
+    with col_period:
+        today = date.today()
+        period = st.date_input(
+            "Período",
+            value=(today - timedelta(days=30), today),
+            key="audit_period",
+        )
+
+    include_archived = st.checkbox(
+        "Incluir meses arquivados", value=False, key="audit_include_archived"
+    )
+
+    # date_input devolve 1 data enquanto o intervalo está sendo escolhido
+    if isinstance(period, (tuple, list)):
+        start = period[0] if len(period) > 0 else None
+        end = period[1] if len(period) > 1 else start
+    else:
+        start = end = period
+
+    filters = {
+        "item_id": int(item_id) or None,
+        "actor_email": (actor or "").strip() or None,
+        "action_types": tuple(action_types) or None,
+        "start": start,
+        "end": end,
+        "include_archived": include_archived,
+    }
+
+    # Pilha de cursores (keyset): volta para a 1ª página quando os filtros mudam
+    filters_sig = (tuple(filters.items()), page_size)
+    if ss.get("audit_filters_sig") != filters_sig:
+        ss["audit_filters_sig"] = filters_sig
+        ss["audit_cursors"] = [None]
+    cursors: list = ss["audit_cursors"]
+
+    try:
+        df, next_cursor = get_audit_page(
+            **filters, after=cursors[-1], page_size=int(page_size)
+        )
+    except Exception as e:
+        st.error(f"Erro ao carregar a auditoria: {e}")
+        return
+
+    if df.empty:
+        st.info("Nenhum evento encontrado com esses filtros.")
+        return
+
+    df_view = pd.DataFrame(
+        {
+            "Quando": df["created_at"].astype(str).str.slice(0, 19),
+            "Ação": df["action_type"].map(lambda a: ACTION_LABELS.get(a, a)),
+            "Item": [
+                f"{name} ({int(i)})" if isinstance(name, str) else str(int(i))
+                for name, i in zip(df["item_name"], df["item_id"])
+            ],
+            "Variação": df["variation_key"].fillna("").replace("", "base"),
+            "Dia do preço": df["date"].astype(str),
+            "Antes": df["old_price"].map(fmt_zeny),
+            "Depois": df["new_price"].map(fmt_zeny),
+            "Autor": df["actor_email"].fillna("-"),
+            "Papel": df["actor_role"].fillna("-"),
+            "Solicitação": df["request_id"].map(
+                lambda r: "-" if r is None or pd.isna(r) else f"#{int(r)}"
+            ),
+        }
+    )
+    st.dataframe(
+        df_view,
+        use_container_width=True,
+        hide_index=True,
+        height=min(600, 38 + 35 * len(df_view)),
+    )
+
+    col_prev, col_info, col_next = st.columns([1, 3, 1])
+    with col_prev:
+        st.button(
+            "◀ Anterior",
+            key="audit_prev",
+            use_container_width=True,
+            disabled=len(cursors) <= 1,
+            on_click=cursors.pop,
+        )
+    with col_info:
+        st.caption(f"Página {len(cursors)} · {len(df)} evento(s) nesta página")
+    with col_next:
+        st.button(
+            "Próxima ▶",
+            key="audit_next",
+            use_container_width=True,
+            disabled=next_cursor is None,
+            on_click=cursors.append,
+            args=(next_cursor,),
+        )
+
+
+render()
@@ -0,0 +1,66 @@
+# scripts/archive_audit.py
+"""
+Arquiva meses antigos da auditoria (price_audit_log / price_change_logs).
+
+    python -m scripts.archive_audit                      # > 6 meses, Parquet
+    python -m scripts.archive_audit --older-than 3 --format csv.gz
+    python -m scripts.archive_audit --dry-run            # só lista os meses
+    python -m scripts.archive_audit --migrate            # Postgres: particiona
+    python -m scripts.archive_audit --migrate --drop-legacy
+
+Cada mês vai para <[audit] archive_dir>/<tabela>/ e sai do banco
+(Postgres: DETACH + DROP da partição; SQLite: DELETE). Os arquivos
+continuam legíveis por core.audit_archive.history(include_archived=True).
+"""
+import argparse
+
+from core import audit_archive
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--older-than", type=int, default=None, help="meses mantidos no banco (padrão 6)"
+    )
+    parser.add_argument("--format", choices=audit_archive.FORMATS, default=None)
+    parser.add_argument(
+        "--table", choices=audit_archive.TABLES, action="append", help="padrão: as duas"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="não exporta nem apaga")
+    parser.add_argument(
+        "--migrate", action="store_true", help="converte as tabelas em particionadas"
+    )
+    parser.add_argument(
+        "--drop-legacy", action="store_true", help="com --migrate: apaga a *_legacy"
+    )
+    args = parser.parse_args(argv)
+    tables = tuple(args.table or audit_archive.TABLES)
+
+    if args.migrate:
+        for table in tables:
+            result = audit_archive.migrate_to_partitions(table, drop_legacy=args.drop_legacy)
+            if result["migrated"]:
+                print(
+                    f">> {table}: {result['partitions']} partição(ões), "
+                    f"{result['rows']} linhas copiadas"
+                )
+            else:
+                print(f">> {table}: já particionada")
+        return
+
+    done = audit_archive.archive(
+        older_than_months=args.older_than,
+        fmt=args.format,
+        tables=tables,
+        dry_run=args.dry_run,
+    )
+    if not done:
+        print(">> Nada para arquivar.")
+        return
+    verb = "seriam arquivadas" if args.dry_run else "arquivadas"
+    for entry in done:
+        print(f">> {entry['table']} {entry['month']}: {entry['rows']} linhas {verb}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# scripts/bench_backends.py
+"""
+Compara a latência dos backends (postgres / sqlite) na mesma carga.
+
+As leituras chamam as funções do repository SEM o ttl_cache (cada chamada
+vai ao banco). Uso:
+
+    python -m scripts.bench_backends                      # só sqlite
+    python -m scripts.bench_backends --backends sqlite postgres --repeat 20
+    python -m scripts.bench_backends --writes             # + escrita em lote (sqlite)
+
+O SQLite roda sobre uma CÓPIA temporária do arquivo configurado, então
+--writes nunca altera o market.db de verdade. No Postgres só há leituras.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from core import repository
+from core.cache import clear_all
+from core.config import reset_config
+
+
+def _uncached(func):
+    # ttl_cache usa functools.wraps: __wrapped__ é a função original
+    return getattr(func, "__wrapped__", func)
+
+
+def _timed(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50": statistics.median(samples),
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "mean": statistics.fmean(samples),
+    }
+
+
+def read_workload() -> dict:
+    """Operações de leitura do Monitor (nome -> função sem argumentos)."""
+    item_id = _uncached(repository.get_latest_priced_item)()
+    if item_id is None:
+        raise RuntimeError("banco sem preços: nada para medir")
+
+    market_page = _uncached(repository._get_market_page_cached)
+    return {
+        "get_latest_priced_item": _uncached(repository.get_latest_priced_item),
+        "get_item_variations": lambda: _uncached(
+            repository._get_item_variations_cached
+        )(item_id),
+        "get_summary_row": lambda: (
+            repository._get_last_prices_cached.clear(),
+            repository.get_summary_row(item_id, "base"),
+        ),
+        "get_price_history_df": lambda: _uncached(
+            repository._get_price_history_df_cached
+        )(item_id),
+        "market_page(item)": lambda: market_page(
+            "item", False, None, None, None, None, 25
+        ),
+        "market_page(var_pct desc)": lambda: market_page(
+            "var_pct", True, None, None, None, None, 25
+        ),
+        "count_market_rows": lambda: _uncached(repository.count_market_rows)(),
+    }
+
+
+def write_workload(n_rows: int) -> dict:
+    """Insere n_rows preços um a um vs. em lote (datas fictícias, 2099)."""
+    from core.connection import execute, execute_many
+
+    item_id = _uncached(repository.get_latest_priced_item)()
+    sql = """
+        INSERT INTO prices (item_id, date, price_zeny, refine, variation_key)
+        VALUES (%s, %s, %s, 0, %s);
+    """
+
+    def rows(tag: str):
+        return [
+            (item_id, f"2099-01-{(i % 28) + 1:02d}", 1000 + i, f"bench_{tag}_{i}")
+            for i in range(n_rows)
+        ]
+
+    def one_by_one():
+        for row in rows("single"):
+            execute(sql, row)
+
+    def batched():
+        execute_many(sql, rows("batch"))
+
+    return {
+        f"insert {n_rows} (1 a 1)": one_by_one,
+        f"insert {n_rows} (lote)": batched,
+    }
+
+
+def run_backend(backend: str, args) -> dict:
+    os.environ["RAGNAROK_DATABASE__BACKEND"] = backend
+    tmpdir = None
+    if backend == "sqlite":
+        from core import sqlite_backend
+
+        reset_config()
+        tmpdir = tempfile.mkdtemp(prefix="bench_sqlite_")
+        copy = Path(tmpdir) / "bench.db"
+        shutil.copy(sqlite_backend.db_path(), copy)
+        os.environ["RAGNAROK_SQLITE__PATH"] = str(copy)
+    reset_config()
+    clear_all()
+
+    results = {}
+    try:
+        ops = read_workload()
+        if args.writes and backend == "sqlite":
+            ops.update(write_workload(args.rows))
+        for name, fn in ops.items():
+            fn()  # aquecimento (conexão, schema, imports)
+            repeat = 1 if name.startswith("insert") else args.repeat
+            results[name] = _timed(fn, repeat)
+    finally:
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+            os.environ.pop("RAGNAROK_SQLITE__PATH", None)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--backends", nargs="+", default=["sqlite"], choices=["sqlite", "postgres"]
+    )
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--writes", action="store_true")
+    parser.add_argument("--rows", type=int, default=500, help="linhas no teste de escrita")
+    args = parser.parse_args(argv)
+
+    report = {}
+    for backend in args.backends:
+        try:
+            report[backend] = run_backend(backend, args)
+        except Exception as e:
+            print(f"[WARN] Backend {backend} falhou: {e}")
+
+    print(f"\n{'operação':<30} {'backend':<10} {'p50 ms':>9} {'p95 ms':>9} {'média':>9}")
+    print("-" * 72)
+    ops = dict.fromkeys(op for res in report.values() for op in res)
+    for op in ops:
+        for backend, res in report.items():
+            if op in res:
+                r = res[op]
+                print(
+                    f"{op:<30} {backend:<10} "
+                    f"{r['p50']:>9.2f} {r['p95']:>9.2f} {r['mean']:>9.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# scripts/export_parquet.py
+"""
+Exporta prices para o snapshot Parquet (por mês) usado pelas análises.
+
+    python -m scripts.export_parquet            # incremental (só meses alterados)
+    python -m scripts.export_parquet --full     # regrava tudo
+    python -m scripts.export_parquet --summary  # + mostra o resumo global (duckdb)
+"""
+import argparse
+from pathlib import Path
+
+from core import analytics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--out", type=Path, default=None, help="diretório do snapshot")
+    parser.add_argument("--full", action="store_true", help="ignora o manifest")
+    parser.add_argument(
+        "--summary", action="store_true", help="roda global_summary() no final"
+    )
+    args = parser.parse_args(argv)
+
+    result = analytics.export_prices(args.out, full=args.full)
+    out = args.out or analytics.analytics_dir()
+    print(f">> Snapshot em {out}")
+    print(f"   meses regravados: {len(result['months_written'])}")
+    for month in result["months_written"]:
+        print(f"     - {month}")
+    print(f"   meses removidos:  {len(result['months_removed'])}")
+    print(f"   linhas escritas:  {result['rows_written']}")
+    print(f"   tempo:            {result['seconds']:.3f}s")
+
+    if args.summary:
+        df = analytics.global_summary(args.out)
+        print(df.to_string(index=False, max_rows=30))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# scripts/import_report.py
+"""
+Relatório de custo de import por módulo (via `python -X importtime`).
+
+Cada alvo é importado num processo Python novo (cache frio), então o número
+reflete o cold start do servidor. Uso:
+
+    python scripts/import_report.py
+    python scripts/import_report.py db.database ui.charts --top 15
+    python scripts/import_report.py --json > import_report.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Módulos do app (as páginas executam Streamlit ao importar, por isso
+# medimos as camadas que elas usam) + libs pesadas como referência
+DEFAULT_TARGETS = [
+    "streamlit",
+    "db.database",
+    "core.repository",
+    "core.sqlite_backend",
+    "services.market",
+    "services.downsampling",
+    "ui.theme",
+    "ui.charts",
+    "pandas",
+    "altair",
+    "sqlalchemy",
+    "psycopg2",
+]
+
+# Libs cuja presença no import de um módulo do app indica import "gordo"
+HEAVY_MODULES = ["pandas", "numpy", "altair", "sqlalchemy", "psycopg2", "pyarrow"]
+
+
+def measure(target: str | None) -> list[dict]:
+    """
+    Importa `target` num subprocesso e devolve as linhas do -X importtime.
+    Com target=None mede só a inicialização do interpretador.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        p for p in (str(ROOT), env.get("PYTHONPATH", "")) if p
+    )
+    proc = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            f"import {target}" if target else "pass",
+        ],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        last = proc.stderr.strip().splitlines()[-1:] or ["?"]
+        raise RuntimeError(f"falha ao importar {target}: {last[0]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append(
+            {
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip())) // 2,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+            }
+        )
+    return rows
+
+
+def summarize(target: str, rows: list[dict], top: int, startup: set[str]) -> dict:
+    # Módulos carregados pela própria inicialização do Python (site, etc.)
+    # aparecem em todo alvo: ficam fora dos rankings
+    own = [r for r in rows if r["module"] not in startup]
+    total = next(
+        (r["cumulative_ms"] for r in reversed(rows) if r["module"] == target), 0.0
+    )
+    imported = {r["module"] for r in rows}
+    return {
+        "target": target,
+        "total_ms": round(total, 1),
+        "n_modules": len(own),
+        "heavy": [m for m in HEAVY_MODULES if m in imported],
+        "top_self": [
+            {"module": r["module"], "self_ms": round(r["self_ms"], 1)}
+            for r in sorted(own, key=lambda r: r["self_ms"], reverse=True)[:top]
+        ],
+        "top_level": [
+            {"module": r["module"], "cumulative_ms": round(r["cumulative_ms"], 1)}
+            for r in sorted(
+                (r for r in own if r["depth"] <= 1 and r["module"] != target),
+                key=lambda r: r["cumulative_ms"],
+                reverse=True,
+            )[:top]
+        ],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("targets", nargs="*", default=DEFAULT_TARGETS)
+    parser.add_argument("--top", type=int, default=8, help="módulos por alvo")
+    parser.add_argument("--json", action="store_true", help="saída em JSON")
+    args = parser.parse_args(argv)
+
+    startup = {r["module"] for r in measure(None)}
+
+    reports = []
+    for target in args.targets:
+        try:
+            reports.append(summarize(target, measure(target), args.top, startup))
+        except RuntimeError as e:
+            reports.append({"target": target, "error": str(e)})
+
+    if args.json:
+        print(json.dumps(reports, indent=2, ensure_ascii=False))
+        return
+
+    print(f"{'módulo':<24} {'total (ms)':>11} {'módulos':>8}  libs pesadas")
+    print("-" * 72)
+    for rep in reports:
+        if "error" in rep:
+            print(f"{rep['target']:<24} {'erro':>11}  {rep['error']}")
+            continue
+        heavy = ", ".join(rep["heavy"]) or "-"
+        print(
+            f"{rep['target']:<24} {rep['total_ms']:>11.1f} "
+            f"{rep['n_modules']:>8}  {heavy}"
+        )
+
+    for rep in reports:
+        if "error" in rep or not rep["top_level"]:
+            continue
+        print(f"\n>> {rep['target']} — imports diretos mais caros (cumulativo)")
+        for r in rep["top_level"]:
+            print(f"   {r['cumulative_ms']:>9.1f} ms  {r['module']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,24 @@
 # scripts/init_supabase.py
-from pathlib import Path
+"""
+Cria as tabelas e sincroniza o catálogo (items.json -> tabela items).
+
+    python -m scripts.init_supabase             # sync (COPY + diff, 1 transação)
+    python -m scripts.init_supabase --dry-run   # só mostra o que mudaria
+    python -m scripts.init_supabase --legacy    # insert em lotes (sem updates)
+"""
+import argparse
 import json
+import time
 from math import ceil
+from pathlib import Path
 
-import psycopg2
-
-from db.database import (
-    init_db,
-    DB_USER,
-    DB_PASS,
-    DB_HOST,
-    DB_PORT,
-    DB_NAME,
-)
-
-
-BATCH_SIZE = 1000  # quantidade de itens por lote
-
+from core.connection import get_connection
+from core.repository import init_db, sync_items
 
-def main():
-    print(">> Criando tabelas no Supabase...")
-    init_db()
+BATCH_SIZE = 1000  # quantidade de itens por lote (modo --legacy)
 
-    # Caminho do items.json (mesmo lugar do projeto)
-    items_path = Path(__file__).resolve().parent.parent / "items.json"
 
-    print(f">> Carregando itens de {items_path} ...")
+def load_items(items_path: Path) -> list[tuple[int, str]]:
     with open(items_path, "r", encoding="utf-8") as f:
         data = json.load(f)
 
@@ -37,22 +30,15 @@ def main():
         except ValueError:
             continue
         rows.append((item_id, v))
+    return rows
 
-    total = len(rows)
-    print(f">> Total de itens a inserir: {total}")
 
-    if total == 0:
-        print("Nada para inserir. Encerrando.")
-        return
+def insert_legacy(rows: list[tuple[int, str]]) -> None:
+    """Modo antigo: executemany em lotes, ON CONFLICT DO NOTHING."""
+    total = len(rows)
 
     # Conexão única com o Postgres do Supabase
-    conn = psycopg2.connect(
-        user=DB_USER,
-        password=DB_PASS,
-        host=DB_HOST,
-        port=DB_PORT,
-        dbname=DB_NAME,
-    )
+    conn = get_connection()
     cur = conn.cursor()
 
     sql = """
@@ -77,7 +63,63 @@ def main():
     cur.close()
     conn.close()
 
-    print("✅ Tabelas criadas e itens carregados com sucesso (batch por lotes)!")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--items",
+        type=Path,
+        # Caminho do items.json (mesmo lugar do projeto)
+        default=Path(__file__).resolve().parent.parent / "items.json",
+    )
+    parser.add_argument(
+        "--legacy", action="store_true", help="insert em lotes (não atualiza nomes)"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="calcula o diff e desfaz (rollback)"
+    )
+    parser.add_argument(
+        "--skip-init", action="store_true", help="não roda o CREATE TABLE"
+    )
+    args = parser.parse_args(argv)
+
+    if not args.skip_init:
+        print(">> Criando tabelas no Supabase...")
+        init_db()
+
+    print(f">> Carregando itens de {args.items} ...")
+    rows = load_items(args.items)
+    total = len(rows)
+    print(f">> Total de itens no arquivo: {total}")
+
+    if total == 0:
+        print("Nada para inserir. Encerrando.")
+        return
+
+    start = time.perf_counter()
+
+    if args.legacy:
+        insert_legacy(rows)
+        elapsed = time.perf_counter() - start
+        print(f"✅ Itens carregados em lotes em {elapsed:.2f}s (sem atualizar nomes).")
+        return
+
+    result = sync_items(rows, dry_run=args.dry_run)
+    elapsed = time.perf_counter() - start
+
+    prefix = "[dry-run] " if args.dry_run else ""
+    print(f">> {prefix}Sync concluído em {elapsed:.3f}s")
+    print(f"   novos:       {result['inserted']}")
+    print(f"   renomeados:  {result['updated']}")
+    print(
+        f"   sem mudança: "
+        f"{result['received'] - result['inserted'] - result['updated']}"
+    )
+    print(f"   fora do arquivo (mantidos no banco): {result['removed']}")
+    for item_id, name in result["removed_sample"]:
+        print(f"     - {item_id}: {name}")
+    if result["removed"] > len(result["removed_sample"]):
+        print(f"     ... e mais {result['removed'] - len(result['removed_sample'])}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,410 @@
+# scripts/load_test.py
+"""
+Teste de carga: N sessões simuladas (AppTest) no Monitor e nas páginas de
+admin, sobre um banco SQLite gerado por scripts.seed_data.
+
+Cada sessão é um membro da guilda com o próprio session_state, que passa
+por: abrir o Monitor, buscar um item, trocar o período do gráfico, avançar
+a tabela de mercado, abrir Solicitações (aprovando uma, com --writes),
+abrir Excluir preços e escolher um item. As interações rodam em rodadas:
+todas as sessões fazem a interação 1, depois a 2... (como N pessoas
+abrindo a página ao mesmo tempo, dividindo os caches do processo).
+
+O AppTest usa um Runtime global, então duas sessões nunca executam ao
+mesmo tempo no mesmo processo: a concorrência real vem de --workers
+processos, cada um com N/workers sessões, todos no mesmo banco. Uso:
+
+    python -m scripts.load_test --sessions 50
+    python -m scripts.load_test --sessions 50 --workers 4 --writes
+    python -m scripts.load_test --db /tmp/load.db --no-seed --json out.json
+
+Relatório por interação: p50/p95/máx (ms), consultas ao banco por
+execução (core.metrics) e erros (uma interação cujo widget não está na
+tela conta como erro); memória: crescimento do RSS por sessão
+(após uma sessão de aquecimento) e tamanho estimado do session_state.
+"""
+import argparse
+import gc
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from core.config import ROOT
+
+APP = ROOT / "app.py"
+PAGE_MONITOR = "pages/01_📈_Monitor_de_Mercado.py"
+PAGE_REQUESTS = "pages/02_🛠️_Admin_Solicitações.py"
+PAGE_DELETE = "pages/03_🗑️_Admin_Excluir_Precos.py"
+ADMIN_EMAIL = "anonimo_cla"  # o app.py entra sempre com esse usuário
+RUN_TIMEOUT = 120
+
+
+def _env(db_path: Path) -> None:
+    os.environ["RAGNAROK_DATABASE__BACKEND"] = "sqlite"
+    os.environ["RAGNAROK_SQLITE__PATH"] = str(db_path)
+    # Sem arquivos de métricas do teste no diretório do app
+    os.environ["RAGNAROK_METRICS__EXPORT_INTERVAL"] = "0"
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+
+    # Fora do Linux: pico (maxrss), em KB no Linux/BSD e bytes no macOS
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+def _db_calls() -> int:
+    from core import metrics
+
+    return sum(q["calls"] for q in metrics.snapshot()["queries"])
+
+
+def _pct(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[max(1, math.ceil(q * len(ordered))) - 1]
+
+
+# ======================================================
+#  Interações (cada uma recebe a sessão e devolve o AppTest a executar,
+#  ou None quando o widget não está na tela)
+# ======================================================
+def _open_monitor(session):
+    # O app.py redireciona com st.switch_page a cada execução: sem trocar
+    # de página no AppTest, todo .run() recarregaria um Monitor novo e
+    # perderia o estado dos widgets.
+    return session["at"].switch_page(PAGE_MONITOR)
+
+
+def _search_item(session):
+    at = session["at"]
+    if not any(w.key == "search_item" for w in at.text_input):
+        return None
+    return at.text_input(key="search_item").set_value(session["term"])
+
+
+def _change_period(session):
+    for radio in session["at"].radio:
+        if "Tudo" in radio.options:
+            return radio.set_value("Tudo")
+    return None
+
+
+def _market_next(session):
+    at = session["at"]
+    for button in at.button:
+        if button.key == "market_next" and not button.disabled:
+            return button.click()
+    return None
+
+
+def _open_requests(session):
+    return session["at"].switch_page(PAGE_REQUESTS)
+
+
+def _approve_request(session):
+    buttons = [b for b in session["at"].button if (b.key or "").startswith("approve_")]
+    if not buttons:
+        return None
+    return buttons[session["index"] % len(buttons)].click()
+
+
+def _open_delete(session):
+    return session["at"].switch_page(PAGE_DELETE)
+
+
+def _pick_delete_item(session):
+    at = session["at"]
+    if not any(w.key == "delete_item_select" for w in at.selectbox):
+        return None
+    box = at.selectbox(key="delete_item_select")
+    # O widget guarda o registro {"id", "name"} (rótulo via format_func)
+    option = {"id": session["item_id"], "name": session["name"]}
+    if box.format_func(option) not in box.options:
+        return None
+    return box.set_value(option)
+
+
+def interactions(writes: bool) -> list[tuple]:
+    steps = [
+        ("monitor: abrir", _open_monitor),
+        ("monitor: buscar item", _search_item),
+        ("monitor: período do gráfico", _change_period),
+        ("monitor: próxima página do mercado", _market_next),
+        ("admin: solicitações", _open_requests),
+    ]
+    if writes:
+        steps.append(("admin: aprovar solicitação", _approve_request))
+    steps += [
+        ("admin: excluir preços", _open_delete),
+        ("admin: excluir – escolher item", _pick_delete_item),
+    ]
+    return steps
+
+
+# ======================================================
+#  Worker (um processo, várias sessões intercaladas)
+# ======================================================
+def _priced_items() -> list[tuple[int, str]]:
+    from core.connection import query_df
+
+    df = query_df(
+        """
+        SELECT DISTINCT p.item_id, i.name
+        FROM prices p JOIN items i ON i.id = p.item_id
+        ORDER BY p.item_id;
+        """
+    )
+    return [(int(r.item_id), str(r.name)) for r in df.itertuples()]
+
+
+def _new_session(index: int, item: tuple[int, str]) -> dict:
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(APP), default_timeout=RUN_TIMEOUT)
+    # secrets próprios: o teste nunca lê o secrets.toml de verdade
+    at.secrets["roles"] = {"admins": [ADMIN_EMAIL]}
+    at.secrets["database"] = {"backend": "sqlite"}
+    # Entrada pelo app.py (login padrão no session_state), fora da medição
+    at.run()
+    return {
+        "at": at,
+        "index": index,
+        "item_id": item[0],
+        "name": item[1],
+        "term": item[1].lower(),
+    }
+
+
+def _state_bytes(at) -> int:
+    from core.cache import estimate_bytes
+
+    state = at.session_state
+    return sum(estimate_bytes(state[k]) for k in state.filtered_state)
+
+
+def run_worker(job: dict) -> dict:
+    """Executa as sessões job["indexes"] e devolve as amostras brutas."""
+    _env(Path(job["db"]))
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+
+    steps = interactions(job["writes"])
+    items = _priced_items()
+    rng = random.Random(job["seed"])
+    picks = {i: rng.choice(items) for i in job["indexes"]}
+
+    # Aquecimento: imports, catálogo e caches do processo fora da conta
+    warm = _new_session(-1, picks[job["indexes"][0]])
+    for name, step in steps:
+        if step is not _approve_request:  # sem escrita no aquecimento
+            target = step(warm)
+            if target is not None:
+                target.run()
+    del warm
+    gc.collect()
+    rss_start = _rss_bytes()
+
+    sessions = [_new_session(i, picks[i]) for i in job["indexes"]]
+    result = {
+        "pid": os.getpid(),
+        "sessions": len(sessions),
+        "latency_ms": {name: [] for name, _ in steps},
+        "db_calls": {name: [] for name, _ in steps},
+        "errors": {name: 0 for name, _ in steps},
+        "skipped": {name: 0 for name, _ in steps},
+    }
+    for name, step in steps:
+        for session in sessions:
+            target = step(session)
+            if target is None:
+                # Widget fora da tela: a interação não aconteceu, é falha
+                result["skipped"][name] += 1
+                result["errors"][name] += 1
+                continue
+            calls = _db_calls()
+            start = time.perf_counter()
+            try:
+                target.run()
+                failed = len(session["at"].exception) > 0
+            except Exception as e:
+                print(f"[WARN] {name} (sessão {session['index']}): {e}")
+                failed = True
+            result["latency_ms"][name].append((time.perf_counter() - start) * 1000)
+            result["db_calls"][name].append(_db_calls() - calls)
+            result["errors"][name] += failed
+
+    gc.collect()
+    result["rss_start"] = rss_start
+    result["rss_end"] = _rss_bytes()
+    result["state_bytes"] = [_state_bytes(s["at"]) for s in sessions]
+    return result
+
+
+# ======================================================
+#  Orquestração / relatório
+# ======================================================
+def run(
+    db_path: Path,
+    n_sessions: int,
+    workers: int = 1,
+    writes: bool = False,
+    seed_value: int = 42,
+) -> dict:
+    _env(db_path)
+    workers = max(1, min(workers, n_sessions))
+    jobs = [
+        {
+            "db": str(db_path),
+            "indexes": list(range(w, n_sessions, workers)),
+            "writes": writes,
+            "seed": seed_value + w,
+        }
+        for w in range(workers)
+    ]
+
+    start = time.perf_counter()
+    if workers == 1:
+        parts = [run_worker(jobs[0])]
+    else:
+        # spawn: cada processo sobe o próprio Runtime/AppTest do zero
+        with multiprocessing.get_context("spawn").Pool(workers) as pool:
+            parts = pool.map(run_worker, jobs)
+    elapsed = time.perf_counter() - start
+
+    names = list(parts[0]["latency_ms"])
+    report = {"sessions": n_sessions, "workers": workers, "seconds": elapsed, "interactions": []}
+    for name in names:
+        lat = [x for p in parts for x in p["latency_ms"][name]]
+        calls = [x for p in parts for x in p["db_calls"][name]]
+        report["interactions"].append(
+            {
+                "interaction": name,
+                "runs": len(lat),
+                "p50_ms": _pct(lat, 0.50) if lat else None,
+                "p95_ms": _pct(lat, 0.95) if lat else None,
+                "max_ms": max(lat) if lat else None,
+                "db_calls_mean": sum(calls) / len(calls) if calls else None,
+                "db_calls_max": max(calls) if calls else None,
+                "errors": sum(p["errors"][name] for p in parts),
+                "skipped": sum(p["skipped"][name] for p in parts),
+            }
+        )
+
+    state = [x for p in parts for x in p["state_bytes"]]
+    report["memory"] = {
+        "rss_growth_per_session": sum(
+            (p["rss_end"] - p["rss_start"]) / p["sessions"] for p in parts
+        )
+        / len(parts),
+        "rss_end_per_worker": [p["rss_end"] for p in parts],
+        "session_state_mean": sum(state) / len(state),
+        "session_state_max": max(state),
+    }
+    return report
+
+
+def _fmt(value, spec: str) -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"\n{report['sessions']} sessões em {report['workers']} processo(s), "
+        f"{report['seconds']:.1f}s\n"
+    )
+    print(
+        f"{'interação':<38} {'exec':>5} {'p50 ms':>9} {'p95 ms':>9} "
+        f"{'máx ms':>9} {'DB/exec':>8} {'erros':>6}"
+    )
+    print("-" * 90)
+    for r in report["interactions"]:
+        print(
+            f"{r['interaction']:<38} {r['runs']:>5} {_fmt(r['p50_ms'], '9.1f')} "
+            f"{_fmt(r['p95_ms'], '9.1f')} {_fmt(r['max_ms'], '9.1f')} "
+            f"{_fmt(r['db_calls_mean'], '8.1f')} {r['errors']:>6}"
+            + (f"  ({r['skipped']} sem widget)" if r["skipped"] else "")
+        )
+
+    mem = report["memory"]
+    mb = 1024 * 1024
+    print(
+        f"\nMemória: +{mem['rss_growth_per_session'] / mb:.2f} MB de RSS por sessão · "
+        f"session_state médio {mem['session_state_mean'] / 1024:.1f} KB "
+        f"(máx {mem['session_state_max'] / 1024:.1f} KB) · RSS final por processo: "
+        + ", ".join(f"{x / mb:.0f} MB" for x in mem["rss_end_per_worker"])
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=20, help="sessões simuladas")
+    parser.add_argument("--workers", type=int, default=1, help="processos em paralelo")
+    parser.add_argument(
+        "--writes", action="store_true", help="cada sessão aprova uma solicitação"
+    )
+    parser.add_argument("--db", type=Path, help="arquivo SQLite (padrão: temporário)")
+    parser.add_argument(
+        "--no-seed", action="store_true", help="usa o --db como está, sem gerar dados"
+    )
+    parser.add_argument("--items", type=int, default=300, help="itens com preço (seed)")
+    parser.add_argument("--days", type=int, default=180, help="dias de histórico (seed)")
+    parser.add_argument("--requests", type=int, default=60, help="solicitações (seed)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", type=Path, help="grava o relatório em JSON")
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    db_path = args.db
+    if db_path is None:
+        tmpdir = tempfile.TemporaryDirectory(prefix="load_test_")
+        db_path = Path(tmpdir.name) / "load.db"
+    try:
+        if not args.no_seed:
+            from scripts.seed_data import seed
+
+            counts = seed(
+                db_path,
+                n_items=args.items,
+                days=args.days,
+                n_requests=args.requests,
+                seed_value=args.seed,
+                force=True,
+            )
+            print(
+                f"[INFO] Banco {db_path}: {counts['prices']} preços, "
+                f"{counts['requests']} solicitações"
+            )
+
+        report = run(
+            db_path,
+            args.sessions,
+            workers=args.workers,
+            writes=args.writes,
+            seed_value=args.seed,
+        )
+        print_report(report)
+        if args.json:
+            args.json.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+            print(f"[INFO] Relatório salvo em {args.json}")
+    finally:
+        if tmpdir is not None:
+            tmpdir.cleanup()
+    return 1 if any(r["errors"] for r in report["interactions"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+# scripts/seed_data.py
+"""
+Gera um banco SQLite local com dados sintéticos (para testes de carga).
+
+Catálogo real (items.json) + preços aleatórios em passeio aleatório para
+--items itens ao longo de --days dias, com algumas variações (refino,
+cartas) por item, e --requests solicitações pendentes. Uso:
+
+    python -m scripts.seed_data /tmp/load.db --items 300 --days 180
+    python -m scripts.seed_data /tmp/load.db --force --seed 7
+
+Determinístico por --seed. Nunca toca o banco configurado: o caminho de
+saída é obrigatório e --force é exigido para sobrescrever.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from core.config import ROOT, reset_config
+
+ITEMS_JSON = ROOT / "items.json"
+
+
+def _use_sqlite(path: Path) -> None:
+    os.environ["RAGNAROK_DATABASE__BACKEND"] = "sqlite"
+    os.environ["RAGNAROK_SQLITE__PATH"] = str(path)
+    reset_config()
+
+
+def _variations(rng: random.Random, card_ids: list[int]) -> list[tuple]:
+    """(refine, card_ids, variation_key) do item: sempre a base + 0..2 extras."""
+    out = [(0, None, "base")]
+    for _ in range(rng.randint(0, 2)):
+        refine = rng.choice([4, 7, 8, 9, 10])
+        cards = sorted(rng.sample(card_ids, rng.randint(0, 2))) if card_ids else []
+        key = f"r{refine}" + (f"|c{'-'.join(map(str, cards))}" if cards else "")
+        card_str = ",".join(map(str, cards)) if cards else None
+        if key not in {v[2] for v in out}:
+            out.append((refine, card_str, key))
+    return out
+
+
+def price_rows(
+    item_ids: list[int],
+    card_ids: list[int],
+    days: int,
+    rng: random.Random,
+    fill: float = 0.6,
+) -> list[tuple]:
+    """Linhas de prices: passeio aleatório diário por variação."""
+    today = date.today()
+    rows = []
+    for item_id in item_ids:
+        base_price = rng.choice([1_000, 15_000, 250_000, 2_000_000, 40_000_000])
+        for refine, cards, key in _variations(rng, card_ids):
+            price = base_price * (1 + refine * 0.4)
+            for d in range(days, 0, -1):
+                price *= 1 + rng.gauss(0, 0.04)
+                if rng.random() > fill:
+                    continue
+                day = today - timedelta(days=d)
+                created = datetime.combine(day, datetime.min.time()) + timedelta(
+                    seconds=rng.randint(0, 86_399)
+                )
+                rows.append(
+                    (item_id, day, max(1, int(price)), refine, cards, None, key, created)
+                )
+    return rows
+
+
+def seed(
+    path: Path,
+    n_items: int = 300,
+    days: int = 180,
+    n_requests: int = 40,
+    seed_value: int = 42,
+    force: bool = False,
+) -> dict:
+    """Cria o banco em `path` e devolve as contagens geradas."""
+    path = Path(path)
+    if path.exists():
+        if not force:
+            raise SystemExit(f"{path} já existe (use --force para sobrescrever).")
+        for suffix in ("", "-wal", "-shm"):
+            Path(str(path) + suffix).unlink(missing_ok=True)
+
+    _use_sqlite(path)
+    from core import repository
+    from core.connection import execute_many
+    from scripts.init_supabase import load_items
+
+    start = time.perf_counter()
+    rng = random.Random(seed_value)
+
+    repository.init_db()
+    items = load_items(ITEMS_JSON)
+    repository.sync_items(items)
+
+    # Cartas existem no catálogo real: usadas nas variações
+    card_ids = [i for i, name in items if "carta" in name.lower()][:500]
+    item_ids = rng.sample([i for i, _ in items], min(n_items, len(items)))
+
+    rows = price_rows(item_ids, card_ids, days, rng)
+    execute_many(
+        """
+        INSERT INTO prices
+            (item_id, date, price_zeny, refine, card_ids, extra_desc,
+             variation_key, created_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
+        """,
+        rows,
+    )
+
+    requests = []
+    for i in range(n_requests):
+        item_id, day, price, refine, cards, _, key, _ = rng.choice(rows)
+        requests.append(
+            (
+                item_id,
+                day,
+                price,
+                int(price * rng.uniform(0.7, 1.3)),
+                "seed",
+                f"membro{i % 50}@guilda",
+                refine,
+                cards,
+                key,
+            )
+        )
+    execute_many(
+        """
+        INSERT INTO price_change_requests
+            (item_id, date, old_price, new_price, reason, created_by,
+             refine, card_ids, variation_key)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s);
+        """,
+        requests,
+    )
+
+    return {
+        "items": len(items),
+        "priced_items": len(item_ids),
+        "prices": len(rows),
+        "requests": len(requests),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path", type=Path, help="arquivo SQLite a criar")
+    parser.add_argument("--items", type=int, default=300, help="itens com preço")
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--requests", type=int, default=40, help="solicitações pendentes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--force", action="store_true", help="sobrescreve o arquivo")
+    args = parser.parse_args(argv)
+
+    result = seed(
+        args.path,
+        n_items=args.items,
+        days=args.days,
+        n_requests=args.requests,
+        seed_value=args.seed,
+        force=args.force,
+    )
+    print(
+        f"[INFO] {args.path}: {result['prices']} preços de {result['priced_items']} "
+        f"itens, {result['requests']} solicitações ({result['seconds']:.1f}s)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
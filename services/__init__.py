@@ -1,2 +1,2 @@
 # services/__init__.py
-from .market import compute_summary, status_from_variation
+from .market import compute_summary, status_from_variation, summarize_last_prices
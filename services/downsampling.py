@@ -0,0 +1,73 @@
+# services/downsampling.py
+import numpy as np
+import pandas as pd
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: escolhe até max_points índices da série
+    (x crescente) preservando o formato visual — picos e vales sobrevivem,
+    porque em cada bucket fica o ponto que forma o maior triângulo com o
+    ponto escolhido antes e com a média do bucket seguinte.
+
+    O primeiro e o último ponto são sempre mantidos; max_points < 3 vale
+    como 3 (primeiro, último e um ponto do meio).
+    """
+    n = len(x)
+    max_points = max(int(max_points), 3)
+    if max_points >= n:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+
+    every = (n - 2) / (max_points - 2)
+    indices = np.empty(max_points, dtype=np.int64)
+    indices[0] = 0
+    a = 0
+
+    for i in range(max_points - 2):
+        range_start = int(i * every) + 1
+        range_end = int((i + 1) * every) + 1
+
+        # Média do próximo bucket (no último, é o último ponto)
+        next_start = range_end
+        next_end = min(int((i + 2) * every) + 1, n)
+        if next_start >= next_end:
+            avg_x, avg_y = x[n - 1], y[n - 1]
+        else:
+            avg_x = x[next_start:next_end].mean()
+            avg_y = y[next_start:next_end].mean()
+
+        bx = x[range_start:range_end]
+        by = y[range_start:range_end]
+        area = np.abs(
+            (x[a] - avg_x) * (by - y[a]) - (x[a] - bx) * (avg_y - y[a])
+        )
+
+        a = range_start + int(np.argmax(area))
+        indices[i + 1] = a
+
+    indices[-1] = n - 1
+    return indices
+
+
+def downsample_lttb(
+    df: pd.DataFrame,
+    x_col: str,
+    y_col: str,
+    max_points: int,
+) -> pd.DataFrame:
+    """
+    Reduz df (ordenado por x_col) para no máximo max_points linhas via LTTB.
+    x_col pode ser datetime; as demais colunas das linhas escolhidas são mantidas.
+    """
+    if len(df) <= max_points:
+        return df
+
+    x = df[x_col]
+    if pd.api.types.is_datetime64_any_dtype(x):
+        x = x.astype("int64")
+
+    idx = lttb_indices(x.to_numpy(), df[y_col].to_numpy(), max_points)
+    return df.iloc[idx]
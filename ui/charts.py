@@ -0,0 +1,168 @@
+# ui/charts.py
+import pandas as pd
+
+from core.cache import Cache
+from core.events import get_data_version, on_variation_change
+from services.downsampling import downsample_lttb
+
+# ======================================================
+#  Cache de specs Vega-Lite já serializadas
+# ======================================================
+# Chave: (item_id, variation_key, data_version, chart_type).
+# Compartilhado por todas as sessões do processo; gráfico sem mudança
+# custa só um lookup no dicionário (sem Altair nem serialização).
+MAX_CACHED_SPECS = 512
+
+# Fora do clear_all(): a chave já traz a versão dos dados e as escritas
+# despejam só a variação alterada (_evict_variation).
+_spec_cache = Cache(
+    "ui.charts.specs", ttl=None, maxsize=MAX_CACHED_SPECS, global_clear=False
+)
+
+
+def _evict_variation(item_id: int, variation_key: str) -> None:
+    """Remove as specs da variação alterada (chamado pelas escritas de preço)."""
+    _spec_cache.evict(lambda k: k[0] == item_id and k[1] == variation_key)
+
+
+on_variation_change(_evict_variation)
+
+
+def data_version(item_id: int, variation_key: str, df: pd.DataFrame) -> str:
+    """
+    Versão dos dados do gráfico: contador de escritas deste processo +
+    hash do conteúdo plotado (cobre escritas feitas por outros processos).
+    """
+    content_hash = int(
+        pd.util.hash_pandas_object(df[["date", "price_zeny"]], index=False).sum()
+    )
+    return f"{get_data_version(item_id, variation_key)}-{len(df)}-{content_hash:x}"
+
+
+def get_chart_spec(
+    item_id: int,
+    variation_key: str,
+    version: str,
+    chart_type: str,
+    build,
+) -> dict:
+    """
+    Retorna a spec cacheada ou chama build() -> dict e guarda o resultado.
+    O dicionário devolvido é compartilhado: não altere.
+    """
+    key = (item_id, variation_key, version, chart_type)
+    return _spec_cache.get_or_set(key, build)
+
+
+# ======================================================
+#  Construção dos gráficos
+# ======================================================
+def build_sparkline_spec(hist_last5: pd.DataFrame) -> dict:
+    """Mini-gráfico de tendência dos últimos registros."""
+    import altair as alt  # ~0.8s de import: só quando a spec não está no cache
+
+    y_min = float(hist_last5["price_zeny"].min()) * 0.98
+    y_max = float(hist_last5["price_zeny"].max()) * 1.02
+
+    spark_data = hist_last5[["date", "price_zeny"]].copy()
+    spark_data["date_str"] = spark_data["date"].dt.strftime("%Y-%m-%d")
+
+    spark = (
+        alt.Chart(spark_data)
+        .mark_line(point=True)
+        .encode(
+            x=alt.X(
+                "date_str:O",
+                axis=alt.Axis(title="", labels=False, ticks=False),
+            ),
+            y=alt.Y(
+                "price_zeny:Q",
+                axis=alt.Axis(title="", labels=False, ticks=False),
+                scale=alt.Scale(domain=[y_min, y_max]),
+            ),
+            tooltip=[
+                alt.Tooltip("date_str:O", title="Data"),
+                alt.Tooltip("price_zeny:Q", title="Preço (zeny)"),
+            ],
+        )
+        .properties(height=70)
+    )
+    return spark.to_dict()
+
+
+def build_history_spec(hist_plot: pd.DataFrame, max_points: int) -> dict:
+    """
+    Área + linha do histórico de preços, com LTTB limitando os pontos a max_points.
+    """
+    import altair as alt
+
+    n_records = len(hist_plot)
+    hist_plot = downsample_lttb(
+        hist_plot[["date", "price_zeny"]],
+        x_col="date",
+        y_col="price_zeny",
+        max_points=max_points,
+    )
+
+    area = (
+        alt.Chart(hist_plot)
+        .mark_area(opacity=0.3)
+        .encode(
+            x=alt.X(
+                "date:T",
+                title="Data",
+                axis=alt.Axis(labelAngle=0, format="%d/%m/%y"),
+            ),
+            y=alt.Y("price_zeny:Q", title="Preço (zeny)"),
+        )
+        .properties(height=340)
+    )
+
+    line = (
+        alt.Chart(hist_plot)
+        .mark_line(point=True)
+        .encode(
+            x=alt.X(
+                "date:T",
+                axis=alt.Axis(labelAngle=0, format="%d/%m/%y"),
+            ),
+            y="price_zeny:Q",
+            tooltip=[
+                alt.Tooltip("date:T", title="Data", format="%Y-%m-%d"),
+                alt.Tooltip("price_zeny:Q", title="Preço (zeny)"),
+            ],
+        )
+    )
+
+    spec = (area + line).to_dict()
+    # Metadados para a legenda de amostragem (não fazem parte do Vega-Lite)
+    spec["usermeta"] = {"n_points": len(hist_plot), "n_records": n_records}
+    return spec
+
+
+def sparkline_spec(item_id: int, variation_key: str, hist_last5: pd.DataFrame) -> dict:
+    version = data_version(item_id, variation_key, hist_last5)
+    return get_chart_spec(
+        item_id,
+        variation_key,
+        version,
+        "sparkline",
+        lambda: build_sparkline_spec(hist_last5),
+    )
+
+
+def history_spec(
+    item_id: int,
+    variation_key: str,
+    hist_plot: pd.DataFrame,
+    period: str,
+    max_points: int,
+) -> dict:
+    version = data_version(item_id, variation_key, hist_plot)
+    return get_chart_spec(
+        item_id,
+        variation_key,
+        version,
+        f"history:{period}:{max_points}",
+        lambda: build_history_spec(hist_plot, max_points),
+    )
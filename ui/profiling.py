@@ -0,0 +1,216 @@
+# ui/profiling.py
+"""
+Cronômetro por seção das páginas + overlay de debug (opt-in).
+
+    with section("insights"):
+        ...
+
+    @st.fragment
+    @timed("tabela de mercado")
+    def render_market_table(...):
+        ...
+
+A seção mais externa de uma execução (a página inteira, ou só o fragmento
+num rerun de fragmento) abre o perfil; as internas viram linhas aninhadas
+com tempo de parede, consultas ao banco e acertos/faltas dos caches do core
+(via core.metrics.collect — st.cache_data não entra na conta). Cada perfil
+fechado vai para o histórico da sessão (últimos [debug] perf_history,
+padrão 20).
+
+Ligado com ?perf=1 na URL ou [debug] perf_overlay = true na config.
+Desligado, section() só confere uma contextvar.
+"""
+from __future__ import annotations
+
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+from core import metrics
+from core.config import get_section
+
+HISTORY_KEY = "_perf_history"
+DEFAULT_HISTORY = 20
+
+_DISABLED = object()
+_active: contextvars.ContextVar = contextvars.ContextVar("ui_profile", default=None)
+
+
+def overlay_enabled() -> bool:
+    flag = st.query_params.get("perf")
+    if flag is None:
+        flag = get_section("debug").get("perf_overlay", False)
+    return str(flag).lower() in ("1", "true", "yes", "on")
+
+
+def _history_size() -> int:
+    return int(get_section("debug").get("perf_history", DEFAULT_HISTORY))
+
+
+@contextmanager
+def _measure(profile: dict, name: str):
+    collector = profile["collector"]
+    row = {"section": name, "depth": profile["depth"]}
+    profile["sections"].append(row)  # ordem de entrada
+    before = collector.totals()
+    start = time.perf_counter()
+    profile["depth"] += 1
+    try:
+        yield
+    finally:
+        profile["depth"] -= 1
+        after = collector.totals()
+        row["ms"] = (time.perf_counter() - start) * 1000
+        for key in ("db_calls", "db_ms", "cache_hits", "cache_misses"):
+            row[key] = after[key] - before[key]
+
+
+def _finish(profile: dict) -> None:
+    root = profile["sections"][0]
+    entry = {
+        "at": time.strftime("%H:%M:%S"),
+        "root": root["section"],
+        "total_ms": root["ms"],
+        "db_calls": root["db_calls"],
+        "db_ms": root["db_ms"],
+        "cache_hits": root["cache_hits"],
+        "cache_misses": root["cache_misses"],
+        "sections": profile["sections"],
+    }
+    history = st.session_state.get(HISTORY_KEY, [])
+    history = (history + [entry])[-_history_size():]
+    st.session_state[HISTORY_KEY] = history
+
+
+@contextmanager
+def section(name: str):
+    """Cronometra o bloco como uma seção do rerun atual."""
+    profile = _active.get()
+    if profile is _DISABLED:
+        yield
+        return
+
+    if profile is not None:
+        with _measure(profile, name):
+            yield
+        return
+
+    # Seção mais externa: decide se o perfil está ligado nesta execução
+    if not overlay_enabled():
+        token = _active.set(_DISABLED)
+        try:
+            yield
+        finally:
+            _active.reset(token)
+        return
+
+    with metrics.collect() as collector:
+        profile = {"collector": collector, "sections": [], "depth": 0}
+        token = _active.set(profile)
+        try:
+            with _measure(profile, name):
+                yield
+        finally:
+            _active.reset(token)
+            _finish(profile)
+
+
+def timed(name: str):
+    """Decorator: a função inteira vira uma seção."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with section(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# ======================================================
+#  Overlay
+# ======================================================
+def _sections_df(sections: list[dict]) -> pd.DataFrame:
+    df = pd.DataFrame(sections)
+    df["section"] = [" " * d + s for d, s in zip(df["depth"], df["section"])]
+    return df[["section", "ms", "db_calls", "db_ms", "cache_hits", "cache_misses"]]
+
+
+_COLUMNS = {
+    "section": "Seção",
+    "ms": st.column_config.NumberColumn("ms", format="%.1f"),
+    "db_calls": "DB",
+    "db_ms": st.column_config.NumberColumn("DB ms", format="%.1f"),
+    "cache_hits": "Cache ✓",
+    "cache_misses": "Cache ✗",
+}
+
+
+def render_overlay() -> None:
+    """Painel na sidebar com a última execução e o histórico (se ligado)."""
+    if not overlay_enabled():
+        return
+    history = st.session_state.get(HISTORY_KEY, [])
+    if not history:
+        return
+
+    last = history[-1]
+    with st.sidebar.expander("⏱️ Perf – tempo por seção", expanded=True):
+        st.caption(
+            f"Última execução ({last['root']}, {last['at']}): "
+            f"{last['total_ms']:.0f} ms · {last['db_calls']} consultas "
+            f"({last['db_ms']:.0f} ms) · cache {last['cache_hits']}✓/"
+            f"{last['cache_misses']}✗"
+        )
+        st.dataframe(
+            _sections_df(last["sections"]),
+            hide_index=True,
+            use_container_width=True,
+            column_config=_COLUMNS,
+        )
+
+        st.markdown(f"**Últimas {len(history)} execuções**")
+        df_hist = pd.DataFrame(
+            [{k: v for k, v in h.items() if k != "sections"} for h in history]
+        )
+        st.dataframe(
+            df_hist.iloc[::-1],
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "at": "Hora",
+                "root": "Execução",
+                "total_ms": st.column_config.NumberColumn("ms", format="%.0f"),
+                "db_calls": "DB",
+                "db_ms": st.column_config.NumberColumn("DB ms", format="%.0f"),
+                "cache_hits": "Cache ✓",
+                "cache_misses": "Cache ✗",
+            },
+        )
+
+        # Média por seção no histórico (onde o rerun costuma gastar)
+        rows = [s for h in history for s in h["sections"]]
+        df_avg = (
+            pd.DataFrame(rows)
+            .groupby("section", sort=False)[["ms", "db_calls"]]
+            .mean()
+            .sort_values("ms", ascending=False)
+            .reset_index()
+        )
+        st.markdown("**Média por seção**")
+        st.dataframe(
+            df_avg,
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "section": "Seção",
+                "ms": st.column_config.NumberColumn("ms", format="%.1f"),
+                "db_calls": st.column_config.NumberColumn("DB", format="%.1f"),
+            },
+        )